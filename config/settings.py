@@ -87,10 +87,45 @@ TRANSACTIONS_TABLE = "transactions"
 BUDGET_RULES_TABLE = "budget_rules"
 SETTINGS_TABLE = "user_settings"
 
+# Canonical date format stored in the database, ISO dates sort and compare correctly as text
+DB_DATE_FORMAT = "%Y-%m-%d"
+
 DB_ACTION_ADD = "add"
 DB_ACTION_EDIT = "edit"
 DB_ACTION_DELETE = "delete"
 
+# Connection profiles, the pragmas applied every time the database is opened. The profile used is chosen in the user settings (KEY_DB_PROFILE)
+# cache_size is in KiB when negative, mmap_size in bytes (0 disables memory mapping)
+DB_PROFILE_SAFE = "safe"
+DB_PROFILE_BALANCED = "balanced"
+DB_PROFILE_FAST = "fast"
+
+DB_CONNECTION_PROFILES = {
+    DB_PROFILE_SAFE: {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -8000,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+    },
+    DB_PROFILE_BALANCED: {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -32000,
+        "mmap_size": 134217728,
+        "temp_store": "MEMORY",
+    },
+    DB_PROFILE_FAST: {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -131072,
+        "mmap_size": 536870912,
+        "temp_store": "MEMORY",
+    },
+}
+
+DEFAULT_DB_PROFILE = DB_PROFILE_BALANCED
+
 
 # ============================================================================
 # UI SETTINGS
@@ -125,6 +160,9 @@ BUDGET_TAG_WANTS = "Wants"
 BUDGET_TAG_SAVING = "Saving"
 BUDGET_TAG_SALARY = "Salary"
 
+BUDGET_YEAR_VIEW = "Year"   # Choice of the budget month selector that shows the twelve months of the year side by side
+RECURRING_PROJECTION_MONTHS = 12    # Months after the last transaction in which the budget view shows the recurring transactions expected
+
 TAGS_DICTIONARY = {
     BUDGET_TAG_NEEDS : COLOR_NEEDS_TAG,
     BUDGET_TAG_WANTS : COLOR_WANTS_TAG,
@@ -138,8 +176,25 @@ HEADER_FONT_SIZE = 16
 TITLE_FONT_SIZE = 20
 
 # Table settings
-DEFAULT_ROWS_PER_PAGE = 30
+DEFAULT_ROWS_PER_PAGE = 30     # Rows of a page when the table is paginated (see KEY_TABLE_PAGINATED)
 MAX_DESCRIPTION_LENGTH = 100
+TABLE_ROW_POOL_SIZE = 40        # Row widgets created by the VirtualTable, they are reused for every row scrolled into view
+TABLE_ROW_HEIGHT = 44           # Height in pixels of a table row, used to know how many rows fit the viewport
+TABLE_SCROLL_ROWS = 3           # Rows scrolled by one step of the mouse wheel
+TABLE_BALANCE_WEIGHT = 12       # Width of the running balance column (grid weight, like the other columns) when it is shown
+SEARCH_DEBOUNCE_MS = 150        # The search runs when the user stops typing for this long
+SEARCH_CACHE_SIZE = 32          # Results of the last searches kept, deleting characters reuses them
+SEARCH_INDEX_MIN_ROWS = 200000  # From this many rows the words typed are looked up in the full text index of the database (see DatabaseManager.search)
+SEARCH_INDEX_MIN_CHARS = 3      # and only the words of at least this many letters, the shorter prefixes match too many rows
+LOAD_CHUNK_ROWS = 2000          # Rows read from the database at a time while the table is loading
+LOAD_STEP_MS = 30               # Time spent loading before giving the main loop back to Tk, so the window keeps painting
+
+# Charts settings
+CHART_RANGES = {"3M": 92, "1Y": 366, "5Y": 1827, "All": None}   # Days shown by the range buttons of the charts, None for the whole history
+CHART_ZOOM_STEP = 0.8           # Share of the days still shown after one step of the mouse wheel (the inverse when zooming out)
+CHART_MIN_DAYS = 14             # The charts can't zoom in more than this
+CHART_BACKGROUND = "#2B2B2B"
+CHART_GRID_COLOR = "#505050"
 
 # ============================================================================
 # VALIDATION SETTINGS
@@ -154,6 +209,9 @@ MAX_TAG_LENGTH = 15           # Maximum length for tags
 # Date format
 DATE_FORMAT = "%d-%m-%Y" # Example: 31-12-2025
 
+# Month names used by the date filters, the position + 1 is the month number
+MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
 # ============================================================================
 # FILE SETTINGS
 # ============================================================================
@@ -184,6 +242,11 @@ DEFAULT_VALUE_MONTH_SELECTION = "All"
 DEFAULT_VALUE_TOTAL_SAVING = 0
 KEY_TOTAL_SAVING = "total_saving"
 
+KEY_DB_PROFILE = "db_profile"
+
+KEY_TABLE_PAGINATED = "table_paginated"     # VALUE_TRUE shows the transactions table one page of DEFAULT_ROWS_PER_PAGE rows at a time
+KEY_TABLE_BALANCE = "table_balance"         # VALUE_TRUE shows the running balance column in the transactions table
+
 VALUE_TRUE = "true"
 VALUE_FALSE = "false"
 
@@ -201,7 +264,10 @@ DEFAULT_USER_SETTINGS = {
     KEY_BUDGET_SAVING: DEFAULT_BUDGET_SAVINGS,
     KEY_DATE_SELECTION: DEFAULT_VALUE_DATE_SELECTION,
     KEY_MONTH_SELECTION: DEFAULT_VALUE_MONTH_SELECTION,
-    KEY_TOTAL_SAVING: DEFAULT_VALUE_TOTAL_SAVING
+    KEY_TOTAL_SAVING: DEFAULT_VALUE_TOTAL_SAVING,
+    KEY_DB_PROFILE: DEFAULT_DB_PROFILE,
+    KEY_TABLE_PAGINATED: VALUE_FALSE,
+    KEY_TABLE_BALANCE: VALUE_FALSE
 }
 
 # ============================================================================
@@ -223,6 +289,33 @@ KEY_SUM_INCOME = "income"
 KEY_SUM_EXPENSES= "expenses"
 KEY_SUM_BALANCE = "balance"
 
+# ============================================================================
+# Query Keys
+# ============================================================================
+
+# Sort keys accepted by DatabaseManager.query
+SORT_BY_DATE = "date"
+SORT_BY_AMOUNT = "amount"
+SORT_BY_ID = "id"
+SORT_BY_TAG = "tag"
+SORT_BY_DESCRIPTION = "description"
+
+# Search modes accepted by DatabaseManager.search, every word as a prefix or the whole text as an exact phrase
+SEARCH_PREFIX = "prefix"
+SEARCH_PHRASE = "phrase"
+
+# Sign filter, only the income (amount >= 0) or only the expenses (amount < 0)
+SIGN_INCOME = KEY_SUM_INCOME
+SIGN_EXPENSES = KEY_SUM_EXPENSES
+
+# ============================================================================
+# Bulk Load Key
+# ============================================================================
+
+KEY_LOAD_ROWS = "rows"
+KEY_LOAD_SECONDS = "seconds"
+KEY_LOAD_ROWS_PER_SECOND = "rows_per_second"
+
 # ============================================================================
 # Errors Handling
 # ====================================================================
@@ -0,0 +1 @@
+# Empty file - Tells Pythons this is a package
\ No newline at end of file
@@ -0,0 +1,58 @@
+# Aggregations over the columns of the TransactionStore: group by month, year or tag, sums, counts, min/max and percentiles
+# NumPy is optional, when it is installed the work runs in its vectorized loops, otherwise in plain Python
+# Both backends return the same Python values (amounts in integer cents, exact sums), so the views don't know which one ran
+from src.analytics import python_backend
+
+try:
+    from src.analytics import numpy_backend
+except ImportError:
+    numpy_backend = None
+
+GroupStats = python_backend.GroupStats
+
+# Divisors of the YYYYMMDD dates of the store, date // MONTH is YYYYMM and date // YEAR is YYYY
+DAY = 1
+MONTH = 100
+YEAR = 10000
+
+BACKENDS = {backend.NAME: backend for backend in (python_backend, numpy_backend) if backend is not None}
+
+_backend = numpy_backend or python_backend
+
+
+# The name of the backend used, "numpy" or "python"
+def backend_name():
+    return _backend.NAME
+
+# Force a backend by name, used by the benchmark to compare them
+def use_backend(name):
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(f"Analytics backend not available: {name}")
+    _backend = BACKENDS[name]
+
+
+# count, total, income, expenses, minimum and maximum of the amounts at positions (None means every row)
+def summarize(amounts, positions = None):
+    return _backend.summarize(amounts, positions)
+
+# keys is a list of (column, divisor) pairs, see group_by_month and the others for the common ones. Returns key -> GroupStats ordered by key
+def group_by(amounts, keys, positions = None):
+    return _backend.group_by(amounts, keys, positions)
+
+def group_by_month(dates, amounts, positions = None):
+    return group_by(amounts, [(dates, MONTH)], positions)
+
+def group_by_year(dates, amounts, positions = None):
+    return group_by(amounts, [(dates, YEAR)], positions)
+
+def group_by_tag(tag_codes, amounts, positions = None):
+    return group_by(amounts, [(tag_codes, 1)], positions)
+
+# The sorted distinct values of column // divisor, for example the years of the dates with divisor YEAR
+def distinct(column, divisor = 1, positions = None):
+    return _backend.distinct(column, divisor, positions)
+
+# The q-th percentile (0 to 100) of the values, linearly interpolated, None if there are no values
+def percentile(values, q, positions = None):
+    return _backend.percentile(values, q, positions)
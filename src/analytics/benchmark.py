@@ -0,0 +1,79 @@
+# Compare the analytics backends on generated ledgers, run from the project folder with:
+#   python -m src.analytics.benchmark [rows ...]
+# Every operation runs on both backends (when NumPy is installed), the results must be identical, the best time of a few runs is printed
+import random
+import sys
+import time
+
+from src.analytics import aggregate
+from src.models.transaction_store import TransactionStore
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+REPEATS = 3
+TAGS = ["Needs", "Wants", "Saving", "Salary", "Food", "Rent", "Travel", "Gifts"]
+
+
+# A store with rows spread over six years, amounts between -5000 and 5000 in cents
+def generate_store(rows, seed = 0):
+    generator = random.Random(seed)
+    return TransactionStore(
+        (idx, f"{generator.randint(2020, 2025)}-{generator.randint(1, 12):02d}-{generator.randint(1, 28):02d}",
+         generator.randint(-500_000, 500_000), generator.choice(TAGS), "")
+        for idx in range(1, rows + 1)
+    )
+
+
+# The operations measured, the positions are the rows a view would pass: every row alive, or the rows shown after a filter
+def operations(store):
+    alive = store.select([])
+    shown = alive[::3]
+    return {
+        "summarize": lambda: aggregate.summarize(store.amounts, shown),
+        "group by month": lambda: aggregate.group_by_month(store.dates, store.amounts, alive),
+        "group by year": lambda: aggregate.group_by_year(store.dates, store.amounts, alive),
+        "group by tag": lambda: aggregate.group_by_tag(store.tag_codes, store.amounts, alive),
+        "group by month and tag": lambda: aggregate.group_by(store.amounts, [(store.dates, aggregate.MONTH), (store.tag_codes, 1)], alive),
+        "distinct years": lambda: aggregate.distinct(store.dates, aggregate.YEAR, alive),
+        "median": lambda: aggregate.percentile(store.amounts, 50, shown),
+    }
+
+
+def best_time(function):
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def run(sizes = DEFAULT_SIZES):
+    backends = sorted(aggregate.BACKENDS)
+    previous = aggregate.backend_name()
+    print(f"{'rows':>10}  {'operation':<24}" + "".join(f"{name + ' ms':>12}" for name in backends) + ("     speedup" if len(backends) > 1 else ""))
+
+    try:
+        for rows in sizes:
+            store = generate_store(rows)
+            for name, function in operations(store).items():
+                times, results = [], []
+                for backend in backends:
+                    aggregate.use_backend(backend)
+                    elapsed, result = best_time(function)
+                    times.append(elapsed)
+                    results.append(result)
+
+                if any(result != results[0] for result in results):
+                    raise AssertionError(f"The backends disagree on '{name}' with {rows} rows")
+
+                line = f"{rows:>10}  {name:<24}" + "".join(f"{elapsed * 1000:>12.1f}" for elapsed in times)
+                if len(backends) > 1:
+                    line += f"{times[backends.index('python')] / times[backends.index('numpy')]:>11.1f}x"
+                print(line)
+    finally:
+        aggregate.use_backend(previous)
+
+
+if __name__ == "__main__":
+    run([int(size) for size in sys.argv[1:]] or DEFAULT_SIZES)
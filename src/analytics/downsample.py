@@ -0,0 +1,48 @@
+# Largest-Triangle-Three-Buckets (Sveinn Steinarsson, 2013): keep the points of a line that preserve its shape
+# The points between the first and the last are cut into buckets, from every bucket the point kept is the one that makes
+# the largest triangle with the point kept in the bucket before and the average of the bucket after, so the peaks survive
+# It is one pass over the points, a chart asks for about one point per pixel of its width
+# Plain Python on purpose: the loop is per bucket, a vectorized version would not be faster on the few thousand points of a chart
+from itertools import accumulate
+
+
+# The indexes of the points to keep, in ascending order, at most threshold of them (every point when there are fewer)
+# xs must be ascending, xs and ys are sequences of numbers of the same length
+def lttb(xs, ys, threshold):
+    count = len(xs)
+    if threshold >= count or threshold < 3:
+        return list(range(count))
+
+    # Prefix sums give the average of a bucket without adding up its points
+    sums_x = list(accumulate(xs, initial=0))
+    sums_y = list(accumulate(ys, initial=0))
+
+    # Bucket b holds the points from bounds[b] to bounds[b + 1], the last bucket (the last point) ends at count
+    every = (count - 2) / (threshold - 2)
+    bounds = [int(bucket * every) + 1 for bucket in range(threshold - 1)] + [count]
+
+    kept = [0]
+    previous = 0
+    for bucket in range(threshold - 2):
+        low, start, stop = bounds[bucket], bounds[bucket + 1], bounds[bucket + 2]
+        average_x = (sums_x[stop] - sums_x[start]) / (stop - start)
+        average_y = (sums_y[stop] - sums_y[start]) / (stop - start)
+
+        # The point of this bucket with the largest triangle (twice its area, only the comparison matters)
+        point_x = xs[previous]
+        point_y = ys[previous]
+        base_x = point_x - average_x
+        base_y = average_y - point_y
+        best_area = -1
+        best = previous
+        for index in range(low, start):
+            area = abs(base_x * (ys[index] - point_y) - (point_x - xs[index]) * base_y)
+            if area > best_area:
+                best_area = area
+                best = index
+
+        kept.append(best)
+        previous = best
+
+    kept.append(count - 1)
+    return kept
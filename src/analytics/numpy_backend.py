@@ -0,0 +1,148 @@
+# NumPy implementation of the aggregations of src.analytics.aggregate, importing this module fails when NumPy is not installed
+# The store columns are read in place through the buffer protocol, no copy of the arrays is made before selecting the positions
+# The results are converted back to Python ints, so they are the same objects the pure Python backend returns
+# No NumPy view of a column outlives a call: an array('q') that exports its buffer can't grow, and the store appends to its columns
+import numpy as np
+
+from src.analytics.python_backend import GroupStats, EMPTY_STATS, percentile_index, interpolate
+
+NAME = "numpy"
+
+
+# A store column as a NumPy array sharing its memory
+def _column(column):
+    if isinstance(column, np.ndarray):
+        return column
+    if isinstance(column, (bytes, bytearray)):
+        return np.frombuffer(column, dtype=np.uint8)
+    if hasattr(column, "itemsize") and hasattr(column, "typecode"):
+        if not len(column):
+            return np.zeros(0, dtype=np.int64)
+        return np.frombuffer(column, dtype=np.dtype(f"i{column.itemsize}"))
+    return np.asarray(column, dtype=np.int64)
+
+def _positions(positions):
+    if positions is None or isinstance(positions, np.ndarray):
+        return positions
+    if isinstance(positions, range):
+        return np.arange(positions.start, positions.stop, positions.step, dtype=np.intp)
+    if isinstance(positions, (list, tuple)):
+        return np.fromiter(positions, dtype=np.intp, count=len(positions))
+    return np.fromiter(positions, dtype=np.intp)
+
+def _rows(column, positions):
+    rows = _column(column)
+    return rows if positions is None else rows[positions]
+
+
+def summarize(values, positions = None):
+    rows = _rows(values, _positions(positions)).astype(np.int64, copy=False)
+    if not len(rows):
+        return EMPTY_STATS
+    income = int(rows[rows >= 0].sum())
+    expenses = int(rows[rows < 0].sum())
+    return GroupStats(len(rows), income + expenses, income, expenses, int(rows.min()), int(rows.max()))
+
+
+# Group keys that span at most this many values per row (plus a fixed margin) are counted in dense tables, the others are sorted
+DENSE_SPAN_PER_ROW = 4
+DENSE_SPAN_MARGIN = 1 << 16
+
+
+def group_by(values, keys, positions = None):
+    positions = _positions(positions)
+    rows = _rows(values, positions).astype(np.int64, copy=False)
+    if not len(rows):
+        return {}
+    key_columns = [(_rows(column, positions) // divisor).astype(np.int64, copy=False) for column, divisor in keys]
+
+    lows = [int(column.min()) for column in key_columns]
+    spans = [int(column.max()) - low + 1 for column, low in zip(key_columns, lows)]
+    size = 1
+    for span in spans:
+        size *= span
+
+    if size <= len(rows) * DENSE_SPAN_PER_ROW + DENSE_SPAN_MARGIN:
+        return _group_dense(rows, key_columns, lows, spans, size)
+    return _group_sorted(rows, key_columns)
+
+
+# Months, years and tags have few distinct values: every key gets a slot of a table (the key columns are the digits of the slot number)
+# and the rows are accumulated in place, without sorting them
+def _group_dense(rows, key_columns, lows, spans, size):
+    slots = np.zeros(len(rows), dtype=np.int64)
+    for column, low, span in zip(key_columns, lows, spans):
+        slots = slots * span + (column - low)
+
+    counts = np.bincount(slots, minlength=size)
+    incomes = np.zeros(size, dtype=np.int64)
+    expenses = np.zeros(size, dtype=np.int64)
+    minimums = np.full(size, np.iinfo(np.int64).max, dtype=np.int64)
+    maximums = np.full(size, np.iinfo(np.int64).min, dtype=np.int64)
+    np.add.at(incomes, slots, np.maximum(rows, 0))
+    np.add.at(expenses, slots, np.minimum(rows, 0))
+    np.minimum.at(minimums, slots, rows)
+    np.maximum.at(maximums, slots, rows)
+
+    # The slots used, in ascending order, which is also the ascending order of the keys
+    used = np.flatnonzero(counts)
+    digits = []
+    remaining = used
+    for low, span in zip(reversed(lows), reversed(spans)):
+        remaining, digit = np.divmod(remaining, span)
+        digits.append((digit + low).tolist())
+    digits.reverse()
+    group_keys = digits[0] if len(digits) == 1 else list(zip(*digits))
+
+    return {key: GroupStats(count, income + expense, income, expense, minimum, maximum)
+            for key, count, income, expense, minimum, maximum in zip(group_keys, counts[used].tolist(), incomes[used].tolist(),
+                                                                    expenses[used].tolist(), minimums[used].tolist(), maximums[used].tolist())}
+
+
+def _group_sorted(rows, key_columns):
+    # The rows are sorted by key (the first column is the primary key), every group is then a run of consecutive rows
+    order = np.lexsort(key_columns[::-1]) if len(key_columns) > 1 else np.argsort(key_columns[0], kind="stable")
+    key_columns = [column[order] for column in key_columns]
+    rows = rows[order]
+
+    starts = np.zeros(len(rows), dtype=bool)
+    starts[0] = True
+    for column in key_columns:
+        starts[1:] |= column[1:] != column[:-1]
+    starts = np.flatnonzero(starts)
+
+    counts = np.diff(np.append(starts, len(rows))).tolist()
+    incomes = np.add.reduceat(np.maximum(rows, 0), starts).tolist()
+    expenses = np.add.reduceat(np.minimum(rows, 0), starts).tolist()
+    minimums = np.minimum.reduceat(rows, starts).tolist()
+    maximums = np.maximum.reduceat(rows, starts).tolist()
+
+    group_keys = [column[starts].tolist() for column in key_columns]
+    group_keys = group_keys[0] if len(group_keys) == 1 else list(zip(*group_keys))
+
+    return {key: GroupStats(count, income + expense, income, expense, minimum, maximum)
+            for key, count, income, expense, minimum, maximum in zip(group_keys, counts, incomes, expenses, minimums, maximums)}
+
+
+def distinct(column, divisor = 1, positions = None):
+    keys = (_rows(column, _positions(positions)) // divisor).astype(np.int64, copy=False)
+    if not len(keys):
+        return []
+
+    # Like group_by, a small range of keys is counted in a table instead of sorted
+    low = int(keys.min())
+    span = int(keys.max()) - low + 1
+    if span <= len(keys) * DENSE_SPAN_PER_ROW + DENSE_SPAN_MARGIN:
+        return (np.flatnonzero(np.bincount(keys - low, minlength=span)) + low).tolist()
+    return np.unique(keys).tolist()
+
+
+def percentile(values, q, positions = None):
+    rows = _rows(values, _positions(positions))
+    if not len(rows):
+        return None
+    lower, gamma = percentile_index(len(rows), q)
+    upper = min(lower + 1, len(rows) - 1)
+    # Only the two values around the percentile need to be in their sorted place
+    ordered = np.partition(rows, (lower, upper))
+    return interpolate(int(ordered[lower]), int(ordered[upper]), gamma)
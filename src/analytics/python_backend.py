@@ -0,0 +1,97 @@
+# Pure Python implementation of the aggregations of src.analytics.aggregate, used when NumPy is not installed
+# The columns are the arrays of the TransactionStore (or any sequence of integers), positions selects the rows, None means every row
+from collections import namedtuple
+from math import floor
+
+NAME = "python"
+
+# Statistics of a group of amounts in cents: income is the sum of the positive ones, expenses the sum of the negative ones
+# minimum and maximum are None for an empty group
+GroupStats = namedtuple("GroupStats", ["count", "total", "income", "expenses", "minimum", "maximum"])
+
+EMPTY_STATS = GroupStats(0, 0, 0, 0, None, None)
+
+
+def _rows(column, positions):
+    return column if positions is None else map(column.__getitem__, positions)
+
+
+def summarize(values, positions = None):
+    count = total = income = expenses = 0
+    minimum = maximum = None
+    for value in _rows(values, positions):
+        count += 1
+        if value >= 0:
+            income += value
+        else:
+            expenses += value
+        if minimum is None or value < minimum:
+            minimum = value
+        if maximum is None or value > maximum:
+            maximum = value
+    if not count:
+        return EMPTY_STATS
+    return GroupStats(count, income + expenses, income, expenses, minimum, maximum)
+
+
+# keys is a list of (column, divisor), the key of a row is column[position] // divisor, a tuple when there is more than one column
+# Returns key -> GroupStats in ascending order of key
+def group_by(values, keys, positions = None):
+    if positions is None:
+        positions = range(len(values))
+
+    groups = {}
+    if len(keys) == 1:
+        (column, divisor), = keys
+        key_of = lambda position: column[position] // divisor
+    else:
+        key_of = lambda position: tuple(column[position] // divisor for column, divisor in keys)
+
+    for position in positions:
+        key = key_of(position)
+        value = values[position]
+        stats = groups.get(key)
+        if stats is None:
+            groups[key] = [1, value if value >= 0 else 0, value if value < 0 else 0, value, value]
+            continue
+        stats[0] += 1
+        if value >= 0:
+            stats[1] += value
+        else:
+            stats[2] += value
+        if value < stats[3]:
+            stats[3] = value
+        if value > stats[4]:
+            stats[4] = value
+
+    return {key: GroupStats(count, income + expenses, income, expenses, minimum, maximum)
+            for key, (count, income, expenses, minimum, maximum) in sorted(groups.items())}
+
+
+# The distinct values of column // divisor, sorted
+def distinct(column, divisor = 1, positions = None):
+    return sorted({value // divisor for value in _rows(column, positions)})
+
+
+# The value below which q percent of the values fall, interpolated linearly between the two closest values (like numpy.percentile)
+# None if there are no values
+def percentile(values, q, positions = None):
+    ordered = sorted(_rows(values, positions))
+    if not ordered:
+        return None
+    lower, gamma = percentile_index(len(ordered), q)
+    return interpolate(ordered[lower], ordered[min(lower + 1, len(ordered) - 1)], gamma)
+
+
+# The position in the sorted values of the percentile q of count values, and the fraction towards the next one
+# Both backends use these two functions, so they give exactly the same float
+def percentile_index(count, q):
+    virtual = (count - 1) * (q / 100)
+    lower = min(max(floor(virtual), 0), count - 1)
+    return lower, virtual - lower
+
+def interpolate(low, high, gamma):
+    difference = high - low
+    if gamma >= 0.5:
+        return float(high - difference * (1 - gamma))
+    return float(low + difference * gamma)
@@ -1,8 +1,9 @@
 # Importing the necessary libraries and view used in the application
-from config.settings import (ICONS_PATH)
+from config.settings import (ICONS_PATH, KEY_DB_PROFILE)
 from src.views.base_view import BaseView
 from src.views.home_view import HomeView
 from src.views.budget_view import BudgetView
+from src.views.charts_view import ChartsView
 from src.views.import_export_view import ImportExport
 from src.models.database import DatabaseManager 
 from src.utils.helpers import *
@@ -16,7 +17,8 @@ class DashboardController(BaseView):
         super().__init__(parent)
         self.controller = controller
         self.user = user
-        self.data = DatabaseManager()
+        self.data = DatabaseManager(self.user.read_json_value(KEY_DB_PROFILE), load_local=False)      # The HomeView table loads the transactions in chunks
+        self.data.writer.attach(self)       # The results of the background commits are delivered on the Tk thread with after()
         self.current_view = None
 
         # Create main content frame
@@ -39,6 +41,7 @@ class DashboardController(BaseView):
         self.icons = {
             HomeView: ctk.CTkImage(Image.open(os.path.join(ICONS_PATH, "home_light.png")), size=(20, 20)),
             BudgetView: ctk.CTkImage(Image.open(os.path.join(ICONS_PATH, "chat_light.png")), size=(20, 20)),
+            ChartsView: ctk.CTkImage(Image.open(os.path.join(ICONS_PATH, "chart_light.png")), size=(20, 20)),
             ImportExport: ctk.CTkImage(Image.open(os.path.join(ICONS_PATH, "imp-exp.png")), size=(20, 20)),
         }
         
@@ -46,6 +49,7 @@ class DashboardController(BaseView):
         self.views = {
             HomeView: HomeView(self.content_container, controller=self.controller, user=self.user, database=self.data),
             BudgetView: BudgetView(self.content_container, controller=self.controller, user=self.user, database=self.data),
+            ChartsView: ChartsView(self.content_container, controller=self.controller, user=self.user, database=self.data),
             ImportExport: ImportExport(self.content_container, controller=self.controller, user=self.user, database=self.data)
         }
 
@@ -64,8 +68,8 @@ class DashboardController(BaseView):
         self.navigation_frame.grid_rowconfigure(0, weight=0)  # Logo row
         self.navigation_frame.grid_rowconfigure(1, weight=0)  # Home button
         self.navigation_frame.grid_rowconfigure(2, weight=0)  # Budget button  
-        self.navigation_frame.grid_rowconfigure(3, weight=0)  # Future buttons
-        self.navigation_frame.grid_rowconfigure(4, weight=0)  # Future buttons
+        self.navigation_frame.grid_rowconfigure(3, weight=0)  # Charts button
+        self.navigation_frame.grid_rowconfigure(4, weight=0)  # Import/Export button
         self.navigation_frame.grid_rowconfigure(5, weight=1)  # Empty space
         self.navigation_frame.grid(row=0, column=0, sticky="ns")
         
@@ -89,9 +93,14 @@ class DashboardController(BaseView):
         self.budget_button.grid(row=2, column=0, sticky="ew", padx=10, pady=5)
         self.buttons[BudgetView] = self.budget_button
 
+        # Charts button
+        self.charts_button = self.__create_button(frame =self.navigation_frame, text = "Charts", istance = ChartsView,)
+        self.charts_button.grid(row=3, column=0, sticky="ew", padx=10, pady=5)
+        self.buttons[ChartsView] = self.charts_button
+
         # Import Export Button
         self.import_export_btn = self.__create_button(frame =self.navigation_frame, text = "Import/Export", istance = ImportExport,)
-        self.import_export_btn.grid(row=3, column=0, sticky="ew", padx=10, pady=5)
+        self.import_export_btn.grid(row=4, column=0, sticky="ew", padx=10, pady=5)
         self.buttons[ImportExport] = self.import_export_btn
 
     # Function to create a generic button for the sidebar
@@ -152,8 +161,14 @@ class DashboardController(BaseView):
         if view_class == BudgetView:
             self.views[BudgetView].update_data_and_recalculate()
 
+        # When switching to ChartsView, the daily totals are brought up to date and drawn
+        if view_class == ChartsView:
+            self.views[ChartsView].update_data_and_redraw()
+
         if view_class == HomeView:
             self.views[HomeView].change_message_home_view("Welcome to Expensia", "#FFFFFF")
 
+    # The HomeView commits the pending changes and waits for them, then the database is closed
     def on_closure(self):
-        self.views[HomeView].on_closure()
\ No newline at end of file
+        self.views[HomeView].on_closure()
+        self.data.close()
\ No newline at end of file
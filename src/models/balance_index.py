@@ -0,0 +1,169 @@
+from array import array
+
+from src.analytics import aggregate
+from src.models.transaction_store import date_to_int
+
+# Prefix sums of the amounts of the local store by date, to answer "balance at the end of a day" without adding up the whole history
+# The days are the cells of a Fenwick tree (binary indexed tree): a query and the change of one row both cost O(log days)
+# A year has 12 * 31 cells, the impossible days stay at zero, so the cell of a date is simple arithmetic on YYYYMMDD
+# There is one tree for the whole ledger and one for every tag asked at least once, the trees follow the same protocol as the BudgetEngine:
+# rows appended to the store are added when a balance is asked, edits and deletes call discard(position) before the change and insert(position) after
+# A date outside the years covered, or a load of the store, makes the trees be built again at the next request
+
+DAYS_PER_MONTH = 31
+DAYS_PER_YEAR = 12 * DAYS_PER_MONTH
+YEARS_MARGIN = 1        # Years added after the last one, so the new transactions of the next months don't rebuild the trees
+
+
+class FenwickTree:
+    # values is the list of the starting value of every cell, the tree is built in O(cells)
+    def __init__(self, values):
+        tree = array("q", [0])
+        tree.extend(values)
+        for index in range(1, len(tree)):
+            parent = index + (index & -index)
+            if parent < len(tree):
+                tree[parent] += tree[index]
+        self.tree = tree
+
+    def add(self, cell, delta):
+        tree = self.tree
+        index = cell + 1
+        while index < len(tree):
+            tree[index] += delta
+            index += index & -index
+
+    # Sum of the cells from 0 to cell included
+    def prefix(self, cell):
+        tree = self.tree
+        total = 0
+        index = cell + 1
+        while index > 0:
+            total += tree[index]
+            index -= index & -index
+        return total
+
+
+class BalanceIndex:
+    def __init__(self, store):
+        self.store = store
+        self._total = None              # FenwickTree of every row, None when the trees must be built again
+        self._tags = {}                 # tag code -> FenwickTree of the rows with that tag
+        self._first_year = 0
+        self._years = 0
+        self._generation = store.generation
+        self._slots = 0                 # Positions of the store already in the trees
+
+    # =============================================================================
+    # Queries
+    # =============================================================================
+
+    # The balance in cents at the end of a day (YYYYMMDD integer or 'YYYY-MM-DD' text), of the whole ledger or of the rows with one tag
+    # None for the date 0 of the store, the rows without an ISO date have no day in the balance
+    def balance(self, date, tag = None):
+        if date == 0:
+            return None
+
+        tree = self._tree(tag)
+        if tree is None:
+            return 0
+
+        if isinstance(date, str):
+            date = date_to_int(date)
+            if date is None:
+                raise ValueError("The date must be a day of the calendar in the 'YYYY-MM-DD' format")
+        elif not 1 <= date // 100 % 100 <= 12 or not 1 <= date % 100 <= DAYS_PER_MONTH:
+            raise ValueError("The date must be a YYYYMMDD integer with a month from 1 to 12 and a day from 1 to 31")
+
+        year = date // 10000
+        if year < self._first_year:
+            return 0
+        if year >= self._first_year + self._years:
+            return tree.prefix(self._years * DAYS_PER_YEAR - 1)
+        return tree.prefix(self._cell(date))
+
+    # The balance in cents at the end of a month, for example the savings accumulated up to that month with the tag of the savings
+    def balance_at_month_end(self, year, month, tag = None):
+        return self.balance(year * 10000 + month * 100 + DAYS_PER_MONTH, tag)
+
+    # The balance of the whole history, of the whole ledger or of one tag
+    def total(self, tag = None):
+        tree = self._tree(tag)
+        return 0 if tree is None else tree.prefix(self._years * DAYS_PER_YEAR - 1)
+
+    # The tree of a tag is built the first time it is asked, None if no row has that tag
+    def _tree(self, tag):
+        self._sync()
+        if tag is None:
+            return self._total
+
+        code = self.store.tag_code(tag)
+        if code is None:
+            return None
+        tree = self._tags.get(code)
+        if tree is None:
+            tree = self._tags[code] = self._build_tree(self.store.select([self.store.tag_mask([tag])]))
+        return tree
+
+    def _cell(self, date):
+        return ((date // 10000 - self._first_year) * 12 + date // 100 % 100 - 1) * DAYS_PER_MONTH + date % 100 - 1
+
+    # =============================================================================
+    # Changes of the rows
+    # =============================================================================
+
+    def discard(self, position):
+        self._apply(position, -1)
+
+    def insert(self, position):
+        self._apply(position, 1)
+
+    # Add (direction 1) or remove (direction -1) the amount of a row alive already counted by the trees
+    def _apply(self, position, direction):
+        store = self.store
+        if self._total is None or self._generation != store.generation or position >= self._slots or not store.alive[position]:
+            return
+
+        date = store.dates[position]
+        if not date:
+            return                      # Dates that are not ISO dates or not days of the calendar (0) are not part of the balance
+        if not self._first_year <= date // 10000 < self._first_year + self._years:
+            self._total = None          # The years covered must grow, everything is built again at the next request
+            return
+
+        cell = self._cell(date)
+        delta = store.amounts[position] * direction
+        self._total.add(cell, delta)
+        tree = self._tags.get(store.tag_codes[position])
+        if tree is not None:
+            tree.add(cell, delta)
+
+    # Bring the trees in line with the store: build them after a load or when the years changed, add the rows appended since the last request
+    def _sync(self):
+        store = self.store
+        if self._total is not None and self._generation == store.generation:
+            for position in range(self._slots, store.slots):
+                self._slots = position + 1
+                self._apply(position, 1)
+                if self._total is None:
+                    break
+        if self._total is not None and self._generation == store.generation:
+            return
+
+        self._generation = store.generation
+        self._slots = store.slots
+        self._tags = {}
+
+        positions = store.select([])
+        years = [year for year in aggregate.distinct(store.dates, aggregate.YEAR, positions) if year]
+        self._first_year = years[0] if years else 0
+        self._years = years[-1] - self._first_year + 1 + YEARS_MARGIN if years else 1
+        self._total = self._build_tree(positions)
+
+    # A tree with the amounts of the given positions, grouped by day
+    def _build_tree(self, positions):
+        cells = [0] * (self._years * DAYS_PER_YEAR)
+        for date, stats in aggregate.group_by(self.store.amounts, [(self.store.dates, aggregate.DAY)], positions).items():
+            if date:
+                cells[self._cell(date)] += stats.total
+        return FenwickTree(cells)
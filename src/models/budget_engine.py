@@ -0,0 +1,127 @@
+from config.settings import (BUDGET_TAG_NEEDS, BUDGET_TAG_WANTS, BUDGET_TAG_SAVING, BUDGET_TAG_SALARY,
+                             KEY_SUM_TRANSACTIONS, KEY_SUM_INCOME, KEY_SUM_EXPENSES, KEY_SUM_BALANCE)
+from src.analytics import aggregate
+from src.models.transaction_store import date_to_int
+from src.utils.helpers import from_cents
+
+# The totals of the budget tags (Needs, Wants, Saving, Salary) of every month, they include the changes of the local store not saved yet
+# The first request starts from the committed totals of the database (the monthly_rollup table), the months that can differ from the database
+# (a row changed, added or with a date the store can't read) are computed from the local store. Without committed totals (the store is still loading)
+# every month is computed in one pass over the rows with a budget tag. Then each month is kept until a row of that month changes
+# The views that change rows in place call touch(position) before and after the change, only the months touched are computed again
+# The rows appended to the store are added to their month when the totals are asked, a load of the store throws everything away
+
+BUDGET_TAGS = (BUDGET_TAG_NEEDS, BUDGET_TAG_WANTS, BUDGET_TAG_SAVING, BUDGET_TAG_SALARY)
+
+
+class BudgetEngine:
+    # committed is a function returning the rollup rows (year_month 'YYYY-MM', tag, income cents, expenses cents, count) of the budget tags,
+    # or None when they can't be used
+    def __init__(self, store, committed = None):
+        self.store = store
+        self.committed = committed
+        self._months = None             # YYYYMM -> {tag: [income cents, expenses cents, count]}, None until the first request
+        self._dirty = set()             # Months with a row changed since they were computed, or since the load before the first request
+        self._generation = store.generation
+        self._slots = 0                 # Positions of the store already counted
+
+    # =============================================================================
+    # Totals
+    # =============================================================================
+
+    # Totals of the budget tags of a month, tag -> summary dictionary (like DatabaseManager.tag_totals), the tags without rows are zero
+    def month(self, year, month):
+        self._sync()
+        totals = self._months.get(year * 100 + month, {})
+        return {tag: self._summary(*totals.get(tag, (0, 0, 0))) for tag in BUDGET_TAGS}
+
+    # The twelve months of a year, January first
+    def year(self, year):
+        return [self.month(year, month) for month in range(1, 13)]
+
+    # The years with at least one row with a budget tag, the rows without an ISO date (month 0) have no year
+    def years(self):
+        self._sync()
+        return sorted({year_month // 100 for year_month in self._months if year_month})
+
+    @staticmethod
+    def _summary(income, expenses, count):
+        return {
+            KEY_SUM_TRANSACTIONS: count,
+            KEY_SUM_INCOME: from_cents(income),
+            KEY_SUM_EXPENSES: from_cents(expenses),
+            KEY_SUM_BALANCE: from_cents(income + expenses)
+        }
+
+    # =============================================================================
+    # Changes of the rows
+    # =============================================================================
+
+    # The row at position is about to change or just changed, its month is computed again at the next request
+    # An edit that moves a row to another month calls it before and after, so both months are refreshed
+    # Before the first request the months are recorded too, the committed totals of those months are not the ones of the store anymore
+    def touch(self, position):
+        if self._generation != self.store.generation:
+            self._reset()
+        if self._months is None or position < self._slots:
+            self._dirty.add(self.store.dates[position] // 100)
+
+    def _reset(self):
+        self._generation = self.store.generation
+        self._months = None
+        self._dirty.clear()
+
+    # Bring the cached months in line with the store
+    def _sync(self):
+        store = self.store
+        if self._generation != store.generation:
+            self._reset()
+        if self._months is None:
+            self._months = {}
+            self._slots = 0
+            committed = self.committed() if self.committed is not None else None
+            if committed is not None:
+                self._add_committed(committed)
+
+        if self._slots < store.slots:
+            self._add_rows(self._slots, store.slots)
+            self._slots = store.slots
+
+        for year_month in self._dirty:
+            self._months.pop(year_month, None)
+            year, month = divmod(year_month, 100)
+            self._add_positions(self.store.select([self.store.period_mask(year, month), self.store.tag_mask(BUDGET_TAGS)]))
+        self._dirty.clear()
+
+    # Start from the committed totals, the months that can differ from the database are left to the store: the months changed since the load,
+    # the ones of the rows added locally and the ones where the database counts a date the store can't read (the rollup groups by its text)
+    def _add_committed(self, committed):
+        store = self.store
+        local = {store.dates[position] // 100 for position in store.local_positions()}
+        for _, text in store.odd_dates():
+            date = date_to_int(f"{text[:7]}-01")
+            if date is not None:
+                local.add(date // 100)
+        self._dirty |= local
+
+        for year_month, tag, income, expenses, count in committed:
+            date = date_to_int(f"{year_month}-01")
+            if date is not None and date // 100 not in self._dirty:
+                self._months.setdefault(date // 100, {})[tag] = [income, expenses, count]
+        self._slots = store.slots
+
+    # Count the rows alive with a budget tag among the positions [start, stop), a grouped pass by month and tag
+    def _add_rows(self, start, stop):
+        store = self.store
+        mask = bytearray(start) + store.tag_mask(BUDGET_TAGS, start, stop)
+        self._add_positions(store.select([mask]))
+
+    def _add_positions(self, positions):
+        store = self.store
+        groups = aggregate.group_by(store.amounts, [(store.dates, aggregate.MONTH), (store.tag_codes, 1)], positions)
+
+        for (year_month, tag_code), stats in groups.items():
+            totals = self._months.setdefault(year_month, {}).setdefault(store.tag_names[tag_code], [0, 0, 0])
+            totals[0] += stats.income
+            totals[1] += stats.expenses
+            totals[2] += stats.count
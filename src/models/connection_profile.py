@@ -0,0 +1,46 @@
+import sqlite3
+
+from config.settings import DB_CONNECTION_PROFILES, DEFAULT_DB_PROFILE
+
+# The pragmas that a connection profile can set, in the order they are applied
+PROFILE_PRAGMAS = ("journal_mode", "synchronous", "cache_size", "mmap_size", "temp_store")
+
+# Accepted values of the text pragmas, the values are written inside the PRAGMA statement so everything else is refused
+ALLOWED_PRAGMA_VALUES = {
+    "journal_mode": {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"},
+    "synchronous": {"OFF", "NORMAL", "FULL", "EXTRA"},
+    "temp_store": {"DEFAULT", "FILE", "MEMORY"},
+}
+
+
+# Return the pragmas of the profile with the given name, an unknown name falls back to the default profile
+def get_profile(profile_name = None):
+    return DB_CONNECTION_PROFILES.get(profile_name, DB_CONNECTION_PROFILES[DEFAULT_DB_PROFILE])
+
+
+def _pragma_value(pragma, value):
+    if pragma in ALLOWED_PRAGMA_VALUES:
+        value = str(value).upper()
+        if value not in ALLOWED_PRAGMA_VALUES[pragma]:
+            raise ValueError(f"Invalid value '{value}' for PRAGMA {pragma}")
+        return value
+    return int(value)
+
+
+# Apply the pragmas of the profile to an open connection
+def apply_profile(conn, profile):
+    for pragma in PROFILE_PRAGMAS:
+        if pragma in profile:
+            conn.execute(f"PRAGMA {pragma} = {_pragma_value(pragma, profile[pragma])}")
+
+
+# Read back the value SQLite is actually using for every profile pragma, a pragma can be ignored (for example WAL on a read only folder)
+def effective_pragmas(conn):
+    return {pragma: conn.execute(f"PRAGMA {pragma}").fetchone()[0] for pragma in PROFILE_PRAGMAS}
+
+
+# Open a connection to the database and tune it with the given profile
+def connect(path, profile_name = None, **kwargs):
+    conn = sqlite3.connect(path, **kwargs)
+    apply_profile(conn, get_profile(profile_name))
+    return conn
@@ -0,0 +1,85 @@
+from array import array
+from collections import namedtuple
+from datetime import date as Date
+
+from src.analytics import aggregate
+
+# Income and expenses of every day of the local store, and the balance at the end of every day, for the charts
+# Like the BudgetEngine the days are computed once, then only the months with a row changed (touch) are computed again,
+# the rows appended to the store are added at the next request and a load of the store throws everything away
+# The series are kept until something changes, so redrawing a chart doesn't read the rows
+
+# Columns of the same length, one entry for every day with at least one row, in date order
+#   days      array('l')  the day as an ordinal (days since year 1), so the distance between two days is a subtraction
+#   dates     array('l')  the day as YYYYMMDD
+#   income    array('q')  sum of the positive amounts of the day, cents
+#   expenses  array('q')  sum of the negative amounts of the day, cents (negative)
+#   balance   array('q')  sum of every amount up to the end of the day, cents
+DailySeries = namedtuple("DailySeries", "days dates income expenses balance")
+
+
+class DailyTotals:
+    def __init__(self, store):
+        self.store = store
+        self._days = None               # YYYYMMDD -> [income cents, expenses cents], None until the first request
+        self._dirty = set()             # Months (YYYYMM) with a row changed since they were computed
+        self._series = None
+        self._generation = store.generation
+        self._slots = 0
+
+    # The DailySeries of the whole ledger
+    def series(self):
+        self._sync()
+        if self._series is None:
+            self._series = self._build_series()
+        return self._series
+
+    # The row at position is about to change or just changed, its month is computed again at the next request
+    def touch(self, position):
+        if self._days is not None and position < self._slots:
+            self._dirty.add(self.store.dates[position] // 100)
+            self._series = None
+
+    def _sync(self):
+        store = self.store
+        if self._days is None or self._generation != store.generation:
+            self._generation = store.generation
+            self._days = {}
+            self._dirty.clear()
+            self._slots = 0
+            self._series = None
+
+        if self._slots < store.slots:
+            self._add_positions(store.select([bytearray(self._slots) + bytearray(b"\x01") * (store.slots - self._slots)]))
+            self._slots = store.slots
+            self._series = None
+
+        for year_month in self._dirty:
+            for day in range(year_month * 100 + 1, year_month * 100 + 32):
+                self._days.pop(day, None)
+            year, month = divmod(year_month, 100)
+            self._add_positions(store.select([store.period_mask(year, month)]))
+        self._dirty.clear()
+
+    def _add_positions(self, positions):
+        for date, stats in aggregate.group_by(self.store.amounts, [(self.store.dates, aggregate.DAY)], positions).items():
+            totals = self._days.setdefault(date, [0, 0])
+            totals[0] += stats.income
+            totals[1] += stats.expenses
+
+    def _build_series(self):
+        series = DailySeries(array("l"), array("l"), array("q"), array("q"), array("q"))
+        balance = 0
+        for date in sorted(self._days):
+            income, expenses = self._days[date]
+            try:
+                day = Date(date // 10000, date // 100 % 100, date % 100).toordinal()
+            except ValueError:
+                continue                # Dates that are not ISO dates (0) or not in the calendar are not on the time axis
+            balance += income + expenses
+            series.days.append(day)
+            series.dates.append(date)
+            series.income.append(income)
+            series.expenses.append(expenses)
+            series.balance.append(balance)
+        return series
@@ -1,34 +1,188 @@
 import datetime
+import re
 import sqlite3
+import time
 
-from config.settings import DATABASE_PATH
+from config.settings import (DATABASE_PATH, DB_ACTION_ADD, DB_ACTION_DELETE, DB_ACTION_EDIT,
+                             KEY_LOAD_ROWS, KEY_LOAD_SECONDS, KEY_LOAD_ROWS_PER_SECOND,
+                             KEY_SUM_TRANSACTIONS, KEY_SUM_INCOME, KEY_SUM_EXPENSES, KEY_SUM_BALANCE, MONTH_NAMES,
+                             SORT_BY_DATE, SORT_BY_AMOUNT, SORT_BY_ID, SORT_BY_TAG, SORT_BY_DESCRIPTION, SIGN_INCOME, SIGN_EXPENSES,
+                             SEARCH_PREFIX, SEARCH_PHRASE, LOAD_CHUNK_ROWS)
+from src.models.balance_index import BalanceIndex
+from src.models.budget_engine import BudgetEngine, BUDGET_TAGS
+from src.models.recurring_engine import RecurringEngine
+from src.models.connection_profile import connect, effective_pragmas
+from src.models.daily_totals import DailyTotals
+from src.models.database_writer import DatabaseWriter
+from src.models.migrations import MIGRATIONS, rebuild_derived_tables, has_full_text_index
+from src.models.transaction_store import TransactionStore
+from src.utils.helpers import normalize_date, to_cents, from_cents
 
-# Convert a date string from 'YYYY-MM-DD' format to 'DD/MM/YYYY' format.
+# Today's date in the 'YYYY-MM-DD' format used by the rest of the database
 def norm_today():
-    date = str(datetime.date.today())
-    return f'{date[8:10]}/{date[5:7]}/{date[:4]}'
+    return str(datetime.date.today())
+
+# Fill the missing fields of a transaction with the default values used by every write
+# The date is normalized to 'YYYY-MM-DD' and the amount rounded to the cents stored in the database, so the local copy matches what is saved
+def with_defaults(date = None, amount = None, tag = None, description = None):
+    if date is None:
+        date = norm_today()  # default dinamico per la data
+    if amount is None:
+        amount = 0
+    if tag is None:
+        tag = "None"
+    if description is None:
+        description = ""
+    return normalize_date(date), from_cents(to_cents(amount)), tag, description
+
+# The values of a transaction as they are written in the database, with the amount in integer cents
+def db_values(date, amount, tag, description):
+    return date, to_cents(amount), tag, description
+
+# Split a queue of operations by action, adds are [(position in the queue, values)], edits [(database ID, values)] and deletes [database ID]
+def group_operations(operations):
+    adds, edits, deletes = [], [], []
+    for position, operation in enumerate(operations):
+        if operation["action"] == DB_ACTION_ADD:
+            adds.append((position, with_defaults(operation["date"], operation["amount"], operation["tag"], operation["desc"])))
+        elif operation["action"] == DB_ACTION_EDIT:
+            edits.append((operation["db_idx"], with_defaults(operation["date"], operation["amount"], operation["tag"], operation["desc"])))
+        elif operation["action"] == DB_ACTION_DELETE:
+            deletes.append(operation["db_idx"])
+    return adds, edits, deletes
+
+# The database ID of idx, a negative idx is the temporary ID of a row added locally (see TransactionStore.temporary_id)
+# temporary_ids maps the temporary IDs already written to the ID the database gave them
+def resolve_id(idx, temporary_ids):
+    if idx is None or idx >= 0:
+        return idx
+    if idx not in temporary_ids:
+        raise ValueError(f"The row with temporary ID {idx} was never saved")
+    return temporary_ids[idx]
+
+# Write a queue of operations with the given cursor, without committing, so the caller decides the transaction
+# Every group is written with executemany in the order adds, edits, deletes, inside a group the queue order is kept,
+# so the last edit of a row wins and a delete always wins over an edit
+# An add can carry the temporary ID of its row in "db_idx", the ID it receives is recorded in temporary_ids,
+# so edits and deletes queued with the temporary ID (here or in a later call with the same dictionary) reach the right row
+# Returns a list aligned with operations: the new database ID for adds, the target ID for edits and deletes
+def write_operations(cursor, operations, temporary_ids = None):
+    if temporary_ids is None:
+        temporary_ids = {}
+    adds, edits, deletes = group_operations(operations)
+    results = [operation.get("db_idx") for operation in operations]
+
+    if adds:
+        cursor.executemany("INSERT INTO transactions (Date, Amount, Tag, Description) VALUES (?,?,?,?)",
+                           [db_values(*values) for _, values in adds])
+        # Inside one transaction AUTOINCREMENT hands out consecutive IDs, so the last one is enough to find all of them
+        last_id = cursor.execute("SELECT last_insert_rowid()").fetchone()[0]
+        for offset, (position, _) in enumerate(adds):
+            new_id = last_id - len(adds) + 1 + offset
+            if results[position] is not None:
+                temporary_ids[results[position]] = new_id
+            results[position] = new_id
+
+    for position, operation in enumerate(operations):
+        if operation["action"] != DB_ACTION_ADD:
+            results[position] = resolve_id(results[position], temporary_ids)
+
+    if edits:
+        cursor.executemany("UPDATE transactions SET Date = ?, Amount = ?, Tag = ?, Description = ? WHERE ID = ?",
+                           [(*db_values(*values), resolve_id(idx, temporary_ids)) for idx, values in edits])
+
+    if deletes:
+        cursor.executemany("DELETE FROM transactions WHERE ID = ?", [(resolve_id(idx, temporary_ids),) for idx in deletes])
+
+    return results
+
+# Columns that query() can sort by, every sort ends with the ID so rows with the same value keep a stable order
+SORT_COLUMNS = {
+    SORT_BY_DATE: "Date",
+    SORT_BY_AMOUNT: "Amount",
+    SORT_BY_ID: "ID",
+    SORT_BY_TAG: "Tag",
+    SORT_BY_DESCRIPTION: "Description",
+}
+
+# Month number as the two digits used in the dates, the month can be given as 3, "03" or "Mar"
+def month_number(month):
+    if month in MONTH_NAMES:
+        return f"{MONTH_NAMES.index(month) + 1:02d}"
+    return f"{int(month):02d}"
+
+# Escape the LIKE wildcards, so the text typed by the user is matched literally
+def escape_like(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
 
 
 class DatabaseManager:
-    def __init__(self):
-        # Connessione al Database
-        self.conn = sqlite3.connect(DATABASE_PATH)
+    # load_local = False leaves the local store empty, the caller fills it with load_local_chunks() without blocking the GUI
+    def __init__(self, profile_name = None, load_local = True):
+        # Connessione al Database, tuned with the connection profile chosen in the user settings (see DB_CONNECTION_PROFILES)
+        self.profile_name = profile_name
+        self.conn = connect(DATABASE_PATH, profile_name)
         self.cursor = self.conn.cursor()
-        self.local_db = []                                      # Altering the db is expensive, better to pass it on a list and save it on the database every now and than
-  
-        self.cursor.execute(
-            '''CREATE TABLE IF NOT EXISTS transactions (
-                ID INTEGER PRIMARY KEY AUTOINCREMENT,
-                Date TEXT,
-                Amount FLOAT,
-                Tag TEXT,
-                Description TEXT
-            )'''
-        )
-        self.conn.commit()
-        
-        self.update_local()                      # At the start of the bject, the databse is copied in a list of list
+        self.local_db = TransactionStore()                      # Altering the db is expensive, better to keep a local columnar copy and save it on the database every now and than
+        self.budget = BudgetEngine(self.local_db, self.budget_rollup)   # Budget totals of every month of the local copy, computed once and kept per month
+        self.balance = BalanceIndex(self.local_db)                      # Prefix sums by date of the local copy, for the balance at any day
+        self.recurring = RecurringEngine(self.local_db)                 # Rent, subscriptions and salary found in the local copy, and their next occurrences
+        self.daily = DailyTotals(self.local_db)                         # Income, expenses and balance of every day of the local copy, for the charts
+
+        self.migrate()                           # Create the table or upgrade an older database file to the current schema
+        self.full_text_search = has_full_text_index(self.cursor)    # False when SQLite was built without FTS5, search() falls back to LIKE
+
+        # Thread with its own connection that commits the queued changes in the background (see apply_batch_async)
+        self.writer = DatabaseWriter(DATABASE_PATH, profile_name, write_operations)
+        self.writer.start()
+
+        self.local_loaded = False
+        if load_local:
+            self.update_local()                  # At the start of the bject, the databse is copied in the local store
+
+
+    # Run the schema migrations that the database file has not seen yet, the reached version is saved in PRAGMA user_version
+    # Every migration runs in its own transaction, if it fails the file is left at the previous version
+    def migrate(self):
+        self.cursor.execute("PRAGMA user_version")
+        version = self.cursor.fetchone()[0]
+
+        for target_version, migration in enumerate(MIGRATIONS, start=1):
+            if version >= target_version:
+                continue
+
+            self.cursor.execute("BEGIN")
+            try:
+                migration(self.cursor)
+                self.cursor.execute(f"PRAGMA user_version = {target_version}")
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
 
+    # The pragmas SQLite is actually using on this connection, useful to check that the profile was applied
+    def effective_pragmas(self):
+        return effective_pragmas(self.conn)
+
+    def print_pragmas(self):
+        for pragma, value in self.effective_pragmas().items():
+            print(f"{pragma} = {value}")
+
+    # Copy the database into another file with the SQLite backup API, unlike a file copy it also includes the changes still in the WAL file
+    def backup_to(self, path):
+        target = sqlite3.connect(path)
+        try:
+            self.conn.backup(target)
+        finally:
+            target.close()
+
+    # Close the connection, the writer thread first commits everything still queued
+    # PRAGMA optimize lets SQLite refresh the statistics of the indexes used during the session
+    def close(self):
+        self.writer.stop()
+        self.conn.commit()
+        self.cursor.execute("PRAGMA optimize")
+        self.conn.close()
 
     def print_db(self):
         self.cursor.execute("SELECT * FROM transactions")
@@ -45,62 +199,342 @@ class DatabaseManager:
         for row in rows:
             print(" | ".join(str(cell) for cell in row))
 
-    # Update the list with all database entries
+    # Full resync of the local store with all database entries, the store object is refilled in place so the views holding a reference see the new rows
+    # The single row writes below patch self.local_db directly, so this is needed only after bulk changes made outside this class
     def update_local(self):
-        self.local_db = []
-        self.cursor.execute('''SELECT * FROM transactions''')
-        for t in self.cursor.fetchall():
-            self.local_db.append([t[0], t[1], t[2], t[3], t[4]])
+        self.cursor.execute('''SELECT ID, Date, Amount, Tag, Description FROM transactions ORDER BY ID''')
+        self.local_db.load(self.cursor)
+        self.local_loaded = True
+
+    # Same as update_local, but a generator that loads chunk_size rows every time it is resumed and yields (rows loaded, total rows)
+    # It has its own cursor, so the other queries can run between two chunks
+    def load_local_chunks(self, chunk_size = LOAD_CHUNK_ROWS):
+        self.local_loaded = False
+        self.local_db.load(())
+
+        cursor = self.conn.cursor()
+        try:
+            total = cursor.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+            cursor.execute('''SELECT ID, Date, Amount, Tag, Description FROM transactions ORDER BY ID''')
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                self.local_db.extend(rows)
+                yield self.local_db.slots, max(total, self.local_db.slots)
+        finally:
+            cursor.close()
 
-    def update_db(self):
-        self.cursor.execute("DELETE FROM transactions")
-        for row in self.local_db:
-            self.add_transaction(date = row[0], amount = row[1], tag = row[2], description = row[3])
+        self.local_loaded = True
+
+    # Replace the whole table with the given rows, every row is formatted as [date, amount, tag, desc] like the csv files used for import and export
+    # Everything runs in one transaction with a single executemany, the indexes and triggers are dropped during the load and rebuilt once at the end (drop_indexes)
+    # Without the triggers the derived tables (monthly_rollup) are recomputed in a single pass after the load
+    # Returns a dictionary with the number of rows loaded, the seconds spent and the rows per second
+    def update_db(self, rows, drop_indexes = True):
+        start = time.perf_counter()
+
+        with self.conn:
+            self.cursor.execute("BEGIN")            # Explicit, so the index drop and rebuild are part of the same transaction
+            schema_objects = []
+            if drop_indexes:
+                self.cursor.execute("SELECT type, name, sql FROM sqlite_master WHERE type IN ('index', 'trigger') AND tbl_name = 'transactions' AND sql IS NOT NULL")
+                schema_objects = self.cursor.fetchall()
+                for object_type, name, _ in schema_objects:
+                    self.cursor.execute(f'DROP {object_type.upper()} "{name}"')
+
+            self.cursor.execute("DELETE FROM transactions")
+            self.cursor.executemany("INSERT INTO transactions (Date, Amount, Tag, Description) VALUES (?,?,?,?)",
+                                    (db_values(*with_defaults(*row[:4])) for row in rows))
+            loaded = self.cursor.rowcount
+
+            for _, _, sql in schema_objects:
+                self.cursor.execute(sql)
+
+            if drop_indexes:
+                rebuild_derived_tables(self.cursor)
+
+        self.update_local()
+
+        seconds = time.perf_counter() - start
+        return {
+            KEY_LOAD_ROWS: loaded,
+            KEY_LOAD_SECONDS: seconds,
+            KEY_LOAD_ROWS_PER_SECOND: loaded / seconds if seconds > 0 else float(loaded)
+        }
 
-    
     def add_transaction(self, date = None, amount = None, tag = None, description = None):
-        if date is None:
-            date = norm_today()  # default dinamico per la data
-
-        if amount is None:
-            amount = 0
-    
-        if tag is None:
-            tag = "None"
-            
-        if description is None:
-            description = ""
-
-        self.cursor.execute("INSERT INTO transactions (Date, Amount, Tag, Description) VALUES (?,?,?,?)",(date, amount, tag, description))
+        date, amount, tag, description = with_defaults(date, amount, tag, description)
+
+        self.cursor.execute("INSERT INTO transactions (Date, Amount, Tag, Description) VALUES (?,?,?,?)", db_values(date, amount, tag, description))
         self.conn.commit()
-        self.update_local()
+
+        # AUTOINCREMENT ids only grow, so appending keeps the local store ordered by ID
+        self.local_db.append(self.cursor.lastrowid, date, amount, tag, description)
+        return self.cursor.lastrowid
 
     def edit_transaction(self, idx, date=None, amount=None, tag=None, description=None):
-        if date is None:
-            date = norm_today()  # default dinamico per la data
-        if amount is None:
-            amount = 0
-        if tag is None:
-            tag = "None"
-        if description is None:
-            description = ""
+        date, amount, tag, description = with_defaults(date, amount, tag, description)
 
         # Sintassi corretta per UPDATE
         self.cursor.execute(
             "UPDATE transactions SET Date = ?, Amount = ?, Tag = ?, Description = ? WHERE ID = ?",
-            (date, amount, tag, description, idx)
+            (*db_values(date, amount, tag, description), idx)
         )
         self.conn.commit()
-        self.update_local()
+
+        self._update_local_row(idx, date, amount, tag, description)
 
     def remove_transaction(self, id : int):
         self.cursor.execute("DELETE FROM transactions WHERE ID = ?",(id,))
 
         self.conn.commit()
-        self.update_local()
-        
-    
+
+        self._remove_local_row(id)
+
+    # Change a row of the local store in place
+    def _update_local_row(self, idx, date, amount, tag, description):
+        position = self.local_db.position_of(idx)
+        if position is not None:
+            self.row_changing(position)
+            self.local_db.update_at(position, date, amount, tag, description)
+            self.row_changed(position)
+
+    def _remove_local_row(self, idx):
+        position = self.local_db.position_of(idx)
+        if position is not None:
+            self.row_changing(position)
+            self.local_db.remove_at(position)
+            self.row_changed(position)
+
+    # Whoever edits or removes a row of the local store in place calls row_changing before and row_changed after,
+    # the indexes derived from the store (budget months, balances, daily totals) drop the old values of the row and take the new ones
+    # The rows appended to the store don't need it, the indexes find them by themselves
+    def row_changing(self, position):
+        self.budget.touch(position)
+        self.balance.discard(position)
+        self.daily.touch(position)
+
+    def row_changed(self, position):
+        self.budget.touch(position)
+        self.balance.insert(position)
+        self.daily.touch(position)
+        self.recurring.touch()
+
+    # Apply a whole queue of operations (the dictionaries built by VirtualTable.save_db_modification) inside a single transaction
+    # There is one commit and one local update for the whole queue, see write_operations for the details
+    # Returns a list aligned with operations: the new database ID for adds, the target ID for edits and deletes
+    def apply_batch(self, operations):
+        # The connection context manager commits once at the end, or rolls back everything if one statement fails
+        with self.conn:
+            results = write_operations(self.cursor, operations)
+
+        self.apply_local_batch(operations, results)
+        return results
+
+    # Same as apply_batch, but the writes run on the background writer thread so the GUI doesn't wait for the commit
+    # on_done(results) or on_error(exception) are called later on the Tk thread, the local store is patched just before on_done
+    # sync_local = False is for callers that already changed the local store themselves, like the VirtualTable
+    def apply_batch_async(self, operations, on_done = None, on_error = None, sync_local = True):
+        operations = list(operations)
+
+        def _done(results):
+            if sync_local:
+                self.apply_local_batch(operations, results)
+            if on_done is not None:
+                on_done(results)
+
+        self.writer.submit(operations, _done, on_error)
+
+    # Patch the local store with a batch already written in the database, results is the list returned by write_operations
+    def apply_local_batch(self, operations, results):
+        adds, edits, deletes = group_operations(operations)
+
+        # The temporary IDs of the batch are replaced by the database IDs they received
+        saved_ids = {operation["db_idx"]: result for operation, result in zip(operations, results) if operation.get("db_idx") is not None}
+
+        for position, values in adds:
+            self.local_db.append(results[position], *values)
+
+        for idx, values in edits:
+            self._update_local_row(saved_ids.get(idx, idx), *values)
+
+        for idx in deletes:
+            self._remove_local_row(saved_ids.get(idx, idx))
+
+    # =============================================================================
+    # Filtered queries
+    # =============================================================================
+
+    # Build the WHERE clause of query() and its parameters, the date filters are written as ranges on Date so they use idx_transactions_date
+    def _where_clause(self, year = None, month = None, sign = None, tags = None, text = None):
+        conditions = []
+        params = []
+
+        year = None if year == "All" else year
+        month = None if month == "All" else month
+
+        if year is not None and month is not None:
+            first_day = f"{int(year):04d}-{month_number(month)}-01"
+            next_year, next_month = (int(year) + 1, 1) if month_number(month) == "12" else (int(year), int(month_number(month)) + 1)
+            conditions.append("Date >= ? AND Date < ?")
+            params += [first_day, f"{next_year:04d}-{next_month:02d}-01"]
+        elif year is not None:
+            conditions.append("Date >= ? AND Date < ?")
+            params += [f"{int(year):04d}-01-01", f"{int(year) + 1:04d}-01-01"]
+        elif month is not None:
+            conditions.append("substr(Date, 6, 2) = ?")
+            params.append(month_number(month))
+
+        if sign == SIGN_INCOME:
+            conditions.append("Amount >= 0")
+        elif sign == SIGN_EXPENSES:
+            conditions.append("Amount < 0")
+
+        if tags:
+            tags = list(tags)
+            conditions.append(f"Tag IN ({', '.join('?' for _ in tags)})")
+            params += tags
+
+        if text:
+            pattern = f"%{escape_like(text)}%"
+            conditions.append("(Description LIKE ? ESCAPE '\\' OR Tag LIKE ? ESCAPE '\\' OR Date LIKE ? ESCAPE '\\')")
+            params += [pattern, pattern, pattern]
+
+        where = (" WHERE " + " AND ".join(conditions)) if conditions else ""
+        return where, params
+
+    # Filter, sort and page the transactions in SQL, so a view can ask only for the rows it shows
+    # year/month use the same values of the "Dates" filters ("All" or None means no filter), sign is SIGN_INCOME or SIGN_EXPENSES,
+    # tags is a collection of tags and text is matched (case insensitive) in description, tag and date
+    # Returns the rows of the page as [database_index, date, amount, tag, desc] lists and the number of rows matching the filters
+    def query(self, year = None, month = None, sign = None, tags = None, text = None,
+              sort_key = SORT_BY_DATE, descending = False, offset = 0, limit = None):
+        if sort_key not in SORT_COLUMNS:
+            raise ValueError(f"Unknown sort key '{sort_key}'")
+
+        where, params = self._where_clause(year, month, sign, tags, text)
+        direction = "DESC" if descending else "ASC"
+        order = f" ORDER BY {SORT_COLUMNS[sort_key]} {direction}"
+        if sort_key != SORT_BY_ID:
+            order += f", ID {direction}"
+
+        # LIMIT -1 means no limit in SQLite, so an offset alone still works
+        page = " LIMIT ? OFFSET ?" if limit is not None or offset else ""
+        page_params = [limit if limit is not None else -1, offset] if page else []
+
+        self.cursor.execute(f"SELECT ID, Date, Amount, Tag, Description FROM transactions{where}{order}{page}", params + page_params)
+        rows = [[idx, date, from_cents(cents), tag, description] for idx, date, cents, tag, description in self.cursor.fetchall()]
+
+        self.cursor.execute(f"SELECT COUNT(*) FROM transactions{where}", params)
+        total = self.cursor.fetchone()[0]
+
+        return rows, total
+
+    # =============================================================================
+    # Full text search
+    # =============================================================================
+
+    # Search the transactions by description and tag, returns the matching IDs, the best matches first
+    # SEARCH_PREFIX matches every word typed as the start of a word ("gro sto" finds "Grocery store"), SEARCH_PHRASE matches the words in that exact order
+    # With FTS5 the results are ranked with bm25, without it every word is matched as a substring with LIKE and the newest rows come first
+    def search(self, text, mode = SEARCH_PREFIX, limit = None):
+        words = re.findall(r"\w+", text.lower())
+        if not words:
+            return []
+
+        limit_clause = " LIMIT ?" if limit is not None else ""
+        limit_params = [limit] if limit is not None else []
+
+        if self.full_text_search:
+            if mode == SEARCH_PHRASE:
+                match = '"' + " ".join(words) + '"'
+            else:
+                match = " ".join(f'"{word}"*' for word in words)
+
+            self.cursor.execute(
+                f"SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH ? ORDER BY bm25(transactions_fts){limit_clause}",
+                [match] + limit_params
+            )
+            return [row[0] for row in self.cursor.fetchall()]
+
+        if mode == SEARCH_PHRASE:
+            words = [" ".join(words)]
+
+        conditions = " AND ".join("(Description LIKE ? ESCAPE '\\' OR Tag LIKE ? ESCAPE '\\')" for _ in words)
+        params = []
+        for word in words:
+            params += [f"%{escape_like(word)}%"] * 2
+
+        self.cursor.execute(f"SELECT ID FROM transactions WHERE {conditions} ORDER BY ID DESC{limit_clause}", params + limit_params)
+        return [row[0] for row in self.cursor.fetchall()]
+
+    # =============================================================================
+    # Monthly rollup queries
+    # =============================================================================
+
+    # The monthly_rollup table is kept updated by triggers, so these queries read O(months x tags) rows instead of the whole transactions table
+
+    @staticmethod
+    def _summary(income, expenses, count):
+        return {
+            KEY_SUM_TRANSACTIONS: count or 0,
+            KEY_SUM_INCOME: from_cents(income or 0),
+            KEY_SUM_EXPENSES: from_cents(expenses or 0),
+            KEY_SUM_BALANCE: from_cents((income or 0) + (expenses or 0))
+        }
+
+    # The rollup rows (year_month, tag, income, expenses, count) of the budget tags, the committed totals the BudgetEngine starts from
+    # None while the local store is loading, the engine can't tell yet which rows differ from the database
+    def budget_rollup(self):
+        if not self.local_loaded:
+            return None
+        self.cursor.execute(f"SELECT year_month, tag, income, expenses, count FROM monthly_rollup WHERE tag IN ({', '.join('?' * len(BUDGET_TAGS))})", BUDGET_TAGS)
+        return self.cursor.fetchall()
+
+    # Totals of every month ('YYYY-MM' -> summary dictionary), optionally only the months of one year
+    def month_totals(self, year = None):
+        query = "SELECT year_month, SUM(income), SUM(expenses), SUM(count) FROM monthly_rollup"
+        params = ()
+        if year is not None:
+            query += " WHERE year_month BETWEEN ? AND ?"
+            params = (f"{year}-01", f"{year}-12")
+        query += " GROUP BY year_month ORDER BY year_month"
+
+        self.cursor.execute(query, params)
+        return {year_month: self._summary(income, expenses, count) for year_month, income, expenses, count in self.cursor.fetchall()}
+
+    # Totals of every tag (tag -> summary dictionary) in one month 'YYYY-MM', or in all the months when year_month is None
+    def tag_totals(self, year_month = None):
+        query = "SELECT tag, SUM(income), SUM(expenses), SUM(count) FROM monthly_rollup"
+        params = ()
+        if year_month is not None:
+            query += " WHERE year_month = ?"
+            params = (year_month,)
+        query += " GROUP BY tag"
+
+        self.cursor.execute(query, params)
+        return {tag: self._summary(income, expenses, count) for tag, income, expenses, count in self.cursor.fetchall()}
+
+    # Totals for a year and/or a month number, the same values used by the "Dates" filters ("All" or None means no filter)
+    def period_totals(self, year = None, month = None):
+        conditions = []
+        params = []
+        if year not in (None, "All"):
+            conditions.append("substr(year_month, 1, 4) = ?")
+            params.append(str(year))
+        if month not in (None, "All"):
+            conditions.append("substr(year_month, 6, 2) = ?")
+            params.append(month_number(month))
+
+        query = "SELECT SUM(income), SUM(expenses), SUM(count) FROM monthly_rollup"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+
+        self.cursor.execute(query, params)
+        return self._summary(*self.cursor.fetchone())
+
     def print_trans(self):
-        print(self.local_db)
+        print([row.as_list() for row in self.local_db])
 
 
@@ -0,0 +1,175 @@
+import queue
+import threading
+
+from src.models.connection_profile import connect
+
+# Background thread that owns a second connection to the database and does all the slow writes, so the Tk main loop never waits for a commit
+# The GUI submits batches of operations, the thread commits them and posts the outcome back in an events queue
+# The events are delivered on the Tk thread with after(), the callbacks can touch widgets and the local store safely
+
+
+# Default interval in ms between two checks of the events queue from the Tk thread
+POLL_INTERVAL = 50
+
+# A batch of operations waiting for the writer, on_done(results) or on_error(exception) are called on the Tk thread
+class WriteJob:
+    __slots__ = ("operations", "on_done", "on_error")
+
+    def __init__(self, operations, on_done = None, on_error = None):
+        self.operations = operations
+        self.on_done = on_done
+        self.on_error = on_error
+
+
+class DatabaseWriter(threading.Thread):
+    # write_function(cursor, operations, temporary_ids) writes one batch without committing and returns its results (see database.write_operations)
+    def __init__(self, path, profile_name = None, write_function = None):
+        super().__init__(name = "DatabaseWriter", daemon = True)
+        self.path = path
+        self.profile_name = profile_name
+        self.write_function = write_function
+
+        self.jobs = queue.Queue()       # WriteJob, threading.Event for flush() or None to stop the thread
+        self.events = queue.Queue()     # (callback, argument) ready to be called on the Tk thread
+        self.widget = None
+        self.poll_interval = POLL_INTERVAL
+        self._after_id = None
+
+        # temporary ID -> database ID of the rows added so far, a batch can edit or delete a row whose add is in an earlier batch
+        # The jobs are written in the order they are submitted, so the add of a row is always committed before its other changes
+        self.temporary_ids = {}
+
+    # =============================================================================
+    # Tk thread side
+    # =============================================================================
+
+    # Queue a batch of operations, it returns immediately
+    def submit(self, operations, on_done = None, on_error = None):
+        if not self.is_alive():
+            raise RuntimeError("The database writer is not running")
+        self.jobs.put(WriteJob(operations, on_done, on_error))
+
+    # Deliver the events on the Tk thread, the widget is only used for its after() method
+    def attach(self, widget, interval = POLL_INTERVAL):
+        self.widget = widget
+        self.poll_interval = interval
+        self._schedule()
+
+    def _schedule(self):
+        if self.widget is not None:
+            self._after_id = self.widget.after(self.poll_interval, self._poll)
+
+    def _poll(self):
+        self.dispatch()
+        self._schedule()
+
+    # Call the callbacks of the finished jobs, on the calling thread
+    def dispatch(self):
+        while True:
+            try:
+                callback, argument = self.events.get_nowait()
+            except queue.Empty:
+                return
+            callback(argument)
+
+    # Wait until every job submitted so far is committed, then deliver their events on the calling thread
+    # Returns False if the timeout expired before the writer was done
+    def flush(self, timeout = None):
+        if self.is_alive():
+            done = threading.Event()
+            self.jobs.put(done)
+            if not done.wait(timeout):
+                return False
+        self.dispatch()
+        return True
+
+    # Flush the queue and stop the thread, used when the application closes
+    def stop(self, timeout = None):
+        flushed = self.flush(timeout)
+
+        if self.widget is not None and self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+        self.widget = None
+
+        if self.is_alive():
+            self.jobs.put(None)
+            self.join(timeout)
+        return flushed
+
+    # =============================================================================
+    # Writer thread side
+    # =============================================================================
+
+    def run(self):
+        conn = connect(self.path, self.profile_name)
+        try:
+            while True:
+                item = self.jobs.get()
+                if item is None:
+                    return
+
+                # Group commit: everything already waiting in the queue is written in the same transaction
+                jobs, markers, stop = [], [], False
+                while True:
+                    if item is None:
+                        stop = True
+                    elif isinstance(item, threading.Event):
+                        markers.append(item)
+                    else:
+                        jobs.append(item)
+
+                    try:
+                        item = self.jobs.get_nowait()
+                    except queue.Empty:
+                        break
+
+                if jobs:
+                    self._write(conn, jobs)
+
+                # The flush markers are released only after the jobs queued before them are committed
+                for marker in markers:
+                    marker.set()
+
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    def _write(self, conn, jobs):
+        try:
+            results = self._commit(conn, jobs)
+        except Exception:
+            # A job of the group failed and the whole transaction was rolled back,
+            # every job is tried again on its own so only the broken one reports the error
+            for job in jobs:
+                try:
+                    results = self._commit(conn, [job])
+                except Exception as error:
+                    self._post(job.on_error, error)
+                else:
+                    self._post(job.on_done, results[0])
+            return
+
+        for job, job_results in zip(jobs, results):
+            self._post(job.on_done, job_results)
+
+    # Write the jobs in a single transaction, returns the results of every job
+    # The temporary IDs are recorded on a copy, the IDs of a transaction rolled back are never kept
+    def _commit(self, conn, jobs):
+        cursor = conn.cursor()
+        temporary_ids = dict(self.temporary_ids)
+        try:
+            cursor.execute("BEGIN")
+            results = [self.write_function(cursor, job.operations, temporary_ids) for job in jobs]
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+        self.temporary_ids = temporary_ids
+        return results
+
+    def _post(self, callback, argument):
+        if callback is not None:
+            self.events.put((callback, argument))
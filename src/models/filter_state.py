@@ -0,0 +1,172 @@
+# The filters of the transactions table, every dimension (period, sign, tags, search text) is independent
+# Each active dimension keeps its mask over the store (see TransactionStore filters), the rows shown are the intersection of the masks
+# Changing one dimension only rebuilds the mask of that dimension, the others are reused, so the result doesn't depend on the order of the changes
+# The search text keeps the masks of the last texts searched: deleting characters finds them again, typing more narrows the rows of a shorter text
+# On a big table a word can be looked up in the full text index of the database instead (index_search), it matches the words of the
+# descriptions and tags that start with it. The index has the committed text, so the rows changed or added since the load are checked here
+from itertools import compress
+
+from config.settings import SEARCH_CACHE_SIZE, SEARCH_INDEX_MIN_CHARS
+
+
+FILTER_PERIOD = "period"
+FILTER_SIGN = "sign"
+FILTER_TAGS = "tags"
+FILTER_TEXT = "text"
+
+# A search narrows the result of a shorter text only if that result has less than 1 / NARROW_FRACTION of the rows
+NARROW_FRACTION = 4
+
+
+class FilterState:
+    # index_search(text) returns the IDs of the rows whose description or tag has a word starting with text, or None when the index can't be used
+    def __init__(self, store, amount_suffix = "", index_search = None):
+        self.store = store
+        self.amount_suffix = amount_suffix      # The currency sign shown after the amounts, the search text can contain it
+        self.index_search = index_search
+
+        self.year = None
+        self.month = None
+        self.sign = None
+        self.tags = None
+        self.text = ""
+
+        self._masks = {}                        # dimension -> mask, only for the active dimensions already computed
+        self._text_masks = {}                   # lower case search text -> mask, the most recent last
+        self._changed = set()                   # Positions changed in place since the load, the index of the database can be behind on them
+        self._generation = store.generation
+
+    # =============================================================================
+    # Dimensions
+    # =============================================================================
+
+    # Year and month as integers, None means any
+    def set_period(self, year = None, month = None):
+        if (year, month) != (self.year, self.month):
+            self.year, self.month = year, month
+            self._masks.pop(FILTER_PERIOD, None)
+
+    # SIGN_INCOME, SIGN_EXPENSES or None
+    def set_sign(self, sign = None):
+        if sign != self.sign:
+            self.sign = sign
+            self._masks.pop(FILTER_SIGN, None)
+
+    # A collection of tags, None or empty means any tag
+    def set_tags(self, tags = None):
+        tags = frozenset(tags) if tags else None
+        if tags != self.tags:
+            self.tags = tags
+            self._masks.pop(FILTER_TAGS, None)
+
+    def set_text(self, text = ""):
+        if text != self.text:
+            self.text = text
+            self._masks.pop(FILTER_TEXT, None)
+
+    # The mask of a search text, from the cache or narrowing the mask of the longest cached text it contains
+    def _text_mask(self, start, stop):
+        # Only the whole mask is cached, the slices for adds and edits are computed directly
+        if start != 0 or stop is not None:
+            return self.store.search_mask(self.text, self.amount_suffix, start, stop)
+
+        text = self.text.lower()
+        mask = self._text_masks.pop(text, None)
+
+        if mask is None:
+            base = max((cached for cached in self._text_masks if cached in text), key = len, default = None)
+            base_mask = self._text_masks.get(base)
+
+            # Narrowing checks the rows one by one, when the shorter text matched many rows the column search is faster
+            if base_mask is None or base_mask.count(1) > len(base_mask) // NARROW_FRACTION:
+                ids = self.index_search(text) if self._indexed(text) else None
+                mask = self.store.search_mask(text, self.amount_suffix) if ids is None else self._index_mask(text, ids)
+            else:
+                mask = bytearray(len(base_mask))
+                for position in self.store.search_within(text, list(compress(range(len(base_mask)), base_mask)), self.amount_suffix):
+                    mask[position] = 1
+
+        # The text used now goes at the end, the oldest ones are dropped
+        self._text_masks[text] = mask
+        while len(self._text_masks) > SEARCH_CACHE_SIZE:
+            del self._text_masks[next(iter(self._text_masks))]
+        return mask
+
+    # A text of letters can only be in a tag or a description (the dates and amounts are digits, signs and the currency), the index can find it
+    def _indexed(self, text):
+        return (self.index_search is not None and len(text) >= SEARCH_INDEX_MIN_CHARS and text.isalpha()
+                and not set(text) <= set(self.amount_suffix.lower()))
+
+    # The rows found by the index, the rows changed or added since the load are searched in the store like without the index
+    def _index_mask(self, text, ids):
+        mask = self.store.id_mask(ids)
+        for position in self._changed.union(self.store.local_positions()):
+            mask[position:position + 1] = self.store.search_mask(text, self.amount_suffix, position, position + 1)
+        return mask
+
+    def reset(self):
+        self.set_period()
+        self.set_sign()
+        self.set_tags()
+        self.set_text()
+
+    # The builder of the mask of every active dimension, a function (start, stop) -> mask of that slice of positions
+    def _builders(self):
+        store = self.store
+        builders = {}
+        if self.year is not None or self.month is not None:
+            builders[FILTER_PERIOD] = lambda start, stop: store.period_mask(self.year, self.month, start, stop)
+        if self.sign is not None:
+            builders[FILTER_SIGN] = lambda start, stop: store.sign_mask(self.sign, start, stop)
+        if self.tags:
+            builders[FILTER_TAGS] = lambda start, stop: store.tag_mask(self.tags, start, stop)
+        if self.text:
+            builders[FILTER_TEXT] = self._text_mask
+        return builders
+
+    # =============================================================================
+    # Result
+    # =============================================================================
+
+    # The positions of the rows that pass every filter, in position order
+    def positions(self):
+        self._sync()
+
+        masks = []
+        for dimension, build in self._builders().items():
+            mask = self._masks.get(dimension)
+            if mask is None:
+                mask = self._masks[dimension] = build(0, None)
+            masks.append(mask)
+        return self.store.select(masks)
+
+    # The row at position changed, only its byte of every cached mask is computed again
+    def refresh(self, position):
+        self._changed.add(position)
+        builders = self._builders()
+        for dimension, mask in self._masks.items():
+            if position < len(mask) and dimension != FILTER_TEXT:
+                mask[position:position + 1] = builders[dimension](position, position + 1)
+
+        for text, mask in self._text_masks.items():
+            if position < len(mask):
+                mask[position:position + 1] = self.store.search_mask(text, self.amount_suffix, position, position + 1)
+
+    # Keep the cached masks in line with the store: a load invalidates them, the rows added since they were built are appended
+    def _sync(self):
+        if self._generation != self.store.generation:
+            self._generation = self.store.generation
+            self._masks.clear()
+            self._text_masks.clear()
+            self._changed.clear()
+            return
+
+        slots = self.store.slots
+        builders = self._builders()
+        for dimension, mask in self._masks.items():
+            if len(mask) < slots and dimension != FILTER_TEXT:
+                mask.extend(builders[dimension](len(mask), slots))
+
+        for text, mask in self._text_masks.items():
+            if len(mask) < slots:
+                mask.extend(self.store.search_mask(text, self.amount_suffix, len(mask), slots))
@@ -0,0 +1,184 @@
+import sqlite3
+
+from src.utils.helpers import normalize_date, to_cents
+
+# Schema migrations of the transactions database
+# Every function upgrades the schema by one version, the version reached is the position in MIGRATIONS + 1 and it is saved in PRAGMA user_version
+# The DatabaseManager runs the missing ones at startup, so an old database file is upgraded in place the first time it is opened
+
+
+def _table_exists(cursor, name):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+    return cursor.fetchone() is not None
+
+
+# Version 1: ISO dates, amounts in integer cents and indexes on date and tag
+# The first version of the table stored dates as free text (mixed 'YYYY-MM-DD' and 'DD/MM/YYYY') and amounts as FLOAT
+def migration_typed_schema(cursor):
+    cursor.execute(
+        '''CREATE TABLE transactions_typed (
+            ID INTEGER PRIMARY KEY AUTOINCREMENT,
+            Date TEXT NOT NULL,
+            Amount INTEGER NOT NULL,
+            Tag TEXT NOT NULL DEFAULT 'None',
+            Description TEXT NOT NULL DEFAULT ''
+        )'''
+    )
+
+    if _table_exists(cursor, "transactions"):
+        cursor.execute("SELECT ID, Date, Amount, Tag, Description FROM transactions")
+        rows = cursor.fetchall()
+        cursor.executemany(
+            "INSERT INTO transactions_typed (ID, Date, Amount, Tag, Description) VALUES (?,?,?,?,?)",
+            ((idx, normalize_date(date), to_cents(amount or 0), tag if tag is not None else "None", desc if desc is not None else "")
+             for idx, date, amount, tag, desc in rows)
+        )
+
+        # Keep the AUTOINCREMENT counter, so the IDs of rows deleted in the past are never used again
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'transactions'")
+        sequence = cursor.fetchone()
+        cursor.execute("DROP TABLE transactions")
+    else:
+        sequence = None
+
+    cursor.execute("ALTER TABLE transactions_typed RENAME TO transactions")
+
+    if sequence is not None:
+        cursor.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'transactions'", (sequence[0],))
+        if cursor.rowcount == 0:
+            cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('transactions', ?)", (sequence[0],))
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (Date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_tag ON transactions (Tag)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_date_tag ON transactions (Date, Tag)")
+
+
+# Version 2: monthly_rollup table, kept up to date by triggers on transactions, with the totals of every (month, tag) pair
+# income is the sum of the positive amounts and expenses the sum of the negative ones, both in cents
+def migration_monthly_rollup(cursor):
+    cursor.execute(
+        '''CREATE TABLE IF NOT EXISTS monthly_rollup (
+            year_month TEXT NOT NULL,
+            tag TEXT NOT NULL,
+            income INTEGER NOT NULL DEFAULT 0,
+            expenses INTEGER NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (year_month, tag)
+        ) WITHOUT ROWID'''
+    )
+
+    cursor.execute(
+        '''CREATE TRIGGER IF NOT EXISTS trg_rollup_insert AFTER INSERT ON transactions BEGIN
+            INSERT INTO monthly_rollup (year_month, tag, income, expenses, count)
+            VALUES (substr(NEW.Date, 1, 7), NEW.Tag, MAX(NEW.Amount, 0), MIN(NEW.Amount, 0), 1)
+            ON CONFLICT (year_month, tag) DO UPDATE SET
+                income = income + excluded.income,
+                expenses = expenses + excluded.expenses,
+                count = count + 1;
+        END'''
+    )
+
+    cursor.execute(
+        '''CREATE TRIGGER IF NOT EXISTS trg_rollup_delete AFTER DELETE ON transactions BEGIN
+            UPDATE monthly_rollup SET
+                income = income - MAX(OLD.Amount, 0),
+                expenses = expenses - MIN(OLD.Amount, 0),
+                count = count - 1
+            WHERE year_month = substr(OLD.Date, 1, 7) AND tag = OLD.Tag;
+            DELETE FROM monthly_rollup WHERE year_month = substr(OLD.Date, 1, 7) AND tag = OLD.Tag AND count <= 0;
+        END'''
+    )
+
+    cursor.execute(
+        '''CREATE TRIGGER IF NOT EXISTS trg_rollup_update AFTER UPDATE OF Date, Amount, Tag ON transactions BEGIN
+            UPDATE monthly_rollup SET
+                income = income - MAX(OLD.Amount, 0),
+                expenses = expenses - MIN(OLD.Amount, 0),
+                count = count - 1
+            WHERE year_month = substr(OLD.Date, 1, 7) AND tag = OLD.Tag;
+            DELETE FROM monthly_rollup WHERE year_month = substr(OLD.Date, 1, 7) AND tag = OLD.Tag AND count <= 0;
+            INSERT INTO monthly_rollup (year_month, tag, income, expenses, count)
+            VALUES (substr(NEW.Date, 1, 7), NEW.Tag, MAX(NEW.Amount, 0), MIN(NEW.Amount, 0), 1)
+            ON CONFLICT (year_month, tag) DO UPDATE SET
+                income = income + excluded.income,
+                expenses = expenses + excluded.expenses,
+                count = count + 1;
+        END'''
+    )
+
+    backfill_monthly_rollup(cursor)
+
+
+# Recompute the whole rollup from the transactions table, used once by the migration and after a bulk load made without triggers
+def backfill_monthly_rollup(cursor):
+    cursor.execute("DELETE FROM monthly_rollup")
+    cursor.execute(
+        '''INSERT INTO monthly_rollup (year_month, tag, income, expenses, count)
+           SELECT substr(Date, 1, 7), Tag, SUM(MAX(Amount, 0)), SUM(MIN(Amount, 0)), COUNT(*)
+           FROM transactions
+           GROUP BY substr(Date, 1, 7), Tag'''
+    )
+
+
+# Version 3: FTS5 full text index over Description and Tag, an external content table that reads the text from transactions
+# The triggers keep it in sync, if this SQLite build has no FTS5 the migration does nothing and the searches use LIKE instead
+def migration_full_text_search(cursor):
+    try:
+        cursor.execute(
+            '''CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+                Description,
+                Tag,
+                content = 'transactions',
+                content_rowid = 'ID',
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            )'''
+        )
+    except sqlite3.OperationalError:
+        return
+
+    cursor.execute(
+        '''CREATE TRIGGER IF NOT EXISTS trg_fts_insert AFTER INSERT ON transactions BEGIN
+            INSERT INTO transactions_fts (rowid, Description, Tag) VALUES (NEW.ID, NEW.Description, NEW.Tag);
+        END'''
+    )
+
+    cursor.execute(
+        '''CREATE TRIGGER IF NOT EXISTS trg_fts_delete AFTER DELETE ON transactions BEGIN
+            INSERT INTO transactions_fts (transactions_fts, rowid, Description, Tag) VALUES ('delete', OLD.ID, OLD.Description, OLD.Tag);
+        END'''
+    )
+
+    cursor.execute(
+        '''CREATE TRIGGER IF NOT EXISTS trg_fts_update AFTER UPDATE OF Description, Tag ON transactions BEGIN
+            INSERT INTO transactions_fts (transactions_fts, rowid, Description, Tag) VALUES ('delete', OLD.ID, OLD.Description, OLD.Tag);
+            INSERT INTO transactions_fts (rowid, Description, Tag) VALUES (NEW.ID, NEW.Description, NEW.Tag);
+        END'''
+    )
+
+    rebuild_full_text_index(cursor)
+
+
+def has_full_text_index(cursor):
+    return _table_exists(cursor, "transactions_fts")
+
+
+# Rebuild the full text index from the content of transactions
+def rebuild_full_text_index(cursor):
+    if has_full_text_index(cursor):
+        cursor.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+
+
+# Rebuild every table derived from transactions, the bulk load drops the triggers that keep them updated and calls this at the end
+def rebuild_derived_tables(cursor):
+    backfill_monthly_rollup(cursor)
+    rebuild_full_text_index(cursor)
+
+
+MIGRATIONS = [
+    migration_typed_schema,
+    migration_monthly_rollup,
+    migration_full_text_search,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
@@ -0,0 +1,229 @@
+from collections import namedtuple, defaultdict
+from datetime import date as Date
+from calendar import monthrange
+from itertools import compress
+from operator import itemgetter
+import re
+
+# Finds the transactions that repeat (rent, subscriptions, salary) and projects them in the next months
+# The detection is a batch pass over the local store, without comparing rows in pairs:
+#   1. every row goes in a bucket by normalised description, tag and sign (a dictionary, so hashing)
+#   2. the rows of a bucket are sorted by amount and cut where the amount grows more than AMOUNT_TOLERANCE, a cut is a candidate series
+#   3. the dates of a candidate are sorted, the days between them must match one of the PERIODS for most of the intervals
+# A change of the rows makes the series be detected again at the next request, the views that change rows in place call touch()
+
+Period = namedtuple("Period", "name days months tolerance")     # months is 0 for the periods counted in days, tolerance in days
+
+PERIODS = (
+    Period("Weekly", 7, 0, 1),
+    Period("Biweekly", 14, 0, 2),
+    Period("Monthly", 30.44, 1, 3),
+    Period("Quarterly", 91.31, 3, 7),
+    Period("Yearly", 365.25, 12, 10),
+)
+
+MIN_OCCURRENCES = 3         # Rows needed before a candidate can be a series
+REGULAR_SHARE = 0.75        # Share of the intervals that must match the period
+AMOUNT_TOLERANCE = 0.05     # Amounts within 5% of the smallest one of a series are the same amount (a bill that changes a little)
+AMOUNT_MARGIN = 100         # and always within 1.00, for the small amounts
+ACTIVE_PERIODS = 2          # A series with no row in the last two periods of the ledger has ended, it is not projected
+
+# description: the description of the last row of the series, amount: the median amount in cents
+# first and last: the dates of the first and last row as YYYYMMDD integers, day: the day of the month the monthly periods fall on
+RecurringSeries = namedtuple("RecurringSeries", "description tag period amount count first last day")
+
+
+# Lower case, without numbers and punctuation, so "Netflix 03/2024" and "NETFLIX - 04/2024" are the same description
+_NOT_LETTERS = re.compile(r"[\W\d_]+")
+
+def normalize_description(text):
+    return " ".join(_NOT_LETTERS.sub(" ", text.lower()).split())
+
+
+class RecurringEngine:
+    def __init__(self, store):
+        self.store = store
+        self._series = None             # The series found, None until the first request or after a change
+        self._last_date = 0             # Most recent date of the ledger when the series were found
+        self._generation = store.generation
+        self._slots = 0
+
+    # =============================================================================
+    # Series
+    # =============================================================================
+
+    # Every series found, the largest amounts first
+    def series(self):
+        self._sync()
+        return self._series
+
+    # The series still going at the end of the ledger
+    def active_series(self):
+        self._sync()
+        end = _ordinal(self._last_date)
+        active = []
+        for series in self._series:
+            period = _period(series)
+            if end - _ordinal(series.last) <= period.days * ACTIVE_PERIODS + period.tolerance:
+                active.append(series)
+        return active
+
+    # A row was changed in place, the series are found again at the next request
+    def touch(self):
+        self._series = None
+
+    # =============================================================================
+    # Projection
+    # =============================================================================
+
+    # The occurrences expected in the months after the last date of the ledger, up to months ahead
+    # YYYYMM -> list of (date YYYYMMDD, series), in date order
+    def projection(self, months):
+        self._sync()
+        if not self._last_date:
+            return {}
+
+        year, month = _add_months(self._last_date // 100, months)
+        until = year * 10000 + month * 100 + 31
+
+        projected = {}
+        for series in self.active_series():
+            for date in _occurrences(series, self._last_date, until):
+                projected.setdefault(date // 100, []).append((date, series))
+        for occurrences in projected.values():
+            occurrences.sort(key=lambda occurrence: occurrence[0])
+        return projected
+
+    # Occurrences expected in one month, empty for the months of the ledger and the ones too far ahead
+    # The series are only found (again after a change) for the months that a projection covers
+    def month(self, year, month, months):
+        if year * 100 + month not in self.projected_months(months):
+            return []
+        return self.projection(months).get(year * 100 + month, [])
+
+    # The months (YYYYMM) a projection up to months ahead covers: the month of the last date of the ledger and the next ones
+    # Only the dates are read, the series are not found
+    def projected_months(self, months):
+        last = max(compress(self.store.dates, self.store.alive), default = 0)       # The rows without an ISO date are 0
+        if not last:
+            return []
+        return [year * 100 + month for year, month in (_add_months(last // 100, step) for step in range(months + 1))]
+
+    # =============================================================================
+    # Detection
+    # =============================================================================
+
+    def _sync(self):
+        store = self.store
+        if self._series is not None and self._generation == store.generation and self._slots == store.slots:
+            return
+        self._generation = store.generation
+        self._slots = store.slots
+        self._series = self._detect()
+
+    def _detect(self):
+        store = self.store
+        keys = [normalize_description(text) for text in store.descriptions]
+
+        # The day number of every distinct date, the rows without an ISO date (0) or with a day not in the calendar are left out
+        ordinals = {date: _ordinal(date) for date in set(compress(store.dates, store.alive)) if date}
+        ordinals = {date: ordinal for date, ordinal in ordinals.items() if ordinal is not None}
+        self._last_date = max(ordinals, default=0)
+
+        # 1. Buckets by description, tag and sign, a zero amount can't be part of a series
+        buckets = defaultdict(list)
+        for date, amount, tag_code, desc_code in compress(zip(store.dates, store.amounts, store.tag_codes, store.desc_codes), store.alive):
+            if amount and date in ordinals:
+                buckets[keys[desc_code], tag_code, amount > 0].append((abs(amount), ordinals[date], desc_code, date))
+
+        found = []
+        for (_, tag_code, income), rows in buckets.items():
+            if len(rows) < MIN_OCCURRENCES:
+                continue
+
+            # 2. Runs of close amounts
+            rows.sort(key=_AMOUNT)
+            start = 0
+            for index in range(1, len(rows) + 1):
+                if index == len(rows) or rows[index][0] > rows[start][0] * (1 + AMOUNT_TOLERANCE) + AMOUNT_MARGIN:
+                    if index - start >= MIN_OCCURRENCES:
+                        series = self._periodic(rows[start:index], store.tag_names[tag_code], income)
+                        if series is not None:
+                            found.append(series)
+                    start = index
+
+        found.sort(key=lambda series: (-abs(series.amount), series.first))
+        return found
+
+    # 3. The series of a run of rows, None if the dates are not regular
+    def _periodic(self, rows, tag, income):
+        # Rows too close to each other for the shortest period are rejected before sorting them (the daily purchases of a shop)
+        days = [row[1] for row in rows]
+        shortest = PERIODS[0]
+        if max(days) - min(days) < REGULAR_SHARE * (len(rows) - 1) * (shortest.days - shortest.tolerance):
+            return None
+
+        rows.sort(key=_DAY)
+        days = [row[1] for row in rows]
+        intervals = sorted(following - previous for previous, following in zip(days, days[1:]))
+        median = intervals[len(intervals) // 2]
+
+        for period in PERIODS:
+            if abs(median - period.days) <= period.tolerance:
+                regular = sum(1 for interval in intervals if abs(interval - period.days) <= period.tolerance)
+                if regular >= REGULAR_SHARE * len(intervals):
+                    amounts = sorted(row[0] for row in rows)
+                    amount = amounts[len(amounts) // 2]
+                    first, last = rows[0][3], rows[-1][3]
+                    return RecurringSeries(self.store.descriptions[rows[-1][2]], tag, period.name,
+                                           amount if income else -amount, len(rows), first, last, last % 100)
+                return None
+        return None
+
+
+# =============================================================================
+# Dates
+# =============================================================================
+
+_AMOUNT = itemgetter(0)
+_DAY = itemgetter(1)
+_ORDINALS = {}
+
+# Days since year 1 of a YYYYMMDD date, None for a day that is not in the calendar (like 2023-02-30)
+# The dates of a ledger repeat a lot, so they are kept
+def _ordinal(value):
+    if value in _ORDINALS:
+        return _ORDINALS[value]
+    try:
+        ordinal = Date(value // 10000, value // 100 % 100, value % 100).toordinal()
+    except ValueError:
+        ordinal = None
+    _ORDINALS[value] = ordinal
+    return ordinal
+
+# The (year, month) months after a YYYYMM month
+def _add_months(year_month, months):
+    year, month = divmod(year_month // 100 * 12 + year_month % 100 - 1 + months, 12)
+    return year, month + 1
+
+def _period(series):
+    return next(period for period in PERIODS if period.name == series.period)
+
+# The dates of a series after the date after and up to until, both YYYYMMDD
+# The periods in months fall on the day of the series (the last day of the shorter months), the others every period.days days
+def _occurrences(series, after, until):
+    period = _period(series)
+    step = 1
+    while True:
+        if period.months:
+            year, month = _add_months(series.last // 100, step * period.months)
+            date = year * 10000 + month * 100 + min(series.day, monthrange(year, month)[1])
+        else:
+            found = Date.fromordinal(_ordinal(series.last) + step * period.days)
+            date = found.year * 10000 + found.month * 100 + found.day
+        if date > until:
+            return
+        if date > after:
+            yield date
+        step += 1
+
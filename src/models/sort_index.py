@@ -0,0 +1,87 @@
+from bisect import bisect_left, insort
+from itertools import compress
+
+from config.settings import SORT_BY_DATE, SORT_BY_AMOUNT
+
+# The orders of the rows of the local store by date and by amount, kept sorted while the rows change
+# An order is built the first time it is asked, then every add, edit and delete moves only its row with a binary search
+# Sorting the rows shown by the table is then a walk of the order keeping the visible rows, no comparison sort is needed
+# The position is the last key, the rows are loaded by ID and added in ID order, so it breaks the ties like the ID and never changes
+
+
+class SortIndex:
+    def __init__(self, store):
+        self.store = store
+        self._orders = {}               # sort key -> positions of the rows alive, ascending
+        self._generation = store.generation
+        self._slots = store.slots       # Positions known by the orders, rows appended without insert() (a chunked load) make them stale
+
+    # The key of a position: date, amount, position or amount, date, position
+    def _key(self, sort_key):
+        dates = self.store.dates
+        amounts = self.store.amounts
+        if sort_key == SORT_BY_DATE:
+            return lambda position: (dates[position], amounts[position], position)
+        if sort_key == SORT_BY_AMOUNT:
+            return lambda position: (amounts[position], dates[position], position)
+        raise ValueError(f"Unknown sort key: {sort_key}")
+
+    # A load of the store changes every position, the orders are built again when asked
+    # added is the number of rows appended that the caller is about to insert
+    def _sync(self, added = 0):
+        if self._generation != self.store.generation or self._slots + added != self.store.slots:
+            self._generation = self.store.generation
+            self._orders.clear()
+        self._slots = self.store.slots
+
+    # The positions of all the rows alive in ascending order of the sort key
+    def order(self, sort_key):
+        self._sync()
+        order = self._orders.get(sort_key)
+        if order is None:
+            order = self._orders[sort_key] = sorted(self.store.positions(), key=self._key(sort_key))
+        return order
+
+    # The given positions sorted by the sort key
+    def sort(self, positions, sort_key, ascending = True):
+        order = self.order(sort_key)
+
+        visible = bytearray(self.store.slots)
+        for position in positions:
+            visible[position] = 1
+
+        result = list(compress(order, map(visible.__getitem__, order)))
+        if not ascending:
+            result.reverse()
+        return result
+
+    # The index of position in rows, a list in the order returned by sort() (or in position order when sort_key is None), with a binary search
+    # None if the row is not at its sorted place, like a row added or edited after the sort
+    def locate(self, rows, position, sort_key, ascending = True):
+        key = None
+        if sort_key is not None:
+            key = self._key(sort_key)
+            if not ascending:
+                ascending_key = key
+                key = lambda row: tuple(-value for value in ascending_key(row))
+
+        index = bisect_left(rows, position if key is None else key(position), key=key)
+        return index if index < len(rows) and rows[index] == position else None
+
+    # =============================================================================
+    # Changes of the rows
+    # =============================================================================
+    # An edit is discard() before the store changes and insert() after, the old key is needed to find the row
+
+    def insert(self, position):
+        self._sync(1 if position >= self._slots else 0)
+        for sort_key, order in self._orders.items():
+            insort(order, position, key=self._key(sort_key))
+
+    def discard(self, position):
+        self._sync()
+        for sort_key, order in self._orders.items():
+            key = self._key(sort_key)
+            index = bisect_left(order, key(position), key=key)
+            if index < len(order) and order[index] == position:
+                del order[index]
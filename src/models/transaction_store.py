@@ -0,0 +1,471 @@
+from array import array
+from bisect import bisect_left
+from calendar import monthrange
+from itertools import compress, islice
+import sys
+
+from config.settings import SIGN_INCOME, SIGN_EXPENSES
+from src.utils.helpers import to_cents, from_cents
+
+# Compact columnar copy of the transactions table, shared by the DatabaseManager and the views
+# Every column is a contiguous array, a row is a position in the arrays:
+#   ids        array('q')  database ID of the row, negative (a temporary ID, see temporary_id) until a row added locally is saved
+#   dates      array('l')  date as the integer YYYYMMDD, so it sorts and groups by year/month with integer math
+#   amounts    array('q')  amount in cents, like in the database
+#   tag_codes  array('l')  index in the tags table, every tag string is stored (interned) only once
+#   desc_codes array('l')  index in the descriptions table, repeated descriptions are stored only once
+#   alive      bytearray   1 if the row exists, 0 if it was removed
+# Removed rows are only marked as dead, so the position of a row never changes until the next load(), the views can safely keep positions around
+
+
+# Convert an ISO date 'YYYY-MM-DD' to the integer YYYYMMDD, None if the text is not an ISO date or not a day of the calendar (like 2024-13-01)
+# The month length is only looked up for the days after the 28th
+def date_to_int(date):
+    if len(date) != 10 or date[4] != "-" or date[7] != "-":
+        return None
+    try:
+        year, month, day = int(date[0:4]), int(date[5:7]), int(date[8:10])
+        if year < 1 or not 1 <= month <= 12 or not 1 <= day <= 28 and not 29 <= day <= monthrange(year, month)[1]:
+            return None
+    except ValueError:
+        return None
+    return year * 10000 + month * 100 + day
+
+def int_to_date(value):
+    return f"{value // 10000:04d}-{value // 100 % 100:02d}-{value % 100:02d}"
+
+# The characters that can appear in a date and in an amount, a search text with other characters can't match them
+_DATE_CHARACTERS = frozenset("0123456789-")
+_AMOUNT_CHARACTERS = frozenset("0123456789-.")
+
+
+# A light view over one row of the store, it reads the values from the columns when asked
+# It can be indexed like the old [database_index, date, amount, tag, desc] lists, so the views keep working with it
+class TransactionRow:
+    __slots__ = ("_store", "position")
+
+    def __init__(self, store, position):
+        self._store = store
+        self.position = position
+
+    @property
+    def id(self):
+        return self._store.ids[self.position]
+
+    @property
+    def date(self):
+        return self._store.date_at(self.position)
+
+    @property
+    def amount(self):
+        return from_cents(self._store.amounts[self.position])
+
+    @property
+    def cents(self):
+        return self._store.amounts[self.position]
+
+    @property
+    def tag(self):
+        return self._store.tag_at(self.position)
+
+    @property
+    def description(self):
+        return self._store.description_at(self.position)
+
+    def as_list(self):
+        return [self.id, self.date, self.amount, self.tag, self.description]
+
+    def __getitem__(self, index):
+        return self.as_list()[index]
+
+    def __iter__(self):
+        return iter(self.as_list())
+
+    def __len__(self):
+        return 5
+
+    def __repr__(self):
+        return f"TransactionRow({self.as_list()})"
+
+
+class TransactionStore:
+    def __init__(self, rows = ()):
+        self.generation = 0
+        self._last_temporary_id = 0         # Not reset by load(), a temporary ID is never handed out twice
+        self.load(rows)
+
+    # Replace the content of the store with the given database rows (ID, Date, Amount in cents, Tag, Description)
+    # This is the only operation that changes the positions of the rows, the dead rows are dropped here
+    def load(self, rows):
+        self.ids = array("q")
+        self.dates = array("l")
+        self.amounts = array("q")
+        self.tag_codes = array("l")
+        self.desc_codes = array("l")
+        self.alive = bytearray()
+
+        self.tag_names = []
+        self.descriptions = []
+        self._tag_lookup = {}
+        self._desc_lookup = {}
+        self._live = 0
+
+        # position -> date text, for the few dates that are not ISO dates
+        self._odd_dates = {}
+
+        # The rows loaded from the database come in ID order, the first _sorted positions have ascending IDs and are found with a binary search
+        # Only the other rows (added locally, given a new ID by set_id) are in the dictionary database ID -> position of the row alive with that ID
+        self._sorted = 0
+        self._positions = {}
+
+        self._amount_suffix = None
+        self._amount_text_cache = {}
+
+        # Changes at every load, who keeps positions around can tell they are not valid anymore
+        self.generation += 1
+
+        self.extend(rows)
+
+    # Append database rows (ID, Date, Amount in cents, Tag, Description) after the ones already loaded, the positions of the rows already there don't change
+    # A big table can be loaded a chunk at a time: load([]) and then extend() for every chunk
+    def extend(self, rows):
+        rows = list(rows)
+        start = len(self.ids)
+
+        # Tags and descriptions are replaced by their code, setdefault hands out the next code the first time a string is seen
+        # The lookups keep the insertion order, so the strings seen for the first time are the last keys
+        tag_lookup = self._tag_lookup
+        desc_lookup = self._desc_lookup
+        tag_codes = [tag_lookup.setdefault(row[3], len(tag_lookup)) for row in rows]
+        desc_codes = [desc_lookup.setdefault(row[4], len(desc_lookup)) for row in rows]
+        self.tag_names.extend(sys.intern(tag) for tag in islice(tag_lookup, len(self.tag_names), None))
+        self.descriptions.extend(islice(desc_lookup, len(self.descriptions), None))
+
+        ids = [row[0] for row in rows]
+        dates = [date_to_int(row[1]) or 0 for row in rows]
+        # The chunks of a load continue the ascending IDs, any other rows go in the dictionary
+        if self._sorted == start and all(previous < following for previous, following in zip(ids, ids[1:])) \
+                and (not start or not ids or self.ids[start - 1] < ids[0]):
+            self._sorted = start + len(ids)
+        else:
+            self._positions.update(zip(ids, range(start, start + len(ids))))
+
+        self.ids.extend(ids)
+        self.dates.extend(dates)
+        self.amounts.extend([row[2] for row in rows])
+        self.tag_codes.extend(tag_codes)
+        self.desc_codes.extend(desc_codes)
+        self.alive.extend(b"\x01" * len(rows))
+        self._live += len(rows)
+
+        self._odd_dates.update((start + offset, rows[offset][1]) for offset, date in enumerate(dates) if date == 0)
+
+    def __len__(self):
+        return self._live
+
+    # Iterate over the rows still alive, in position order
+    def __iter__(self):
+        for position in self.positions():
+            yield TransactionRow(self, position)
+
+    # The index-th row still alive, like indexing the old list of lists
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._live
+
+        if self._live == len(self.ids):
+            return self.row(index)
+
+        position = next(islice(self.positions(), index, None), None) if index >= 0 else None
+        if position is None:
+            raise IndexError("TransactionStore index out of range")
+        return self.row(position)
+
+    # The row view of a position
+    def row(self, position):
+        if not 0 <= position < len(self.ids) or not self.alive[position]:
+            raise IndexError(f"No transaction at position {position}")
+        return TransactionRow(self, position)
+
+    # The positions of the rows still alive
+    def positions(self):
+        return compress(range(len(self.ids)), self.alive)
+
+    # Number of positions used, dead rows included
+    @property
+    def slots(self):
+        return len(self.ids)
+
+    # =============================================================================
+    # Column access
+    # =============================================================================
+
+    def date_at(self, position):
+        if position in self._odd_dates:
+            return self._odd_dates[position]
+        return int_to_date(self.dates[position])
+
+    def tag_at(self, position):
+        return self.tag_names[self.tag_codes[position]]
+
+    def description_at(self, position):
+        return self.descriptions[self.desc_codes[position]]
+
+    def amount_at(self, position):
+        return from_cents(self.amounts[position])
+
+    # A slice of one of the columns (ids, dates, amounts, tag_codes, desc_codes, alive), it is a copy of the contiguous buffer
+    def column_slice(self, name, start = None, stop = None):
+        return getattr(self, name)[start:stop]
+
+    # The code of a tag in the tags table, None if no row ever used it
+    def tag_code(self, tag):
+        return self._tag_lookup.get(tag)
+
+    # =============================================================================
+    # Filters
+    # =============================================================================
+    # A filter is a mask: a bytearray with one byte per position, 1 if the row matches. Removed rows are excluded by select(), not by the masks
+    # The masks can be built for the slice of positions [start, stop), to extend them after an add or refresh them after an edit
+
+    # Rows of the given year and month, None means any
+    def period_mask(self, year = None, month = None, start = 0, stop = None):
+        dates = self.dates[start:stop]
+
+        if year is not None:
+            # The dates are YYYYMMDD, a year or a month of a year is a range of integers
+            low = year * 10000 + (month * 100 if month is not None else 0)
+            high = low + (100 if month is not None else 10000)
+            return bytearray([low <= date < high for date in dates])
+        if month is not None:
+            return bytearray([date // 100 % 100 == month for date in dates])
+        return bytearray(b"\x01") * len(dates)
+
+    # Rows with the given sign, SIGN_INCOME (amount >= 0), SIGN_EXPENSES (amount < 0) or None for any
+    def sign_mask(self, sign = None, start = 0, stop = None):
+        amounts = self.amounts[start:stop]
+
+        if sign == SIGN_INCOME:
+            return bytearray([amount >= 0 for amount in amounts])
+        if sign == SIGN_EXPENSES:
+            return bytearray([amount < 0 for amount in amounts])
+        return bytearray(b"\x01") * len(amounts)
+
+    # Rows with one of the given tags
+    def tag_mask(self, tags, start = 0, stop = None):
+        codes = {self._tag_lookup[tag] for tag in tags if tag in self._tag_lookup}
+        return bytearray(map(codes.__contains__, self.tag_codes[start:stop]))
+
+    # Rows with the text (case insensitive) in the date, the amount followed by amount_suffix, the tag or the description
+    # The text is matched once per distinct value of a column, then the rows are selected by the codes and values that matched
+    def search_mask(self, text, amount_suffix = "", start = 0, stop = None):
+        text = text.lower()
+        positions = range(len(self.ids))[start:stop]
+
+        # A text with spaces can span two columns, like the old search over "date amount tag desc", those few searches check every row
+        if " " in text:
+            return bytearray([self._row_contains(position, text, amount_suffix) for position in positions])
+
+        columns = (self.tag_codes[start:stop], self.desc_codes[start:stop], self.dates[start:stop], self.amounts[start:stop])
+        matches = self._search_matches(text, amount_suffix, *columns)
+
+        # The four masks are merged as big integers, the OR of 0/1 bytes is done for all the rows at once
+        match = 0
+        for matched, values in zip(matches, columns):
+            if matched:
+                match |= int.from_bytes(bytearray(map(matched.__contains__, values)), "little")
+        mask = bytearray(match.to_bytes(len(positions), "little"))
+
+        # The dates that are not ISO dates are only in _odd_dates
+        for position, date in self._odd_dates.items():
+            if position in positions and text in date.lower():
+                mask[position - positions.start] = 1
+        return mask
+
+    # The same search of search_mask, but only among the given positions. A longer text matches a subset of the rows of a shorter
+    # text it contains, so a search can narrow the result of the previous one instead of checking every row
+    def search_within(self, text, positions, amount_suffix = ""):
+        text = text.lower()
+
+        if " " in text:
+            return [position for position in positions if self._row_contains(position, text, amount_suffix)]
+
+        tag_codes, desc_codes, dates, amounts = self.tag_codes, self.desc_codes, self.dates, self.amounts
+        tags, descriptions, matched_dates, matched_amounts = self._search_matches(
+            text, amount_suffix,
+            {tag_codes[position] for position in positions}, {desc_codes[position] for position in positions},
+            {dates[position] for position in positions}, {amounts[position] for position in positions})
+
+        odd_dates = self._odd_dates
+        return [position for position in positions
+                if tag_codes[position] in tags or desc_codes[position] in descriptions
+                or dates[position] in matched_dates or amounts[position] in matched_amounts
+                or (position in odd_dates and text in odd_dates[position].lower())]
+
+    # The tag codes, description codes, dates and amounts among the given values that contain the (lower case) text
+    def _search_matches(self, text, amount_suffix, tag_codes, desc_codes, dates, amounts):
+        tags = {code for code in set(tag_codes) if text in self.tag_names[code].lower()}
+        descriptions = {code for code in set(desc_codes) if text in self.descriptions[code].lower()}
+
+        # Dates and amounts are only checked when the text could be part of one, formatting every distinct amount is the slow part
+        matched_dates = set()
+        if set(text) <= _DATE_CHARACTERS:
+            matched_dates = {date for date in set(dates) if date and text in int_to_date(date)}
+        matched_amounts = set()
+        if set(text) <= _AMOUNT_CHARACTERS | set(amount_suffix.lower()):
+            distinct = set(amounts)
+            texts = self._amount_texts(amount_suffix, distinct)
+            matched_amounts = {amount for amount in distinct if text in texts[amount]}
+
+        return tags, descriptions, matched_dates, matched_amounts
+
+    def _row_contains(self, position, text, amount_suffix):
+        return text in (f"{self.date_at(position)} {self.amount_at(position)}{amount_suffix} "
+                        f"{self.tag_at(position)} {self.description_at(position)}").lower()
+
+    # The positions of the rows still alive where every mask is 1, in position order. The masks must cover all the positions
+    # The masks are intersected as big integers, one AND for all the rows
+    def select(self, masks):
+        keep = int.from_bytes(self.alive, "little")
+        for mask in masks:
+            keep &= int.from_bytes(mask, "little")
+        return list(compress(range(len(self.ids)), keep.to_bytes(len(self.ids), "little")))
+
+    # Rows of the given year and month (None means any) and sign (SIGN_INCOME, SIGN_EXPENSES or None)
+    def filter_positions(self, year = None, month = None, sign = None):
+        return self.select([self.period_mask(year, month), self.sign_mask(sign)])
+
+    def search_positions(self, text, amount_suffix = ""):
+        return self.select([self.search_mask(text, amount_suffix)])
+
+    # The text of every distinct amount as shown by the table, lower case. It is kept between searches, the amounts seen don't change meaning
+    def _amount_texts(self, amount_suffix, distinct_amounts):
+        if self._amount_suffix != amount_suffix:
+            self._amount_suffix = amount_suffix
+            self._amount_text_cache = {}
+
+        cache = self._amount_text_cache
+        for amount in distinct_amounts.difference(cache):
+            cache[amount] = f"{from_cents(amount)}{amount_suffix}".lower()
+        return cache
+
+    # =============================================================================
+    # Mutations
+    # =============================================================================
+
+    def _intern_tag(self, tag):
+        code = self._tag_lookup.get(tag)
+        if code is None:
+            code = len(self.tag_names)
+            tag = sys.intern(tag)
+            self.tag_names.append(tag)
+            self._tag_lookup[tag] = code
+        return code
+
+    def _intern_description(self, description):
+        code = self._desc_lookup.get(description)
+        if code is None:
+            code = len(self.descriptions)
+            self.descriptions.append(description)
+            self._desc_lookup[description] = code
+        return code
+
+    def _set_date(self, position, date):
+        value = date_to_int(date)
+        if value is None:
+            self._odd_dates[position] = date
+            value = 0
+        else:
+            self._odd_dates.pop(position, None)
+        self.dates[position] = value
+
+    # Add a row, the amount is in currency units (the cents are computed here), returns its position
+    def append(self, idx, date, amount, tag, description):
+        position = len(self.ids)
+        self._positions[idx] = position
+
+        self.ids.append(idx)
+        self.dates.append(0)
+        self._set_date(position, date)
+        self.amounts.append(to_cents(amount))
+        self.tag_codes.append(self._intern_tag(tag))
+        self.desc_codes.append(self._intern_description(description))
+        self.alive.append(1)
+        self._live += 1
+        return position
+
+    # The position of the row with the given database ID, None if there is no such row alive
+    def position_of(self, idx):
+        if not isinstance(idx, int):
+            return None
+        position = self._positions.get(idx)
+        if position is None:
+            position = bisect_left(self.ids, idx, 0, self._sorted)
+            if position == self._sorted or self.ids[position] != idx or not self.alive[position]:
+                return None
+        return position
+
+    # A mask with 1 at the positions of the rows alive with the given database IDs
+    def id_mask(self, ids):
+        mask = bytearray(len(self.ids))
+        for idx in ids:
+            position = self.position_of(idx)
+            if position is not None:
+                mask[position] = 1
+        return mask
+
+    # The positions of the rows alive outside the part loaded in ID order: the rows added with append() and the ones given an ID by set_id
+    def local_positions(self):
+        return list(self._positions.values())
+
+    # The (position, text) of the dates that are not ISO dates, the column dates has 0 for them
+    def odd_dates(self):
+        return self._odd_dates.items()
+
+    # A new negative ID for a row added locally, it identifies the row until the database gives it its real ID (see set_id)
+    def temporary_id(self):
+        self._last_temporary_id -= 1
+        return self._last_temporary_id
+
+    def get(self, idx):
+        position = self.position_of(idx)
+        return None if position is None else TransactionRow(self, position)
+
+    # Overwrite the values of a row in place, returns its position or None if the ID is unknown
+    def update(self, idx, date, amount, tag, description):
+        position = self.position_of(idx)
+        if position is not None:
+            self.update_at(position, date, amount, tag, description)
+        return position
+
+    def update_at(self, position, date, amount, tag, description):
+        self._set_date(position, date)
+        self.amounts[position] = to_cents(amount)
+        self.tag_codes[position] = self._intern_tag(tag)
+        self.desc_codes[position] = self._intern_description(description)
+
+    # Mark a row as removed, returns its position or None if the ID is unknown
+    def remove(self, idx):
+        position = self.position_of(idx)
+        if position is not None:
+            self.remove_at(position)
+        return position
+
+    def remove_at(self, position):
+        if self.alive[position]:
+            self.alive[position] = 0
+            self._live -= 1
+            if self._positions.get(self.ids[position]) == position:
+                del self._positions[self.ids[position]]
+
+    # Give a new database ID to a row, used when a row added locally receives its ID from the database
+    def set_id(self, position, idx):
+        # A row of the sorted part would break the order of the IDs, it and the rows after it are moved to the dictionary
+        if position < self._sorted:
+            self._positions.update((self.ids[moved], moved) for moved in range(position, self._sorted) if self.alive[moved])
+            self._sorted = position
+        if self._positions.get(self.ids[position]) == position:
+            del self._positions[self.ids[position]]
+        self.ids[position] = idx
+        if self.alive[position]:
+            self._positions[idx] = position
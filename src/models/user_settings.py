@@ -6,6 +6,7 @@ from config.settings import (USER_SETTINGS_PATH, DEFAULT_USER_SETTINGS)        #
 class UserSettings:
     def __init__(self):
         self.__create_user_settings_json()  # Ensure the JSON file exists
+        self.__add_missing_settings()       # Settings files created by older versions may miss the newer keys
     
     def read_json_value(self, key: str):
         with open(USER_SETTINGS_PATH, "r") as f:
@@ -42,4 +43,17 @@ class UserSettings:
     def __create_user_settings_json(self):
         if not self.__does_file_exist() or os.path.getsize(USER_SETTINGS_PATH) == 0:
             with open(USER_SETTINGS_PATH, "w") as f:
-                json.dump(DEFAULT_USER_SETTINGS, f, indent=4)
\ No newline at end of file
+                json.dump(DEFAULT_USER_SETTINGS, f, indent=4)
+
+    # Private method to add to an existing user_settings.json the default value of every key it doesn't have yet
+    def __add_missing_settings(self):
+        with open(USER_SETTINGS_PATH, "r") as f:
+            data = json.load(f)
+
+        missing = {key: value for key, value in DEFAULT_USER_SETTINGS.items() if key not in data}
+        if not missing:
+            return
+
+        data.update(missing)
+        with open(USER_SETTINGS_PATH, "w") as f:
+            json.dump(data, f, indent=4)
@@ -1,7 +1,12 @@
 from datetime import datetime, timedelta
 import random
+import re
 
-from config.settings import INCORRECT_DATE, INCORRECT_YEAR
+from config.settings import INCORRECT_DATE, INCORRECT_YEAR, DATE_FORMAT, DB_DATE_FORMAT
+
+# Date formats found in older databases, they are all converted to DB_DATE_FORMAT ('YYYY-MM-DD') so that dates sort and filter as text
+LEGACY_DATE_FORMATS = [DB_DATE_FORMAT, "%d/%m/%Y", DATE_FORMAT, "%Y/%m/%d"]
+ISO_DATE_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}")
 
 def generate_random_date(start_date, days_range=365):
     return (start_date + timedelta(days=random.randint(0, days_range))).strftime('%Y-%m-%d')
@@ -20,7 +25,6 @@ def seed_200_transactions(database):
         description = random.choice(descriptions) + f" #{i}"
         
         database.add_transaction(date=date, amount=amount, tag=tag, description=description)
-        database.update_local()
 
 def is_valid_date(date : str):
     try:
@@ -40,4 +44,26 @@ def is_valid_number(value):
         float(value)
         return True
     except ValueError:
-        return False
\ No newline at end of file
+        return False
+
+# Convert a date string in one of the legacy formats into the canonical 'YYYY-MM-DD' text, unknown formats are returned unchanged
+def normalize_date(date):
+    date_str = str(date).strip()
+
+    # Almost every date is already canonical, strptime is only needed for the other formats
+    if ISO_DATE_PATTERN.fullmatch(date_str):
+        return date_str
+
+    for date_format in LEGACY_DATE_FORMATS:
+        try:
+            return datetime.strptime(date_str, date_format).strftime(DB_DATE_FORMAT)
+        except ValueError:
+            continue
+    return date_str
+
+# Amounts are stored in the database as integer cents, so sums are exact and there are no float rounding errors
+def to_cents(amount):
+    return int(round(float(amount) * 100))
+
+def from_cents(cents):
+    return cents / 100
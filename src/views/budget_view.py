@@ -1,6 +1,9 @@
 # Importing the necessary libraries and view used in the application
-from config.settings import COLOR_EXPENSE, KEY_BUDGET_NEEDS, KEY_BUDGET_SAVING, KEY_BUDGET_WANTS, KEY_CURRENCY_SIGN
+from config.settings import (COLOR_EXPENSE, KEY_BUDGET_NEEDS, KEY_BUDGET_SAVING, KEY_BUDGET_WANTS, KEY_CURRENCY_SIGN, KEY_SUM_INCOME, KEY_SUM_EXPENSES,
+                             BUDGET_TAG_NEEDS, BUDGET_TAG_WANTS, BUDGET_TAG_SALARY, BUDGET_TAG_SAVING, BUDGET_YEAR_VIEW, MONTH_NAMES,
+                             RECURRING_PROJECTION_MONTHS)
 from src.views.base_view import BaseView
+from src.utils.helpers import from_cents
 from datetime import datetime
 import customtkinter as ctk
 
@@ -19,7 +22,9 @@ class BudgetView(BaseView):
         self.wants_percentage = int(user.read_json_value(KEY_BUDGET_WANTS))
         self.savings_percentage = int(user.read_json_value(KEY_BUDGET_SAVING))
             
-        self.budget_filter = datetime.now().strftime("%Y-%m")
+        # The month shown, budget_month None shows the twelve months of budget_year
+        self.budget_year = datetime.now().year
+        self.budget_month = datetime.now().month
         self.needs_spent = 0
         self.needs_budget = 0
         self.wants_spent = 0
@@ -66,19 +71,32 @@ class BudgetView(BaseView):
         )
         budget_title.grid(row=0, column=0, sticky="w", padx=(0, 20))
 
-        # Month/Year
-        month_label = ctk.CTkLabel(
+        # Month/Year selectors, the month menu has also the choice of the whole year
+        self.year_menu = ctk.CTkOptionMenu(
             header_frame,
-            text=self.budget_filter,
-            font=ctk.CTkFont(size=18),
-            text_color="#B0B0B0"
+            values=self.get_years(),
+            width=90,
+            dynamic_resizing=False,
+            command=self.on_year_changed
         )
-        month_label.grid(row=0, column=1, sticky="w")
+        self.year_menu.set(str(self.budget_year))
+        self.year_menu.grid(row=0, column=1, sticky="w", padx=(0, 10))
+
+        self.month_menu = ctk.CTkOptionMenu(
+            header_frame,
+            values=MONTH_NAMES + [BUDGET_YEAR_VIEW],
+            width=90,
+            dynamic_resizing=False,
+            command=self.on_month_changed
+        )
+        self.month_menu.set(MONTH_NAMES[self.budget_month - 1])
+        self.month_menu.grid(row=0, column=2, sticky="e")
 
         # Content frame
         content_frame = ctk.CTkFrame(self.main_frame, fg_color="#404040", corner_radius=10)
         content_frame.grid(row=1, column=0, sticky="nsew", padx=20, pady=(0, 20))
         content_frame.grid_columnconfigure(0, weight=1)
+        self.content_frame = content_frame
 
         # Needs section (Green)
         self.needs_label = ctk.CTkLabel(
@@ -174,17 +192,91 @@ class BudgetView(BaseView):
             font=ctk.CTkFont(size=16, weight="bold"),
             text_color="#FFC107"
         )
-        self.monthly_savings_label.grid(row=10, column=0, padx=20, pady=(0, 20))
+        self.monthly_savings_label.grid(row=10, column=0, padx=20, pady=(0, 5))
+
+        # The Saving transactions accumulated from the first month to the end of the selected month (from the balance index of the database)
+        self.accumulated_savings_label = ctk.CTkLabel(
+            content_frame,
+            text="",
+            font=ctk.CTkFont(size=14),
+            text_color="#BF77DB"
+        )
+        self.accumulated_savings_label.grid(row=11, column=0, padx=20, pady=(0, 5))
+
+        # The recurring transactions (rent, subscriptions, salary) expected in a month after the last transaction, by tag
+        self.recurring_label = ctk.CTkLabel(
+            content_frame,
+            text="",
+            font=ctk.CTkFont(size=14),
+            text_color="#B0B0B0",
+            wraplength=500
+        )
+        self.recurring_label.grid(row=12, column=0, padx=20, pady=(0, 20))
+
+        self.setup_year_view()
+
+        self.calculator()
+
+    # The year view, one column per month with the bars of Needs, Wants and Savings and the salary, it takes the place of the month view
+    def setup_year_view(self):
+        self.year_frame = ctk.CTkFrame(self.main_frame, fg_color="#404040", corner_radius=10)
+        self.year_frame.grid(row=1, column=0, sticky="nsew", padx=20, pady=(0, 20))
+        self.year_frame.grid_rowconfigure(1, weight=1)
+        self.year_frame.grid_remove()
+
+        self.year_columns = []
+        for month, month_name in enumerate(MONTH_NAMES):
+            self.year_frame.grid_columnconfigure(month, weight=1, uniform="month")
+
+            month_label = ctk.CTkLabel(self.year_frame, text=month_name, font=ctk.CTkFont(size=14, weight="bold"), text_color="white")
+            month_label.grid(row=0, column=month, pady=(20, 5))
+
+            bars_frame = ctk.CTkFrame(self.year_frame, fg_color="transparent")
+            bars_frame.grid(row=1, column=month, sticky="ns", pady=5)
+            bars_frame.grid_rowconfigure(0, weight=1)
+
+            column = {'salary': ctk.CTkLabel(self.year_frame, text="", font=ctk.CTkFont(size=12), text_color="#9DD45D")}
+            for index, (key, color) in enumerate((('needs', "#4CAF50"), ('wants', "#F44336"), ('savings', "#BF77DB"))):
+                column[key] = ctk.CTkProgressBar(bars_frame, orientation="vertical", width=10, progress_color=color, fg_color="#2B2B2B")
+                column[key].set(0.0)
+                column[key].grid(row=0, column=index, sticky="ns", padx=2)
+
+            column['salary'].grid(row=2, column=month, pady=(5, 20))
+            self.year_columns.append(column)
+
+    # The years that can be selected, the ones with budget transactions, the current one and the ones of the months projected with the recurring transactions
+    # The months are known from the last date of the ledger, the recurring transactions are only found when a projected month is shown
+    def get_years(self):
+        years = set(self.database.budget.years())
+        years.add(datetime.now().year)
+        years.update(year_month // 100 for year_month in self.database.recurring.projected_months(RECURRING_PROJECTION_MONTHS))
+        return [str(year) for year in sorted(years)]
+
+    def on_year_changed(self, value):
+        self.budget_year = int(value)
+        self.calculator()
 
+    def on_month_changed(self, value):
+        self.budget_month = None if value == BUDGET_YEAR_VIEW else MONTH_NAMES.index(value) + 1
         self.calculator()
 
     def update_data_and_recalculate(self):
         """Update data from database and recalculate budget values"""
         self.data = self.database.local_db
+        self.year_menu.configure(values=self.get_years())
         self.calculator()
 
     def calculator(self):
         self.data = self.database.local_db
+
+        if self.budget_month is None:
+            self.content_frame.grid_remove()
+            self.year_frame.grid()
+            self.update_year_display()
+            return
+        self.year_frame.grid_remove()
+        self.content_frame.grid()
+
         # Reset all values
         self.needs_spent = 0
         self.needs_budget = 0
@@ -195,37 +287,46 @@ class BudgetView(BaseView):
         self.salary = 0
         self.monthly_savings_allocated = 0
 
-        # Filter transactions for current month
-        current_month_transactions = []
-        for transaction in self.data:
-            year_month = transaction[1][0:7]
-            if year_month == self.budget_filter:
-                current_month_transactions.append(transaction)
-
-        # Process transactions
-        for transaction in current_month_transactions:
-            amount = float(transaction[2])
-            tag = transaction[3]
-
-            if tag == "Needs":
-                # Needs should be negative amounts (expenses)
-                self.needs_spent += abs(amount)
-            elif tag == "Wants":
-                # Wants should be negative amounts (expenses)
-                self.wants_spent += abs(amount)
-            elif tag == "Salary":
-                # Salary is positive income
-                self.salary += amount
-                # Calculate savings allocated from this salary
-                monthly_saving = amount * self.savings_percentage / 100
-                self.monthly_savings_allocated += monthly_saving
-            elif tag == "Saving":
-                # Saving transactions are withdrawals from savings (negative amounts like -99)
-                # We add the absolute value to track how much was withdrawn
-                self.saving_spent += abs(amount)
+        # The totals of the month come from the budget engine of the database, computed once for every month and kept until a row of the month changes
+        self.needs_spent, self.wants_spent, self.saving_spent, self.salary = self.month_values(self.database.budget.month(self.budget_year, self.budget_month))
+
+        # The savings allocated are a percentage of the salary
+        self.monthly_savings_allocated = self.salary * self.savings_percentage / 100
 
         self.update_display()
 
+    # Needs spent, Wants spent, Saving spent and Salary of a month, from the totals of the budget tags
+    # income is the sum of the positive amounts of a tag and expenses the sum of the negative ones
+    def month_values(self, month_totals):
+        needs = month_totals[BUDGET_TAG_NEEDS]
+        wants = month_totals[BUDGET_TAG_WANTS]
+        salary = month_totals[BUDGET_TAG_SALARY]
+        saving = month_totals[BUDGET_TAG_SAVING]
+
+        # Needs and Wants should be negative amounts (expenses), like before the absolute values are added up
+        needs_spent = needs[KEY_SUM_INCOME] - needs[KEY_SUM_EXPENSES]
+        wants_spent = wants[KEY_SUM_INCOME] - wants[KEY_SUM_EXPENSES]
+
+        # Saving transactions are withdrawals from savings (negative amounts like -99)
+        # We add the absolute value to track how much was withdrawn
+        saving_spent = saving[KEY_SUM_INCOME] - saving[KEY_SUM_EXPENSES]
+
+        # Salary is positive income
+        return needs_spent, wants_spent, saving_spent, salary[KEY_SUM_INCOME] + salary[KEY_SUM_EXPENSES]
+
+    # The twelve months of the selected year, the bars are filled like the ones of the month view
+    def update_year_display(self):
+        for column, month_totals in zip(self.year_columns, self.database.budget.year(self.budget_year)):
+            needs_spent, wants_spent, saving_spent, salary = self.month_values(month_totals)
+            needs_budget = salary * self.needs_percentage / 100
+            wants_budget = salary * self.wants_percentage / 100
+            savings_budget = salary * self.savings_percentage / 100
+
+            column['needs'].set(min(needs_spent / needs_budget, 1.0) if needs_budget > 0 else 0.0)
+            column['wants'].set(min(wants_spent / wants_budget, 1.0) if wants_budget > 0 else 0.0)
+            column['savings'].set(max((savings_budget - saving_spent) / savings_budget, 0.0) if savings_budget > 0 else 1.0)
+            column['salary'].configure(text=f"{salary:.2f}{self.currency_sign}")
+
     def update_display(self):
         # Calculate budgets based on salary
         self.needs_budget = round((self.salary * self.needs_percentage / 100), 2)
@@ -296,4 +397,18 @@ class BudgetView(BaseView):
             
         # Update monthly savings allocated label
         if hasattr(self, 'monthly_savings_label') and self.monthly_savings_label:
-            self.monthly_savings_label.configure(text=f"Savings This Month: {self.monthly_savings_allocated:.2f}{self.currency_sign}")
\ No newline at end of file
+            self.monthly_savings_label.configure(text=f"Savings This Month: {self.monthly_savings_allocated:.2f}{self.currency_sign}")
+
+        accumulated = from_cents(self.database.balance.balance_at_month_end(self.budget_year, self.budget_month, BUDGET_TAG_SAVING))
+        self.accumulated_savings_label.configure(text=f"Saving Balance up to {MONTH_NAMES[self.budget_month - 1]}: {accumulated:.2f}{self.currency_sign}")
+
+        # Expected amounts by tag, in the order the tags first appear in the month
+        expected = {}
+        for _, series in self.database.recurring.month(self.budget_year, self.budget_month, RECURRING_PROJECTION_MONTHS):
+            expected[series.tag] = expected.get(series.tag, 0) + series.amount
+        if expected:
+            amounts = ", ".join(f"{tag} {from_cents(cents):+.2f}{self.currency_sign}" for tag, cents in expected.items())
+            self.recurring_label.configure(text=f"Recurring Expected: {amounts}")
+            self.recurring_label.grid()
+        else:
+            self.recurring_label.grid_remove()
\ No newline at end of file
@@ -0,0 +1,271 @@
+# Importing the necessary libraries and view used in the application
+from config.settings import (KEY_CURRENCY_SIGN, COLOR_BALANCE, COLOR_INCOME, COLOR_EXPENSE,
+                             CHART_RANGES, CHART_ZOOM_STEP, CHART_MIN_DAYS, CHART_BACKGROUND, CHART_GRID_COLOR)
+from src.analytics.downsample import lttb
+from src.views.base_view import BaseView
+from src.utils.helpers import from_cents
+from bisect import bisect_left, bisect_right
+from datetime import date as Date
+import customtkinter as ctk
+
+# Space in pixels around the plots, for the labels of the values (left) and of the dates (bottom)
+MARGIN_LEFT = 80
+MARGIN_RIGHT = 20
+MARGIN_TOP = 16
+MARGIN_BOTTOM = 28
+PANEL_GAP = 24
+BALANCE_SHARE = 0.6             # Share of the height of the balance plot, income and expenses take the rest
+
+
+# The balance, income and expenses over time, drawn on a canvas from the daily totals of the database (DailyTotals)
+# A history of thousands of days is drawn with about one point per pixel: the days shown are downsampled with LTTB,
+# the points are kept until the days shown or the width change, a resize of the height only moves them
+# The canvas items are created once and moved with coords(), a redraw never creates widgets
+# The mouse wheel zooms around the pointer, dragging moves the days shown, a double click shows the whole history again
+class ChartsView(BaseView):
+    def __init__(self, parent, controller=None, user=None, database=None):
+        super().__init__(parent)
+        self.controller = controller
+        self.user = user
+        self.database = database
+
+        self.currency_sign = user.read_json_value(KEY_CURRENCY_SIGN)
+
+        self.series = None              # DailySeries drawn
+        self.view_start = None          # First and last day shown (ordinals), None shows the whole history
+        self.view_stop = None
+        self._sampled_key = None        # (first index, last index, width) of the points in _sampled
+        self._sampled = {}              # Series name -> (days, values) kept by the downsampling
+        self._redraw_job = None
+        self._drag = None               # (pointer x, view_start, view_stop) while dragging
+
+        # Configure the main layout structure
+        self.main_frame = ctk.CTkFrame(self, corner_radius=0, fg_color=CHART_BACKGROUND)
+        self.main_frame.pack(fill="both", expand=True)
+
+        self.main_frame.grid_rowconfigure(0, weight=0)
+        self.main_frame.grid_rowconfigure(1, weight=1)
+        self.main_frame.grid_columnconfigure(0, weight=1)
+
+        self.setup_ui()
+
+    def setup_ui(self):
+        # Header section
+        header_frame = ctk.CTkFrame(self.main_frame, fg_color=CHART_BACKGROUND, corner_radius=0)
+        header_frame.grid(row=0, column=0, sticky="ew", padx=20, pady=(20, 10))
+        header_frame.grid_columnconfigure(1, weight=1)
+
+        charts_title = ctk.CTkLabel(
+            header_frame,
+            text="Charts",
+            font=ctk.CTkFont(size=24, weight="bold"),
+            text_color="white"
+        )
+        charts_title.grid(row=0, column=0, sticky="w", padx=(0, 20))
+
+        # Legend, the colors of the lines
+        legend_frame = ctk.CTkFrame(header_frame, fg_color="transparent")
+        legend_frame.grid(row=0, column=1, sticky="w")
+        for column, (text, color) in enumerate((("Balance", COLOR_BALANCE), ("Income", COLOR_INCOME), ("Expenses", COLOR_EXPENSE))):
+            ctk.CTkLabel(legend_frame, text=f"━ {text}", text_color=color, font=ctk.CTkFont(size=14, weight="bold")).grid(row=0, column=column, padx=(0, 16))
+
+        # Days shown, the wheel and the drag change them too
+        self.range_button = ctk.CTkSegmentedButton(header_frame, values=list(CHART_RANGES), command=self.on_range_changed)
+        self.range_button.set("All")
+        self.range_button.grid(row=0, column=2, sticky="e")
+
+        # The canvas and the items drawn on it
+        self.canvas = ctk.CTkCanvas(self.main_frame, bg=CHART_BACKGROUND, highlightthickness=0)
+        self.canvas.grid(row=1, column=0, sticky="nsew", padx=20, pady=(0, 20))
+
+        self.items = {
+            'balance_zero': self.canvas.create_line(0, 0, 0, 0, fill=CHART_GRID_COLOR, dash=(4, 4)),
+            'zero': self.canvas.create_line(0, 0, 0, 0, fill=CHART_GRID_COLOR),
+            'balance': self.canvas.create_line(0, 0, 0, 0, fill=COLOR_BALANCE, width=2),
+            'income': self.canvas.create_line(0, 0, 0, 0, fill=COLOR_INCOME),
+            'expenses': self.canvas.create_line(0, 0, 0, 0, fill=COLOR_EXPENSE),
+            'message': self.canvas.create_text(0, 0, text="", fill="white", font=("", 16)),
+        }
+        # Labels of the values (top and bottom of every plot) and of the dates (first, middle and last day shown)
+        for name in ('balance_high', 'balance_low', 'flow_high', 'flow_low'):
+            self.items[name] = self.canvas.create_text(0, 0, text="", fill="#B0B0B0", anchor="e", font=("", 11))
+        for name, anchor in (('date_start', "nw"), ('date_middle', "n"), ('date_stop', "ne")):
+            self.items[name] = self.canvas.create_text(0, 0, text="", fill="#B0B0B0", anchor=anchor, font=("", 11))
+
+        self.canvas.bind("<Configure>", lambda event: self.schedule_redraw())
+        self.canvas.bind("<MouseWheel>", lambda event: self.zoom(event.x, event.delta > 0))
+        self.canvas.bind("<Button-4>", lambda event: self.zoom(event.x, True))     # Linux wheel up
+        self.canvas.bind("<Button-5>", lambda event: self.zoom(event.x, False))    # Linux wheel down
+        self.canvas.bind("<ButtonPress-1>", self.on_drag_start)
+        self.canvas.bind("<B1-Motion>", self.on_drag)
+        self.canvas.bind("<Double-Button-1>", lambda event: self.on_range_changed("All"))
+
+    # =============================================================================
+    # Data and days shown
+    # =============================================================================
+
+    # Called when the view is shown, the daily totals are computed again only if the transactions changed
+    def update_data_and_redraw(self):
+        series = self.database.daily.series()
+        if series is not self.series:
+            self.series = series
+            self._sampled_key = None
+        self.redraw()
+
+    def on_range_changed(self, value):
+        self.range_button.set(value)
+        days = CHART_RANGES[value]
+        if days is None or self.series is None or not self.series.days:
+            self.view_start = self.view_stop = None
+        else:
+            self.view_stop = self.series.days[-1]
+            self.view_start = self.view_stop - days
+        self.redraw()
+
+    # The first and last day shown
+    def visible_days(self):
+        days = self.series.days
+        if self.view_start is None:
+            return days[0], days[-1]
+        return self.view_start, self.view_stop
+
+    # Zoom in or out around the day under the pointer
+    def zoom(self, pointer_x, zoom_in):
+        if self.series is None or not self.series.days:
+            return
+        start, stop = self.visible_days()
+        left, width = self._plot_x()
+        anchor = start + (stop - start) * min(max((pointer_x - left) / width, 0), 1)
+        factor = CHART_ZOOM_STEP if zoom_in else 1 / CHART_ZOOM_STEP
+        self._set_view(anchor - (anchor - start) * factor, anchor + (stop - anchor) * factor)
+
+    def on_drag_start(self, event):
+        if self.series is not None and self.series.days:
+            self._drag = (event.x, *self.visible_days())
+
+    def on_drag(self, event):
+        if self._drag is None:
+            return
+        pointer_x, start, stop = self._drag
+        shift = (pointer_x - event.x) * (stop - start) / self._plot_x()[1]
+        self._set_view(start + shift, stop + shift)
+
+    # Show the days from start to stop, kept inside the history and at least CHART_MIN_DAYS long
+    def _set_view(self, start, stop):
+        first, last = self.series.days[0], self.series.days[-1]
+        span = min(max(stop - start, CHART_MIN_DAYS), max(last - first, CHART_MIN_DAYS))
+        start = min(max(start, first), max(last - span, first))
+        self.view_start, self.view_stop = round(start), round(start + span)
+        self.range_button.set("")
+        self.redraw()
+
+    # =============================================================================
+    # Drawing
+    # =============================================================================
+
+    # A resize sends many <Configure> events, the chart is drawn once when Tk is idle
+    def schedule_redraw(self):
+        if self._redraw_job is None:
+            self._redraw_job = self.after_idle(self.redraw)
+
+    # Left edge and width in pixels of the plots
+    def _plot_x(self):
+        return MARGIN_LEFT, max(self.canvas.winfo_width() - MARGIN_LEFT - MARGIN_RIGHT, 1)
+
+    def redraw(self):
+        self._redraw_job = None
+        if self.series is None:
+            return
+
+        canvas = self.canvas
+        width, height = canvas.winfo_width(), canvas.winfo_height()
+        left, plot_width = self._plot_x()
+
+        if not self.series.days:
+            for name, item in self.items.items():
+                if name != 'message':
+                    canvas.itemconfigure(item, state="hidden")
+            canvas.coords(self.items['message'], width / 2, height / 2)
+            canvas.itemconfigure(self.items['message'], text="No transactions to chart yet", state="normal")
+            return
+        for item in self.items.values():
+            canvas.itemconfigure(item, state="normal")
+        canvas.itemconfigure(self.items['message'], state="hidden")
+
+        start, stop = self.visible_days()
+        sampled = self._sample(start, stop, plot_width)
+
+        # Vertical layout, the balance plot on top and the income and expenses plot under it
+        plot_height = max(height - MARGIN_TOP - MARGIN_BOTTOM - PANEL_GAP, 2)
+        balance_top = MARGIN_TOP
+        balance_bottom = balance_top + plot_height * BALANCE_SHARE
+        flow_top = balance_bottom + PANEL_GAP
+        flow_bottom = MARGIN_TOP + plot_height + PANEL_GAP
+
+        x_scale = plot_width / max(stop - start, 1)
+        right = left + plot_width
+
+        # The days just outside the ones shown are drawn on the edges of the plot
+        def place(name, low, high, top, bottom):
+            days, values = sampled[name]
+            y_scale = (bottom - top) / ((high - low) or 1)
+            points = []
+            for day, value in zip(days, values):
+                points.append(min(max(left + (day - start) * x_scale, left), right))
+                points.append(bottom - (value - low) * y_scale)
+            if len(points) == 2:
+                points *= 2             # A line needs two points, a single day is drawn as a dot
+            if points:
+                canvas.coords(self.items[name], points)
+            else:
+                canvas.coords(self.items[name], 0, 0, 0, 0)
+            return y_scale
+
+        # The balance goes from its lowest to its highest value of the days shown
+        low, high = self._value_range(sampled['balance'][1])
+        y_scale = place('balance', low, high, balance_top, balance_bottom)
+        zero = min(max(balance_bottom + low * y_scale, balance_top), balance_bottom)
+        canvas.coords(self.items['balance_zero'], left, zero, right, zero)
+        self._label('balance_high', left - 8, balance_top, high)
+        self._label('balance_low', left - 8, balance_bottom, low)
+
+        # Income above the zero line and expenses under it, on the same scale
+        flow_high = max(max(sampled['income'][1], default=0), -min(sampled['expenses'][1], default=0), 1)
+        place('income', -flow_high, flow_high, flow_top, flow_bottom)
+        place('expenses', -flow_high, flow_high, flow_top, flow_bottom)
+        zero = (flow_top + flow_bottom) / 2
+        canvas.coords(self.items['zero'], left, zero, right, zero)
+        self._label('flow_high', left - 8, flow_top, flow_high)
+        self._label('flow_low', left - 8, flow_bottom, -flow_high)
+
+        # Dates under the plots
+        for name, day, x in (('date_start', start, left), ('date_middle', (start + stop) // 2, left + plot_width / 2), ('date_stop', stop, right)):
+            canvas.coords(self.items[name], x, flow_bottom + 6)
+            canvas.itemconfigure(self.items[name], text=Date.fromordinal(int(day)).isoformat())
+
+    def _label(self, name, x, y, cents):
+        self.canvas.coords(self.items[name], x, y)
+        self.canvas.itemconfigure(self.items[name], text=f"{from_cents(cents):.0f}{self.currency_sign}")
+
+    @staticmethod
+    def _value_range(values):
+        if not values:
+            return 0, 1
+        return min(values), max(values)
+
+    # The points of the days from start to stop, about one per pixel, kept until the days shown or the width change
+    def _sample(self, start, stop, plot_width):
+        days = self.series.days
+        # One day before and after the days shown, so the lines reach the edges of the plots
+        first = max(bisect_left(days, start) - 1, 0)
+        last = min(bisect_right(days, stop) + 1, len(days))
+        key = (first, last, plot_width)
+        if key != self._sampled_key:
+            visible = days[first:last]
+            self._sampled = {}
+            for name in ('balance', 'income', 'expenses'):
+                values = getattr(self.series, name)[first:last]
+                kept = lttb(visible, values, plot_width)
+                self._sampled[name] = ([visible[index] for index in kept], [values[index] for index in kept])
+            self._sampled_key = key
+        return self._sampled
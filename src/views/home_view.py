@@ -1,11 +1,12 @@
 import customtkinter as ctk
 from PIL import Image
+from tkinter import messagebox
 import os
 
 # Local imports
 from config.settings import (COLOR_DELETE_BTN, COLOR_EDIT_BTN, COLOR_EDIT_BTN_HOVER, DB_ACTION_ADD, DB_ACTION_DELETE, DB_ACTION_EDIT, ICONS_PATH,
                              COLOR_BALANCE, COLOR_INCOME, COLOR_EXPENSE, KEY_CURRENCY_SIGN, KEY_DATE_SELECTION, KEY_MONTH_SELECTION,
-                             KEY_SUM_TRANSACTIONS, KEY_SUM_INCOME, KEY_SUM_EXPENSES, KEY_SUM_BALANCE)
+                             KEY_SUM_TRANSACTIONS, KEY_SUM_INCOME, KEY_SUM_EXPENSES, KEY_SUM_BALANCE, SEARCH_DEBOUNCE_MS, TABLE_BALANCE_WEIGHT)
 from src.views.virtual_table_view import VirtualTable
 from src.views.base_view import BaseView
 from datetime import datetime
@@ -74,8 +75,8 @@ class HomeView(BaseView):
         self.setup_summary_panel()
         self.message_box()
 
-        self.transactions_table.show_all()
-        # Order the table by flter_date_
+        # The loading starts first, so the filter and the order selected are only recorded and applied once, when all the transactions are loaded
+        self.transactions_table.start_loading(self.on_table_loaded)
         self.transactions_table.filter_dates(
             date_value=self.current_date_selection,
             month_value=self.current_month_selection
@@ -95,16 +96,36 @@ class HomeView(BaseView):
         save_button.grid(row = 3, column = 0)
 
     def save_btn_event(self):
-        self.transactions_table.update_db()
+        # The changes are committed in background, the message is updated when the writer is done
+        if self.transactions_table.update_db(on_done = self.on_changes_saved, on_error = self.on_save_failed) == 0:
+            self.change_message_home_view("No changes to save", COLOR_INCOME)
+            return
+        self.change_message_home_view("Saving changes...", COLOR_INCOME)
+
+    def on_changes_saved(self, results):
         self.change_message_home_view("Successfull changes applied", COLOR_INCOME)
 
+    def on_save_failed(self, error):
+        self.change_message_home_view(f"Error saving changes - {error}", COLOR_DELETE_BTN)
+
+
+    # The years of the date filter are known only when every transaction is loaded
+    def on_table_loaded(self):
+        self.optionmenu_1.configure(values=self.transactions_table.get_dates())
 
     # When closing the application change the data in user settings
     # This method is called and traceback from the very main
+    # The last changes are committed before returning, the user is told if they could not be saved
     def on_closure(self):
         self.user.change_json_value(KEY_DATE_SELECTION, self.current_date_selection)
         self.user.change_json_value(KEY_MONTH_SELECTION, self.current_month_selection)
-        self.transactions_table.update_db()
+
+        errors = []
+        self.transactions_table.update_db(on_error = errors.append)
+        if not self.database.writer.flush():
+            errors.append("the database did not answer in time")
+        if errors:
+            messagebox.showerror("Changes not saved", f"The last changes could not be saved - {errors[0]}")
 
     def message_box(self):
 
@@ -151,9 +172,10 @@ class HomeView(BaseView):
         search_container.grid_propagate(False)
         search_container.grid_columnconfigure(0, weight=1)
         
-        # Search entry with real-time callback
+        # Search entry with real-time callback, the keystrokes are coalesced and the search runs when the user stops typing
         self.search_var = ctk.StringVar()
-        self.search_var.trace_add("write", lambda *args : self.transactions_table.show_searched(self.search_var.get()))
+        self.search_var.trace_add("write", self.on_search_changed)
+        self._search_after_id = None
         
         self.search_entry = ctk.CTkEntry(
             search_container,
@@ -176,6 +198,16 @@ class HomeView(BaseView):
         )
         lens_icon.grid(row=0, column=0, sticky="e", padx=(0, 10))
 
+    # Every keystroke cancels the search scheduled by the previous one, so only the last text is searched
+    def on_search_changed(self, *args):
+        if self._search_after_id is not None:
+            self.after_cancel(self._search_after_id)
+        self._search_after_id = self.after(SEARCH_DEBOUNCE_MS, self.run_search)
+
+    def run_search(self):
+        self._search_after_id = None
+        self.transactions_table.show_searched(self.search_var.get())
+
     # =============================================================================
     # SUMMARY PANEL
     # =============================================================================
@@ -405,7 +437,7 @@ class HomeView(BaseView):
         self.all = ctk.CTkButton(
             filter_info_frame,
             text="All",
-            command=lambda: (self.reset_data_filters(), self.transactions_table.show_all(),
+            command=lambda: (self.reset_data_filters(), self.search_var.set(""), self.transactions_table.show_all(),
                              self.change_message_home_view("Current Filter: Show All", COLOR_INCOME)),
             font=ctk.CTkFont(size=14)
         )
@@ -490,23 +522,21 @@ class HomeView(BaseView):
             # Validate date format
             datetime.strptime(date, "%Y-%m-%d")
             
-            # Add to database and get new ID
+            # Add to the table, the row is written in the database at the next save
             row_data = ["",date, amount, category, description]
             
-            self.transactions_table.create_row(row_data)
+            position = self.transactions_table.create_row(row_data)
+            row_id = self.data.ids[position]
 
-            
+            # The filters and the sort selected are applied again, the new row goes in its place
             self.transactions_table.filter_dates(
                 date_value=self.current_date_selection,
                 month_value=self.current_month_selection
             )
 
-            self.transactions_table.order_by_date()
-            self.transactions_table.order_by_date()
-
             
             self.transactions_table.save_db_modification(action= DB_ACTION_ADD, 
-                                                         row_id= None,
+                                                         row_id= row_id,
                                                          date = date, 
                                                          amount = amount, 
                                                          tag = category,
@@ -546,10 +576,11 @@ class HomeView(BaseView):
         # Configure the main frame columns to ensure proper distribution
         header_frame.grid_columnconfigure(0, weight=15, uniform="col")  # Date column
         header_frame.grid_columnconfigure(1, weight=15, uniform="col")  # Amount column
-        header_frame.grid_columnconfigure(2, weight=15, uniform="col")  # Tag column
-        header_frame.grid_columnconfigure(3, weight=30, uniform="col")  # Description column (wider)
-        header_frame.grid_columnconfigure(4, weight=10, uniform="col")  # Actions column
-        header_frame.grid_columnconfigure(5, weight=5, uniform="col")  # Actions column
+        header_frame.grid_columnconfigure(2, weight=0, uniform="col")   # Running balance column (only when shown)
+        header_frame.grid_columnconfigure(3, weight=15, uniform="col")  # Tag column
+        header_frame.grid_columnconfigure(4, weight=30, uniform="col")  # Description column (wider)
+        header_frame.grid_columnconfigure(5, weight=10, uniform="col")  # Actions column
+        header_frame.grid_columnconfigure(6, weight=5, uniform="col")  # Actions column
 
         # Date button
         date_btn = ctk.CTkButton(
@@ -572,6 +603,23 @@ class HomeView(BaseView):
             font=ctk.CTkFont(size=14, weight="bold")
         )
         amount_btn.grid(row=0, column=1, sticky="ew", padx=5, pady=8)
+
+        # Running balance label, shown with the column of the table
+        balance_label = ctk.CTkLabel(
+            header_frame,
+            text="Balance",
+            font=ctk.CTkFont(size=14, weight="bold")
+        )
+        balance_label.grid(row=0, column=2, sticky="ew", padx=10, pady=8)
+
+        def show_balance_header(show):
+            header_frame.grid_columnconfigure(2, weight=TABLE_BALANCE_WEIGHT if show else 0)
+            if show:
+                balance_label.grid()
+            else:
+                balance_label.grid_remove()
+
+        self.transactions_table.register_balance_callback(show_balance_header)
         
         # Tag label
         tag_label = ctk.CTkLabel(
@@ -579,7 +627,7 @@ class HomeView(BaseView):
             text="Tag",
             font=ctk.CTkFont(size=14, weight="bold")
         )
-        tag_label.grid(row=0, column=2, sticky="ew", padx=10, pady=8)
+        tag_label.grid(row=0, column=3, sticky="ew", padx=10, pady=8)
     
         # Description label
         description_label = ctk.CTkLabel(
@@ -587,7 +635,7 @@ class HomeView(BaseView):
             text="Description",
             font=ctk.CTkFont(size=14, weight="bold")
         )
-        description_label.grid(row=0, column=3, sticky="ew", padx=10, pady=8)
+        description_label.grid(row=0, column=4, sticky="ew", padx=10, pady=8)
     
         # Actions column (empty header)
         actions_label = ctk.CTkLabel(
@@ -595,7 +643,7 @@ class HomeView(BaseView):
             text="Actions",
             font=ctk.CTkFont(size=14, weight="bold")
         )
-        actions_label.grid(row=0, column=4, sticky="ew", padx=10, pady=8)
+        actions_label.grid(row=0, column=5, sticky="ew", padx=10, pady=8)
 
         # empty header
         actions_label = ctk.CTkLabel(
@@ -603,6 +651,6 @@ class HomeView(BaseView):
             text="",
             font=ctk.CTkFont(size=14, weight="bold")
         )
-        actions_label.grid(row=0, column=5, sticky="ew", padx=10, pady=8)
+        actions_label.grid(row=0, column=6, sticky="ew", padx=10, pady=8)
 
 
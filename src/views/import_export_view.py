@@ -5,7 +5,7 @@ import shutil
 
 import sys
 from tkinter import messagebox
-from config.settings import BACKUP_FOLDER_PATH, DATABASE_PATH, EXPORT_FOLDER_PATH, IMPORT_FOLDER_PATH
+from config.settings import BACKUP_FOLDER_PATH, DATABASE_PATH, EXPORT_FOLDER_PATH, IMPORT_FOLDER_PATH, KEY_LOAD_ROWS, KEY_LOAD_ROWS_PER_SECOND
 from config.textbox import IMPORT_EXPORT_MESSAGE
 from src.views.base_view import BaseView  
 import customtkinter as ctk
@@ -90,8 +90,12 @@ class ImportExport(BaseView):
             return
 
         if messagebox.askokcancel("Confirm", "Are you sure you want to overwrite current database with backup?"):
+            # The message comes before closing: a message box runs the Tk loop, and the after() callbacks of the views must not find the database closed
+            messagebox.showinfo(f"Backup restored", f"The backup is restored and the application restarts")
+
+            # Closing the connection checkpoints the WAL file into the database, so nothing is left to overwrite the restored file
+            self.database.close()
             shutil.copy(BACKUP_FOLDER_PATH, DATABASE_PATH)
-            messagebox.showinfo(f"Backup restored", f"Backup was successfull restored")
 
             #Reset application to show the changes
             python = sys.executable
@@ -99,7 +103,7 @@ class ImportExport(BaseView):
 
     def backup_current_event(self):
         try:
-            shutil.copy(DATABASE_PATH, BACKUP_FOLDER_PATH)
+            self.database.backup_to(BACKUP_FOLDER_PATH)
             messagebox.showinfo(f"Backup of the database created", f"Backup successfull created in backup folder")
         except:
             raise ValueError("Error creating backup")
@@ -117,11 +121,15 @@ class ImportExport(BaseView):
                         break
                     data.append(line)
             
-            shutil.copy(DATABASE_PATH, BACKUP_FOLDER_PATH)
-            self.database.local_db = data
-            self.database.update_db()
+            # The changes still queued in the writer are committed before the backup, and before the import replaces the rows they name
+            self.database.writer.flush()
+            self.database.backup_to(BACKUP_FOLDER_PATH)
+            load_stats = self.database.update_db(data)
+
+            messagebox.showinfo(f"Import Successfull", f"{load_stats[KEY_LOAD_ROWS]} rows were imported from the folder ({load_stats[KEY_LOAD_ROWS_PER_SECOND]:.0f} rows/s), for every problem, a backup of the previous db was mase in backup folder")
 
-            messagebox.showinfo(f"Import Successfull", f"The data was imported from the folder, for every problem, a backup of the previous db was mase in backup folder")
+            # The writer is stopped and the connection closed before the process is replaced
+            self.database.close()
 
                     #Reset application to show the changes
             python = sys.executable
@@ -133,6 +141,10 @@ class ImportExport(BaseView):
 
 
     def export_event(self):
+        if not self.database.local_loaded:
+            messagebox.showinfo(f"Export not ready", f"The transactions are still loading, retry in a moment")
+            return
+
         raw_data = self.database.local_db
         filered_data = [row[1:] for row in raw_data]
         try: 
@@ -0,0 +1,53 @@
+from collections import namedtuple
+
+from config.settings import COLOR_INCOME, COLOR_EXPENSE, TAGS_DICTIONARY
+import customtkinter as ctk
+
+# Shared fonts and colours of the transactions table rows
+# Every CTkFont is a Tk named font, creating one per row (or per edit) makes the app slower and heavier the more rows it shows
+# Here each font and each row style is created once and every row uses the same instances
+# The caches are filled lazily, because the fonts can only be created when the Tk root exists
+
+UNKNOWN_TAG_COLOR = "#FFFFFF"
+
+# The colours and font of a row, they depend only on the sign of the amount and on the tag
+RowStyle = namedtuple("RowStyle", ["amount_color", "tag_color", "tag_font"])
+
+_fonts = {}             # (size, weight) -> CTkFont
+_styles = {}            # (is income, tag or None if the tag has no colour) -> RowStyle
+_listeners = []         # Functions called by invalidate()
+
+
+def font(size, weight = "normal"):
+    key = (size, weight)
+    cached = _fonts.get(key)
+    if cached is None:
+        cached = _fonts[key] = ctk.CTkFont(size=size, weight=weight)
+    return cached
+
+
+def row_style(amount, tag):
+    known = tag in TAGS_DICTIONARY
+    key = (amount >= 0, tag if known else None)
+
+    style = _styles.get(key)
+    if style is None:
+        style = _styles[key] = RowStyle(
+            amount_color = COLOR_INCOME if amount >= 0 else COLOR_EXPENSE,             # The amount is positive is green, negative is red
+            tag_color = TAGS_DICTIONARY[tag] if known else UNKNOWN_TAG_COLOR,           # Tags dictionary have key : color , every key is a tag
+            tag_font = font(14, "bold") if known else font(12),
+        )
+    return style
+
+
+# Register a function called when the styles are invalidated, the views use it to apply the new fonts and colours to their rows
+def on_invalidate(callback):
+    _listeners.append(callback)
+
+
+# Drop the cached fonts and styles, to call when the theme changes
+def invalidate():
+    _fonts.clear()
+    _styles.clear()
+    for callback in list(_listeners):
+        callback()
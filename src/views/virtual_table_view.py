@@ -1,24 +1,35 @@
-from config.settings import (COLOR_EDIT_BTN, COLOR_EDIT_BTN_HOVER, DB_ACTION_ADD, DB_ACTION_DELETE, DB_ACTION_EDIT, DELETE_ICON_FILE_NAME, EDIT_ICON_FILE_NAME, ICONS_PATH, INCORRECT_DATE, INCORRECT_YEAR, KEY_CURRENCY_SIGN, TAGS_DICTIONARY,
+from config.settings import (COLOR_EDIT_BTN, COLOR_EDIT_BTN_HOVER, DB_ACTION_ADD, DB_ACTION_DELETE, DB_ACTION_EDIT, DELETE_ICON_FILE_NAME, EDIT_ICON_FILE_NAME, ICONS_PATH, INCORRECT_DATE, INCORRECT_YEAR, KEY_CURRENCY_SIGN,
                             COLOR_CANCEL_BTN_HOVER, COLOR_CANCEL_BTN, COLOR_DATE_FIELD, COLOR_TAG_FIELD, COLOR_DESC_FIELD,
-                            COLOR_DELETE_BTN, COLOR_DELETE_BTN_HOVER, COLOR_EXPENSE, COLOR_INCOME,
+                            COLOR_DELETE_BTN, COLOR_DELETE_BTN_HOVER, COLOR_INCOME, MONTH_NAMES, SIGN_INCOME, SIGN_EXPENSES, SORT_BY_DATE, SORT_BY_AMOUNT,
+                            TABLE_ROW_POOL_SIZE, TABLE_ROW_HEIGHT, TABLE_SCROLL_ROWS, LOAD_STEP_MS, SEARCH_INDEX_MIN_ROWS, DEFAULT_ROWS_PER_PAGE, KEY_TABLE_PAGINATED, VALUE_TRUE, VALUE_FALSE,
+                            KEY_TABLE_BALANCE, TABLE_BALANCE_WEIGHT,
                             KEY_SUM_TRANSACTIONS, KEY_SUM_INCOME, KEY_SUM_EXPENSES, KEY_SUM_BALANCE)
+from src.analytics import aggregate
+from src.models.filter_state import FilterState
+from src.models.sort_index import SortIndex
 from src.views.base_view import BaseView
+from src.views import row_styles
 from src.utils import helpers
 import customtkinter as ctk
 from PIL import Image
 import os
+import time
 
 
-# A virtual scrollable table made out of widget created from the database local raw data
+# A virtual table over the local store of the database: only a small pool of row widgets exists,
+# when the table scrolls the same widgets are bound to other rows of the data, so the cost of the table doesn't grow with the number of transactions
 class VirtualTable(BaseView):
     def __init__(self, parent, controller, database, user):
         super().__init__(parent)
         self.controller = controller
         self.database = database
         self.data = database.local_db
+        self.user = user
         self.currency_sign = user.read_json_value(KEY_CURRENCY_SIGN)
 
         self.db_transactions = []
+        self._pending_adds = {}         # temporary ID -> queued add of a row created after the last save
+        self._requeued = 0              # Operations at the front of the queue put back by failed commits since the last save
 
         self.edit_image = ctk.CTkImage(Image.open(os.path.join(ICONS_PATH, EDIT_ICON_FILE_NAME)))
         
@@ -27,8 +38,49 @@ class VirtualTable(BaseView):
         # Callback used for updating summary
         self.summary_callback = None
 
-        # Used to store the rows widgets, every row is a frame saved here, can be hided, deleted and showed, when needed, this is done to not recreate every widget everytime
-        self.widgets_list = []
+        # The running balance column, the balance of the whole ledger at the end of the day of the row (see BalanceIndex)
+        # The callback lets the view with the table header show or hide the header of the column
+        self.show_balance = user.read_json_value(KEY_TABLE_BALANCE) == VALUE_TRUE
+        self.balance_callback = None
+
+        # The positions in the local store of the rows shown by the table, in the order they are shown. Filters and sorts only change this list
+        self.order = list(self.data.positions())
+        self._generation = self.data.generation
+
+        # Running totals in cents of the rows in self.order, filters compute them again, single row changes apply their difference
+        self.income = 0
+        self.expenses = 0
+        self._recompute_totals()
+
+        # While the store is loading in chunks the rows are shown as they arrive, filters and sorts are applied at the end (see start_loading)
+        self.loading = False
+        self._loader = None
+        self._on_loaded = None
+        self._shown_slots = self.data.slots         # Positions of the store already put in self.order by the loading
+
+        # The filters selected by the user, each one keeps its mask of the store so a change only recomputes the filter changed
+        self.filters = FilterState(self.data, self.currency_sign, self._index_search)
+        self._sign_shortcut = False         # True while the search text is "-" or "+", the sign filter is only borrowed from the search bar
+        self._sign_before_shortcut = None   # The sign selected before the shortcut, it is selected again when the text changes
+
+        # The date and amount orders of the store, the sort shown by the table is applied again after every filter
+        self.sort_index = SortIndex(self.data)
+        self.sort_key = None
+        self.ascending = True
+        self._last_direction = {}           # sort key -> direction used the last time, a click without direction inverts it
+
+        # The row widgets, every row is a dictionary with the frame and its labels and buttons, they are created once and reused while scrolling
+        self.pool = []
+        self.bound = []                 # The store position shown by every pool row, None if the row is empty
+        self.shown = []                 # The values shown by every pool row, a row is configured again only when they change
+        self.top = 0                    # Index in the rows scrolled (see scrolled_rows) of the row shown by the first pool row
+        self.visible_rows = TABLE_ROW_POOL_SIZE
+
+        # In paginated mode the table shows only the rows of one page, taken from self.order with an offset and a limit
+        self.paginated = user.read_json_value(KEY_TABLE_PAGINATED) == VALUE_TRUE
+        self.rows_per_page = DEFAULT_ROWS_PER_PAGE
+        self.page = 0
+        self._page_shown = None         # (page, pages) shown by the page controls, they are configured again only when it changes
         
         # Configure main container to expand properly
         self.grid_columnconfigure(0, weight=1)
@@ -48,68 +100,212 @@ class VirtualTable(BaseView):
         self.table_container.grid_columnconfigure(0, weight=1)
         self.table_container.grid_rowconfigure(0, weight=1)
 
-        # The scrollable frame is inside the frame main container
-        self.scroll_frame = ctk.CTkScrollableFrame(self.table_container, fg_color="transparent")
-        self.scroll_frame.grid(row=0, column=0, sticky="nsew")
-        self.scroll_frame.grid_columnconfigure(0, weight=1)
+        # The frame with the pool of rows, its size comes from the container and not from the rows inside it
+        self.rows_frame = ctk.CTkFrame(self.table_container, fg_color="transparent")
+        self.rows_frame.grid(row=0, column=0, sticky="nsew")
+        self.rows_frame.grid_columnconfigure(0, weight=1)
+        self.rows_frame.grid_propagate(False)
+        self.rows_frame.bind("<Configure>", self._on_resize)
 
-        # Bind mouse wheel scrolling (to scroll the frame with the mouse wheel)
-        self.scroll_frame.bind_all("<MouseWheel>", self._on_mousewheel)  # Windows / macOS
-        self.scroll_frame.bind_all("<Button-4>", self._on_mousewheel)    # Linux scroll up
-        self.scroll_frame.bind_all("<Button-5>", self._on_mousewheel)    # Linux scroll down
+        # The scrollbar is driven by the number of rows in self.order, not by the size of a frame
+        self.scrollbar = ctk.CTkScrollbar(self.table_container, command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
 
-        # Creation of all row widget, we do it for every data_row in self.data, self.data is a list of list, every list have all the info to transform in widget
-        for i, data_row in enumerate(self.data):
-            self.create_row(data_row)
+        # Progress of the loading of the transactions, hidden when the table is complete
+        self.progress_label = ctk.CTkLabel(self.table_container, text="", height=20, font=row_styles.font(12))
+        self.progress_label.grid(row=1, column=0, columnspan=2, sticky="ew")
+        self.progress_label.grid_remove()
 
-    # When scrolling with the mouse the yview scroll down or up
+        self.setup_page_controls()
+
+        # Bind mouse wheel scrolling (to scroll the table with the mouse wheel)
+        self.rows_frame.bind_all("<MouseWheel>", self._on_mousewheel)  # Windows / macOS
+        self.rows_frame.bind_all("<Button-4>", self._on_mousewheel)    # Linux scroll up
+        self.rows_frame.bind_all("<Button-5>", self._on_mousewheel)    # Linux scroll down
+
+        # PageUp and PageDown change page in paginated mode, otherwise they scroll of a screen of rows
+        self.rows_frame.bind_all("<Prior>", self._on_page_key)
+        self.rows_frame.bind_all("<Next>", self._on_page_key)
+
+        # Creation of the pool of row widgets, they are empty until render() binds them to the data
+        for slot in range(TABLE_ROW_POOL_SIZE):
+            self.create_pool_row(slot)
+
+        # When the theme changes the shared fonts are created again, the rows take the new ones
+        row_styles.on_invalidate(self.restyle)
+
+        self.render()
+
+    # When scrolling with the mouse the table moves of TABLE_SCROLL_ROWS rows up or down
     def _on_mousewheel(self, event):
+        if not self.winfo_ismapped():
+            return
+
         # Windows and macOS
         if event.num == 4 or event.delta > 0:
-            self.scroll_frame._parent_canvas.yview_scroll(-1, "units")
+            self.scroll_rows(-TABLE_SCROLL_ROWS)
         elif event.num == 5 or event.delta < 0:
-            self.scroll_frame._parent_canvas.yview_scroll(1, "units")
+            self.scroll_rows(TABLE_SCROLL_ROWS)
+
+    # The scrollbar calls this like a tk scrollbar: ("moveto", fraction) or ("scroll", number, "units" or "pages")
+    def _on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * len(self.scrolled_rows()))
+            self.render()
+        elif args[0] == "scroll":
+            step = self.visible_rows if args[2] == "pages" else TABLE_SCROLL_ROWS
+            self.scroll_rows(step if float(args[1]) > 0 else -step)
+
+    # When the table changes size, only the rows that fit the viewport are used
+    def _on_resize(self, event):
+        visible_rows = max(1, min(TABLE_ROW_POOL_SIZE, event.height // TABLE_ROW_HEIGHT))
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self.render()
+
+    def scroll_rows(self, amount):
+        self.top += amount
+        self.render()
 
-    def create_row(self, data_row):
-        # Because the data is formatted in [database_index, date, amount, tag, desc] data_row[2] is the amount positioned in the list
-        if data_row[2] >= 0:
-            color = COLOR_INCOME      # The amount is positive, is green
+    # =============================================================================
+    # Pages
+    # =============================================================================
+
+    # The bar under the table with the switch of the paginated mode and the page buttons, hidden when the mode is off
+    def setup_page_controls(self):
+        self.page_frame = ctk.CTkFrame(self.table_container, fg_color="transparent", height=36)
+        self.page_frame.grid(row=2, column=0, columnspan=2, sticky="ew", padx=32, pady=(0, 4))
+        self.page_frame.grid_columnconfigure(1, weight=1)
+
+        self.paginated_var = ctk.StringVar(value=VALUE_TRUE if self.paginated else VALUE_FALSE)
+        self.paginated_switch = ctk.CTkSwitch(
+            self.page_frame,
+            text="Pages",
+            variable=self.paginated_var,
+            onvalue=VALUE_TRUE,
+            offvalue=VALUE_FALSE,
+            font=row_styles.font(12),
+            command=lambda: self.set_paginated(self.paginated_var.get() == VALUE_TRUE)
+        )
+        self.paginated_switch.grid(row=0, column=0, sticky="w")
+
+        self.balance_var = ctk.StringVar(value=VALUE_TRUE if self.show_balance else VALUE_FALSE)
+        self.balance_switch = ctk.CTkSwitch(
+            self.page_frame,
+            text="Balance",
+            variable=self.balance_var,
+            onvalue=VALUE_TRUE,
+            offvalue=VALUE_FALSE,
+            font=row_styles.font(12),
+            command=lambda: self.set_show_balance(self.balance_var.get() == VALUE_TRUE)
+        )
+        self.balance_switch.grid(row=0, column=1, sticky="w", padx=(16, 0))
+
+        self.previous_page_button = ctk.CTkButton(self.page_frame, text="<", width=32, height=28, font=row_styles.font(12), command=self.previous_page)
+        self.previous_page_button.grid(row=0, column=2, padx=4)
+
+        self.page_label = ctk.CTkLabel(self.page_frame, text="", width=120, font=row_styles.font(12))
+        self.page_label.grid(row=0, column=3, padx=4)
+
+        self.next_page_button = ctk.CTkButton(self.page_frame, text=">", width=32, height=28, font=row_styles.font(12), command=self.next_page)
+        self.next_page_button.grid(row=0, column=4, padx=4)
+
+    # The rows of the table from offset, at most limit of them, in the order they are shown
+    def query_rows(self, offset, limit):
+        return self.order[offset:offset + limit]
+
+    def page_count(self):
+        return max(1, -(-len(self.order) // self.rows_per_page))
+
+    # The rows the pool scrolls over: the current page in paginated mode, all the rows shown otherwise
+    def scrolled_rows(self):
+        if self.paginated:
+            return self.query_rows(self.page * self.rows_per_page, self.rows_per_page)
+        return self.order
+
+    def show_page(self, page):
+        self.page = page
+        self.top = 0
+        self.render()
+
+    def next_page(self):
+        self.show_page(self.page + 1)
+
+    def previous_page(self):
+        self.show_page(self.page - 1)
+
+    def _on_page_key(self, event):
+        if not self.winfo_ismapped():
+            return
+
+        forward = event.keysym == "Next"
+        if self.paginated:
+            self.show_page(self.page + 1 if forward else self.page - 1)
         else:
-            color = COLOR_EXPENSE        # The amount is negative, is red
+            self.scroll_rows(self.visible_rows if forward else -self.visible_rows)
+
+    # Switch between the paginated mode and the scrolling one, the first row on screen stays on screen. The choice is kept in the user settings
+    def set_paginated(self, paginated):
+        if paginated == self.paginated:
+            return
 
-        #Tags dictionary have key : color , every key is a tag
-        if data_row[3] in TAGS_DICTIONARY.keys():
-            tag_color = TAGS_DICTIONARY[data_row[3]]
-            is_bold = ctk.CTkFont(size=14, weight="bold")
+        if paginated:
+            self.page, self.top = divmod(self.top, self.rows_per_page)
         else:
-            tag_color = "#FFFFFF"
-            is_bold = ctk.CTkFont(size=12)
+            self.top += self.page * self.rows_per_page
+            self.page = 0
+
+        self.paginated = paginated
+        self.user.change_json_value(KEY_TABLE_PAGINATED, VALUE_TRUE if paginated else VALUE_FALSE)
+        self.render()
+
+    def _update_page_controls(self):
+        shown = (self.page, self.page_count()) if self.paginated else None
+        if shown == self._page_shown:
+            return
+        self._page_shown = shown
 
+        controls = (self.previous_page_button, self.page_label, self.next_page_button)
+        if shown is None:
+            for widget in controls:
+                widget.grid_remove()
+            return
+
+        page, pages = shown
+        for widget in controls:
+            widget.grid()
+        self.page_label.configure(text=f"Page {page + 1} of {pages}")
+        self.previous_page_button.configure(state="normal" if page > 0 else "disabled")
+        self.next_page_button.configure(state="normal" if page < pages - 1 else "disabled")
+
+    def create_pool_row(self, slot):
         # The widget row, a frame with inside all the labels and button to be considered as a transaction row
-        row_frame = ctk.CTkFrame(self.scroll_frame, fg_color="transparent")
+        row_frame = ctk.CTkFrame(self.rows_frame, fg_color="transparent")
         
         # Configure columns with proportional weights for responsive design
         row_frame.grid_columnconfigure(0, weight=15, uniform="col")   # date - 15% of width
         row_frame.grid_columnconfigure(1, weight=15, uniform="col")   # amount - 15% of width  
-        row_frame.grid_columnconfigure(2, weight=15, uniform="col")   # tag - 15% of width
-        row_frame.grid_columnconfigure(3, weight=30, uniform="col")   # desc - 40% of width (flexible)
-        row_frame.grid_columnconfigure(4, weight=5, uniform="col")   # modify - 10% of width
-        row_frame.grid_columnconfigure(5, weight=5, uniform="col")   # delete - 10% of width
+        row_frame.grid_columnconfigure(2, weight=0, uniform="col")    # running balance - only when shown (see set_show_balance)
+        row_frame.grid_columnconfigure(3, weight=15, uniform="col")   # tag - 15% of width
+        row_frame.grid_columnconfigure(4, weight=30, uniform="col")   # desc - 40% of width (flexible)
+        row_frame.grid_columnconfigure(5, weight=5, uniform="col")   # modify - 10% of width
+        row_frame.grid_columnconfigure(6, weight=5, uniform="col")   # delete - 10% of width
 
-        # Format the amount with proper spacing
-        amount_text = f"{data_row[2]}{self.currency_sign}"
-        
         # A dictionary of object and information - NO fixed widths
+        # The buttons look up the row bound to the slot when they are pressed, so they always act on the row on screen
         new_row = {
-            'date': ctk.CTkLabel(row_frame, text=data_row[1], height=28, anchor="w", 
-                                font=ctk.CTkFont(size=12)),
-            'amount': ctk.CTkLabel(row_frame, text=amount_text, 
-                                text_color=color, font=ctk.CTkFont(size=14, weight="bold"), 
+            'frame': row_frame,
+            'date': ctk.CTkLabel(row_frame, text="", height=28, anchor="w", 
+                                font=row_styles.font(12)),
+            'amount': ctk.CTkLabel(row_frame, text="", 
+                                font=row_styles.font(14, "bold"), 
                                 height=28, anchor="e"),  # Right align the amount
-            'tag': ctk.CTkLabel(row_frame, text=data_row[3], anchor="w", height=28,
-                            font=is_bold, text_color=tag_color),
-            'desc': ctk.CTkLabel(row_frame, text=data_row[4], anchor="w", height=28,
-                                font=ctk.CTkFont(size=12)),
+            'balance': ctk.CTkLabel(row_frame, text="", anchor="e", height=28,
+                                font=row_styles.font(12)),
+            'tag': ctk.CTkLabel(row_frame, text="", anchor="w", height=28,
+                            font=row_styles.font(12)),
+            'desc': ctk.CTkLabel(row_frame, text="", anchor="w", height=28,
+                                font=row_styles.font(12)),
             'modify': ctk.CTkButton(
                 row_frame,
                 text= "",
@@ -118,8 +314,8 @@ class VirtualTable(BaseView):
                 height=32,
                 fg_color=COLOR_EDIT_BTN,
                 hover_color=COLOR_EDIT_BTN_HOVER,
-                font=ctk.CTkFont(size=12),
-                command=lambda: self.__edit_button_event(self.widgets_list.index(row_frame))
+                font=row_styles.font(12),
+                command=lambda: self.__edit_button_event(self.bound[slot])
             ),
             'delete': ctk.CTkButton(
                 row_frame,
@@ -129,127 +325,290 @@ class VirtualTable(BaseView):
                 height=32,
                 fg_color=COLOR_DELETE_BTN,
                 hover_color=COLOR_DELETE_BTN_HOVER,
-                font=ctk.CTkFont(size=12),
-                command=lambda: self.__delete_button_event(self.widgets_list.index(row_frame))
+                font=row_styles.font(12),
+                command=lambda: self.__delete_button_event(self.bound[slot])
             ),
         }
 
         # Place all widgets with consistent spacing and proper sticky values
         new_row['date'].grid(row=0, column=0, pady=2, sticky="ew")
         new_row['amount'].grid(row=0, column=1, padx =(0, 16), pady=2, sticky="ew")  # Extra space after amount
-        new_row['tag'].grid(row=0, column=2, pady=2, sticky="ew")
-        new_row['desc'].grid(row=0, column=3, pady=2, sticky="ew")
-        new_row['modify'].grid(row=0, column=4,pady=2, sticky="e")
-        new_row['delete'].grid(row=0, column=5, padx= (8,0), pady=2, sticky="w")
-        
-        # Lastly we add the reference of the frame widget to the widgets_list
-        self.widgets_list.append(row_frame)
+        new_row['balance'].grid(row=0, column=2, padx =(0, 16), pady=2, sticky="ew")
+        new_row['tag'].grid(row=0, column=3, pady=2, sticky="ew")
+        new_row['desc'].grid(row=0, column=4, pady=2, sticky="ew")
+        new_row['modify'].grid(row=0, column=5,pady=2, sticky="e")
+        new_row['delete'].grid(row=0, column=6, padx= (8,0), pady=2, sticky="w")
+        self._layout_balance(new_row)
+
+        # The frame keeps its place in the grid, grid_remove() and grid() only hide and show it
+        row_frame.grid(row = slot, column = 0, padx = 32, pady = 4, sticky = "ew")
+        row_frame.grid_remove()
+
+        self.pool.append(new_row)
+        self.bound.append(None)
+        self.shown.append(None)
+
+    # Show in the pool row at slot the data of the store row at position
+    def bind_row(self, slot, position):
+        row = self.pool[slot]
+        self.bound[slot] = position
+
+        balance = self.database.balance.balance(self.data.dates[position]) if self.show_balance else None
+        values = (self.data.date_at(position), self.data.amount_at(position), self.data.tag_at(position), self.data.description_at(position), balance)
+        if self.shown[slot] != values:
+            self.shown[slot] = values
+            date, amount, tag, desc, balance = values
+
+            # Colours and fonts are shared by all the rows with the same amount sign and tag
+            style = row_styles.row_style(amount, tag)
+
+            row['date'].configure(text=date)
+            row['amount'].configure(text=f"{amount}{self.currency_sign}", text_color=style.amount_color)
+            row['tag'].configure(text=tag, text_color=style.tag_color, font=style.tag_font)
+            row['desc'].configure(text=desc)
+            # The rows without an ISO date have no running balance, the cell stays blank
+            if balance is not None:
+                balance = helpers.from_cents(balance)
+                row['balance'].configure(text=f"{balance}{self.currency_sign}", text_color=row_styles.row_style(balance, None).amount_color)
+            elif self.show_balance:
+                row['balance'].configure(text="")
+
+        row['frame'].grid()
+
+    # Show or hide the balance column of a pool row
+    def _layout_balance(self, row):
+        row['frame'].grid_columnconfigure(2, weight=TABLE_BALANCE_WEIGHT if self.show_balance else 0)
+        if self.show_balance:
+            row['balance'].grid()
+        else:
+            row['balance'].grid_remove()
+
+    # Show or hide the running balance column, the choice is kept in the user settings
+    def set_show_balance(self, show):
+        if show == self.show_balance:
+            return
+
+        self.show_balance = show
+        self.user.change_json_value(KEY_TABLE_BALANCE, VALUE_TRUE if show else VALUE_FALSE)
+        for slot, row in enumerate(self.pool):
+            self._layout_balance(row)
+            self.shown[slot] = None
+        self.render()
+        if self.balance_callback is not None:
+            self.balance_callback(show)
+
+    # One time use to register the function that shows or hides the header of the balance column, it receives True when the column is shown
+    def register_balance_callback(self, callback_function):
+        self.balance_callback = callback_function
+        callback_function(self.show_balance)
+
+    # Apply the fonts of the style cache to the pool rows, the values shown are configured again by render()
+    def restyle(self):
+        for slot, row in enumerate(self.pool):
+            row['date'].configure(font=row_styles.font(12))
+            row['amount'].configure(font=row_styles.font(14, "bold"))
+            row['balance'].configure(font=row_styles.font(12))
+            row['desc'].configure(font=row_styles.font(12))
+            self.shown[slot] = None
+        for widget in (self.progress_label, self.paginated_switch, self.balance_switch, self.previous_page_button, self.page_label, self.next_page_button):
+            widget.configure(font=row_styles.font(12))
+        self.render()
+
+    # Bind the pool rows to the rows scrolled from self.top, the rows that are not needed are hidden
+    def render(self):
+        # After a load of the store (an import) the positions in self.order are not valid anymore
+        if self._generation != self.data.generation:
+            self._generation = self.data.generation
+            self.order = list(self.data.positions())
+            self._shown_slots = self.data.slots
+            self._recompute_totals()
+
+        # Only the rows of the current page are taken when the table is paginated
+        if self.paginated:
+            self.page = max(0, min(self.page, self.page_count() - 1))
+        rows = self.scrolled_rows()
+
+        self.top = max(0, min(self.top, len(rows) - self.visible_rows))
+
+        for slot, row in enumerate(self.pool):
+            index = self.top + slot
+            if slot < self.visible_rows and index < len(rows):
+                self.bind_row(slot, rows[index])
+            elif self.bound[slot] is not None:
+                self.bound[slot] = None
+                row['frame'].grid_remove()
+
+        # The scrollbar shows which part of the rows (or of the page) is on screen
+        if rows:
+            self.scrollbar.set(self.top / len(rows), min(1.0, (self.top + self.visible_rows) / len(rows)))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+        self._update_page_controls()
+
+    # Show the given store positions, from the top of the table
+    def show_positions(self, positions):
+        self.order = list(positions)
+        self._recompute_totals()
+        self.page = 0
+        self.top = 0
+        self.render()
+        self._notify_summary_changed()                        # Notify to change the summary values using the callback funnction and implementation
+
+    # Add a new transaction to the table and to the local store, the data is formatted as [database_index, date, amount, tag, desc]
+    # The row is written in the database at the next save, until then it has a temporary ID (negative). Returns its position in the store
+    def create_row(self, data_row):
+        position = self.data.append(data_row[0] or self.data.temporary_id(), data_row[1], float(data_row[2]), data_row[3], data_row[4])
+        self.sort_index.insert(position)
+        self.order.append(position)
+        self._shown_slots = self.data.slots
+        self._add_to_totals(self.data.amounts[position])
+        self.render()
+        return position
 
     # =============================================================================
-    # Event to filter the widgets list
+    # Loading
     # =============================================================================
 
-    # Show all the widges in self.widgets_list
-    def show_all(self):
-        # After looping for all the widgets in the list, we position it in the grid with the index used as position, using a list ensure to not have empty position
-        # The widgets frame is child of the scroll frame, so when we call grid we are placing it inside the scroll frame
-        for index, widget in enumerate(self.widgets_list):
-            widget.grid(row = index, column = 0, padx = 32, pady = 4, sticky = "ew")
-            widget.grid()  # ensures the widget is visible if it was hidden before
-
-        # Position the scroll bar to the start of the frame on the top (this is usefull when we call show all from the button all)
-        self.scroll_frame._parent_canvas.yview_moveto(0)
-        self._notify_summary_changed()                        # Notify to change the summary values using the callback funnction and implementation
+    # Fill the local store from the database in time boxed steps scheduled with after(), so the window paints and reacts while a big ledger loads
+    # The first chunk is on screen right away, the next ones are appended at the end of the table as they arrive
+    # Filters and sorts selected before or during the loading are recorded and applied once at the end, then on_done is called
+    def start_loading(self, on_done = None):
+        self.loading = True
+        self._on_loaded = on_done
+        self._loader = self.database.load_local_chunks()
+        self.progress_label.configure(text="Loading transactions...")
+        self.progress_label.grid()
+        self.after(0, self._load_step)
+
+    def _load_step(self):
+        deadline = time.perf_counter() + LOAD_STEP_MS / 1000
+        try:
+            while True:
+                loaded, total = next(self._loader)
+                if time.perf_counter() >= deadline:
+                    break
+        except StopIteration:
+            self._finish_loading()
+            return
 
-    def hide_all(self):
-        # After looping for all the widgets in the list, we position it in the grid with the index used as position, using a list ensure to not have empty position
-        # The widgets frame is child of the scroll frame, so when we call grid we are placing it inside the scroll frame
-        for widget in self.widgets_list:
-            widget.grid_remove()  # ensures the widget is visible if it was hidden before
+        self._show_loaded()
+        self.progress_label.configure(text=f"Loading transactions {loaded} / {total}")
+        self.after(1, self._load_step)
+
+    # Append to the table the rows loaded since the last step
+    def _show_loaded(self):
+        # The loading starts with an empty store
+        if self._generation != self.data.generation:
+            self._generation = self.data.generation
+            self.order = []
+            self.income = 0
+            self.expenses = 0
+            self._shown_slots = 0
+
+        amounts = self.data.amounts
+        for position in range(self._shown_slots, self.data.slots):
+            self.order.append(position)
+            self._add_to_totals(amounts[position])
+        self._shown_slots = self.data.slots
+
+        self.render()
+        self._notify_summary_changed()
 
-        # Position the scroll bar to the start of the frame on the top (this is usefull when we call show all from the button all)
-        self.scroll_frame._parent_canvas.yview_moveto(0)
-        self._notify_summary_changed()                        # Notify to change the summary values using the callback funnction and implementation
+    def _finish_loading(self):
+        self._show_loaded()
+        self.loading = False
+        self._loader = None
+        self.progress_label.grid_remove()
 
-            
-    # Unplace from the grid all the widget that are not income
-    def show_income(self, date, month):
+        self.apply_filters()
+        if self._on_loaded is not None:
+            self._on_loaded()
 
-        self.filter_dates(date, month)
-        # frame.winfo_children()[1].cget("text") === widget frame >> [ctklabel = date, ctklabel =amount ,ctklabel = tag, ctklabel = desc] >> [1]
-        # position equal the amount >>cget("text") from the label, the text have the amount
-        for frame in self.widgets_list:
-            if frame.winfo_ismapped():
-                label_ref = frame.winfo_children()[1].cget("text")
-                if float(label_ref.strip(self.currency_sign)) < 0:                     # We remove the currency sign and transform it into a float
-                    frame.grid_remove()                                                # We remove it from the grid, but do not forget it, because we do not delete it from the list of widgets
-                else: 
-                    frame.grid()                                                       # If the button is called after another button, some widgets that are income could be hided, this will show it
-            
-        # The scroll frame hight differ from income, expenses and all, so this solve the problem positioning on the top 
-        self.scroll_frame._parent_canvas.yview_moveto(0)
-        self._notify_summary_changed()                       # Notify to change the summary values using the callback funnction and implementation
+    # =============================================================================
+    # Event to filter the rows
+    # =============================================================================
 
-    # Same as show_income, unplace the grid all the widget that are not expenses
-    def show_expenses(self, date, month):
-        self.filter_dates(date, month)
+    # Show the rows that pass all the filters of self.filters, in the order selected
+    # While loading the filters are only recorded in self.filters, they are applied once at the end
+    def apply_filters(self):
+        if self.loading:
+            return
 
-        for frame in self.widgets_list:
-            if frame.winfo_ismapped():
-                label_ref = frame.winfo_children()[1].cget("text")
-                if float(label_ref.removesuffix(self.currency_sign)) > 0:
-                    frame.grid_remove()
-                else: 
-                    frame.grid()
+        positions = self.filters.positions()
+        if self.sort_key is not None:
+            positions = self.sort_index.sort(positions, self.sort_key, self.ascending)
+        self.show_positions(positions)
 
-        self.scroll_frame._parent_canvas.yview_moveto(0)
-        self._notify_summary_changed()                       # Notify to change the summary values using the callback funnction and implementation
+    # Show all the rows of the store, every filter is removed
+    def show_all(self):
+        self._sign_shortcut = False
+        self.filters.reset()
+        self.apply_filters()
+
+    def hide_all(self):
+        self.show_positions([])
 
-    # Show only the row witch contain the searched text used in the search bar
+    # Show only the income of the selected year and month, the other filters are kept
+    def show_income(self, date, month):
+        self._set_period(date, month)
+        self._sign_shortcut = False
+        self.filters.set_sign(SIGN_INCOME)
+        self.apply_filters()
+
+    # Same as show_income, show only the expenses
+    def show_expenses(self, date, month):
+        self._set_period(date, month)
+        self._sign_shortcut = False
+        self.filters.set_sign(SIGN_EXPENSES)
+        self.apply_filters()
+
+    # Show only the rows of the given tags, None shows every tag
+    def filter_tags(self, tags):
+        self.filters.set_tags(tags)
+        self.apply_filters()
+
+    # The rows of a big table whose description or tag has a word starting with text, from the full text index of the database
+    # None lets the filters search the local store: a small table, a table still loading or a database without FTS5
+    def _index_search(self, text):
+        if len(self.data) < SEARCH_INDEX_MIN_ROWS or not self.database.local_loaded or not self.database.full_text_search:
+            return None
+        return self.database.search(text)
+
+    # Show only the row witch contain the searched text used in the search bar, inside the year, month and sign selected
     def show_searched(self, text):
-        # Show expenses when typing -
-        if text == "-":
-            self.show_expenses()
-            return
-        
-        # Show income when typing +
-        if text == "+":
-            self.show_income()
-            return
+        # Typing - shows the expenses and + the income, until the text changes, then the sign selected before is back
+        if text in ("-", "+"):
+            if not self._sign_shortcut:
+                self._sign_shortcut = True
+                self._sign_before_shortcut = self.filters.sign
+            self.filters.set_sign(SIGN_EXPENSES if text == "-" else SIGN_INCOME)
+            self.filters.set_text("")
+        else:
+            if self._sign_shortcut:
+                self._sign_shortcut = False
+                self.filters.set_sign(self._sign_before_shortcut)
 
-        # Loop trough all frames in the widgets, and retrieve the texts of the labels, than search the text quary if is present in the labels, simple search
-        for frame in self.widgets_list:
-            search_text = text.lower()
-            date = frame.winfo_children()[0].cget("text").lower()
-            amount = frame.winfo_children()[1].cget("text").lower()
-            tag =  frame.winfo_children()[2].cget("text").lower()
-            desc = frame.winfo_children()[3].cget("text").lower()
-
-            # Search all
-            if search_text in f"{date} {amount} {tag} {desc}":
-                frame.grid()
-            else: 
-                frame.grid_remove()
-
-        self.scroll_frame._parent_canvas.yview_moveto(0)
-        self._notify_summary_changed()                        # Notify to change the summary values using the callback funnction and implementation
+            # Search the text in the date, amount, tag and description of every row, the store does it column by column
+            self.filters.set_text(text)
+        self.apply_filters()
 
     # =============================================================================
     # Delete button event confirmation 
     # =============================================================================
 
     # Delete button event to  open a confirmation button, a top level frame that let the user confirm of deny the deletion
-    def __delete_button_event(self, idx):
+    def __delete_button_event(self, position):
         # Checks if other delete button dialoge box exists, if they exist, they are destroyed
         for widget in self.controller.winfo_children():
             if isinstance(widget, ctk.CTkToplevel):
                 widget.destroy()
 
-        # Retrieve all the text from the widget to show the user what is deleting it
-        date = self.widgets_list[idx].winfo_children()[0].cget("text")
-        amount = self.widgets_list[idx].winfo_children()[1].cget("text")
-        tag = self.widgets_list[idx].winfo_children()[2].cget("text")
-        desc = self.widgets_list[idx].winfo_children()[3].cget("text")
+        # Retrieve the values of the row to show the user what is deleting it
+        date = self.data.date_at(position)
+        amount = f"{self.data.amount_at(position)}{self.currency_sign}"
+        tag = self.data.tag_at(position)
+        desc = self.data.description_at(position)
 
         # Create a top level dialog box
         top_level_dialog = ctk.CTkToplevel(self.controller)
@@ -316,7 +675,7 @@ class VirtualTable(BaseView):
                                     font=ctk.CTkFont(size=14, weight="bold"),
                                     fg_color=COLOR_DELETE_BTN,
                                     hover_color=COLOR_DELETE_BTN_HOVER,
-                                    command=lambda: self._ok_event(top_level_dialog, idx))
+                                    command=lambda: self._ok_event(top_level_dialog, position))
         self.ok_button.grid(row=5, column=0, columnspan=1, padx=(20, 10), pady=(0, 20), sticky="ew")
         
         self.cancel_button = ctk.CTkButton(master=top_level_dialog,
@@ -331,21 +690,37 @@ class VirtualTable(BaseView):
         self.cancel_button.grid(row=5, column=1, columnspan=1, padx=(10, 20), pady=(0, 20), sticky="ew")
 
     # Event the the user press the delete button inside the dialog box
-    def _ok_event(self, frame, idx):
-        self.__remove_row(idx)
+    def _ok_event(self, frame, position):
+        row_id = self.data.ids[position]
+        self.sort_index.discard(position)
+        self.database.row_changing(position)
+        self.__remove_row(position)
+        self.database.row_changed(position)
         frame.destroy()
         self._notify_summary_changed()                  # Notify to change the summary values using the callback funnction and implementation
-        self.save_db_modification(DB_ACTION_DELETE, self.data[idx][0])
+
+        # A row added after the last save is not in the database yet, it's enough to forget its queued add
+        pending_add = self._pending_adds.pop(row_id, None)
+        if pending_add is not None:
+            self.db_transactions.remove(pending_add)
+        else:
+            self.save_db_modification(DB_ACTION_DELETE, row_id)
 
     # Event when the user presse the cancel button or the close windows button, destroy the window
     def _cancel_event(self, frame):
         frame.destroy()
 
-    # Remove the row from the widget list and from the screen
-    def __remove_row(self, idx):
-        self.widgets_list[idx].destroy()               # Remove it from the screen
-        self.widgets_list.pop(idx)
-        # Add code to delete it from the database local 
+    # Remove the row from the local store and from the screen
+    # The row is found in self.order with a binary search on the key of the sort shown, the rows added or edited since the sort are searched one by one
+    def __remove_row(self, position):
+        index = self.sort_index.locate(self.order, position, self.sort_key, self.ascending)
+        if index is None:
+            index = self.order.index(position)
+
+        self._add_to_totals(self.data.amounts[position], -1)
+        self.data.remove_at(position)
+        del self.order[index]
+        self.render()
 
 
     # =============================================================================
@@ -353,17 +728,17 @@ class VirtualTable(BaseView):
     # =============================================================================
 
     # Edit button event to  open a confirmation button, a top level frame that let the user confirm of deny the deletion
-    def __edit_button_event(self, idx):
+    def __edit_button_event(self, position):
         # Checks if other edit button dialoge box exists, if they exist, they are destroyed
         for widget in self.controller.winfo_children():
             if isinstance(widget, ctk.CTkToplevel):
                 widget.destroy()
 
-        # Retrieve all the text from the widget to show the user what is deleting it
-        self.current_date = self.widgets_list[idx].winfo_children()[0].cget("text")
-        self.current_amount = self.widgets_list[idx].winfo_children()[1].cget("text")
-        self.current_tag = self.widgets_list[idx].winfo_children()[2].cget("text")
-        self.current_desc = self.widgets_list[idx].winfo_children()[3].cget("text")
+        # Retrieve the values of the row to show the user what is editing
+        self.current_date = self.data.date_at(position)
+        self.current_amount = f"{self.data.amount_at(position)}{self.currency_sign}"
+        self.current_tag = self.data.tag_at(position)
+        self.current_desc = self.data.description_at(position)
 
         # Create a top level dialog box
         top_level_dialog = ctk.CTkToplevel(self.controller)
@@ -421,7 +796,7 @@ class VirtualTable(BaseView):
                                     font=ctk.CTkFont(size=14, weight="bold"),
                                     fg_color=COLOR_DELETE_BTN,
                                     hover_color=COLOR_DELETE_BTN_HOVER,
-                                    command=lambda: self._confirm_edit(top_level_dialog, idx))
+                                    command=lambda: self._confirm_edit(top_level_dialog, position))
         self.ok_button.grid(row=5, column=0, columnspan=1, padx=(20, 10), pady=(0, 20), sticky="ew")
         
         self.cancel_button = ctk.CTkButton(master=top_level_dialog,
@@ -437,7 +812,7 @@ class VirtualTable(BaseView):
 
 
     # Event the the user press the delete button inside the dialog box
-    def _confirm_edit(self, frame, idx):
+    def _confirm_edit(self, frame, position):
         user_date = self.date_label.get()
         user_amount = self.amount_label.get()
         user_tag = self.tag_label.get() 
@@ -475,36 +850,29 @@ class VirtualTable(BaseView):
         user_amount = str(round(float(user_amount),2))
 
 
-        self.widgets_list[idx].winfo_children()[0].configure(text = user_date)
-        self.widgets_list[idx].winfo_children()[1].configure(text = (f"{user_amount}{self.currency_sign}"))
-        self.widgets_list[idx].winfo_children()[2].configure(text = user_tag)
-        self.widgets_list[idx].winfo_children()[3].configure(text = user_desc)
-
-        self.update_row_colors(user_amount, user_tag, idx)
-        
+        # The store is changed in place, render() shows the new values if the row is on screen
+        # The row leaves the sort orders and the indexes of the database (budget, balances) with its old values and goes back with the new ones
+        # The totals lose the old amount and get the new one, the row edited is on screen so it is part of them
+        self.sort_index.discard(position)
+        self.database.row_changing(position)
+        self._add_to_totals(self.data.amounts[position], -1)
+        self.data.update_at(position, user_date, float(user_amount), user_tag, user_desc)
+        self._add_to_totals(self.data.amounts[position])
+        self.sort_index.insert(position)
+        self.database.row_changed(position)
+        self.filters.refresh(position)
+        self.render()
 
         self._notify_summary_changed()                  # Notify to change the summary values using the callback funnction and implementation
-        self.save_db_modification(DB_ACTION_EDIT, self.data[idx][0], user_date, user_amount, user_tag, user_desc)
-        frame.destroy()
-
-    def update_row_colors(self, amount, tag, idx):
-        # Because the data is formatted in [database_index, date, amount, tag, desc] data_row[2] is the amount positioned in the list
-        if float(amount.removesuffix(self.currency_sign)) >= 0:
-            color = COLOR_INCOME      # The amount is positive, is green
-        else:
-            color = COLOR_EXPENSE        # The amount is negative, is red
 
-        #Tags dictionary have key : color , every key is a tag
-        if tag in TAGS_DICTIONARY.keys():
-            tag_color = TAGS_DICTIONARY[tag]
-            is_bold = ctk.CTkFont(size=14, weight="bold")
+        # A row added after the last save is not in the database yet, its queued add gets the new values
+        # A row whose add is already on its way to the database is edited with its temporary ID, the writer knows its database ID
+        pending_add = self._pending_adds.get(self.data.ids[position])
+        if pending_add is not None:
+            pending_add.update(date = user_date, amount = user_amount, tag = user_tag, desc = user_desc)
         else:
-            tag_color = "#FFFFFF"
-            is_bold = ctk.CTkFont(size=12)
-
-
-        self.widgets_list[idx].winfo_children()[1].configure(text_color = color)
-        self.widgets_list[idx].winfo_children()[2].configure(text_color= tag_color, font=is_bold,)
+            self.save_db_modification(DB_ACTION_EDIT, self.data.ids[position], user_date, user_amount, user_tag, user_desc)
+        frame.destroy()
 
 
     # =============================================================================
@@ -517,107 +885,65 @@ class VirtualTable(BaseView):
 
     # If something in the table is changed is notified, we calculate the new summary and we pass the dictionary with the values to be used in the callback function in the home_view
     def _notify_summary_changed(self):
+        if self.summary_callback is None:
+            return
         summary_data = self._calculate_summary()
         self.summary_callback(summary_data)
 
-    # Calculte the summary values
-    def _calculate_summary(self):
-        income = 0
-        expenses = 0
-        transactions = 0
-
-        # If the widget in list is visible we take the amount and use for the income expenses and transactions, based if > or < 0
-        for widget in self.widgets_list:
-            if widget.winfo_manager():
-                amount = float(widget.winfo_children()[1].cget("text").removesuffix(self.currency_sign))
-                
-                if amount >= 0:
-                    income += amount
-                else:
-                    expenses += amount
-               
-                transactions += 1
+    # Compute the totals of the rows in self.order from scratch, the loops over the amounts run in C
+    def _recompute_totals(self):
+        totals = aggregate.summarize(self.data.amounts, self.order)
+        self.income = totals.income
+        self.expenses = totals.expenses
+
+    # A row amount in cents enters (direction 1) or leaves (direction -1) the totals
+    # The count is len(self.order), so only the amounts are tracked
+    def _add_to_totals(self, cents, direction = 1):
+        if cents >= 0:
+            self.income += direction * cents
+        else:
+            self.expenses += direction * cents
 
+    # The summary values of the rows shown by the table, read from the running totals
+    def _calculate_summary(self):
         # We return a dictionary of values used in the homeview to change the summary panel
         return {
-            KEY_SUM_TRANSACTIONS: transactions,
-            KEY_SUM_INCOME: income,
-            KEY_SUM_EXPENSES: expenses,
-            KEY_SUM_BALANCE: (income + expenses)
+            KEY_SUM_TRANSACTIONS: len(self.order),
+            KEY_SUM_INCOME: helpers.from_cents(self.income),
+            KEY_SUM_EXPENSES: helpers.from_cents(self.expenses),
+            KEY_SUM_BALANCE: helpers.from_cents(self.income + self.expenses)
         }
     
     # =============================================================================
     # Date Ordering
     # =============================================================================
     
-    # Function called when the button date is pressed, order the transactions by date
-    def order_by_date(self, state=[False]):
-        # Toggle sorting order (ascending/descending)
-        state[0] = not state[0] 
-
-        # Create list to store only visible widgets with their amount values
-        visible_widgets = []
-        date_index_pair = []
-
-        # Collect only visible (mapped) widgets
-        for i, widget in enumerate(self.widgets_list):
-            if widget.winfo_manager():  # Only process visible widgets
-                visible_widgets.append(widget)
-                # Get amount text, remove currency sign, convert to float
-                date_text = widget.winfo_children()[0].cget("text")
-                date_index_pair.append((date_text, len(visible_widgets) - 1))
-
-        # Sort by amount (numeric sorting, not string sorting)
-        sorted_pairs = sorted(date_index_pair, key=lambda x: x[0], reverse=state[0])
-
-        # Hide all currently visible widgets
-        for widget in visible_widgets:
-            widget.grid_remove()
-
-        # Show widgets in sorted order, maintaining current filters
-        for row_position, (date_text, original_index) in enumerate(sorted_pairs):
-            widget = visible_widgets[original_index]
-            widget.grid(row=row_position, column=0, padx=32, pady=4, sticky="ew")
-
-        # Reset scroll position to top
-        self.scroll_frame._parent_canvas.yview_moveto(0)
-        # Update summary with current visible data
-        self._notify_summary_changed()
-
-    # Function called when the button date is pressed, order the transactions by amount
-    def order_by_amount(self, state=[False]):
-        # Toggle sorting order (ascending/descending)
-        state[0] = not state[0] 
-
-        # Create list to store only visible widgets with their amount values
-        visible_widgets = []
-        amount_index_pair = []
-
-        # Collect only visible (mapped) widgets
-        for i, widget in enumerate(self.widgets_list):
-            if widget.winfo_ismapped():  # Only process visible widgets
-                visible_widgets.append(widget)
-                # Get amount text, remove currency sign, convert to float
-                amount_text = widget.winfo_children()[1].cget("text")
-                amount_value = float(amount_text.removesuffix(self.currency_sign))
-                amount_index_pair.append((amount_value, len(visible_widgets) - 1))
+    # Order the rows shown by the table, the filters are kept. ascending None inverts the direction used the last time for the same key,
+    # the first time it is descending. The secondary keys are amount for the date and date for the amount, then the ID
+    def sort_rows(self, sort_key, ascending = None):
+        if ascending is None:
+            ascending = not self._last_direction.get(sort_key, True)
+        self._last_direction[sort_key] = ascending
+
+        self.sort_key = sort_key
+        self.ascending = ascending
+        if self.loading:
+            return
 
-        # Sort by amount (numeric sorting, not string sorting)
-        sorted_pairs = sorted(amount_index_pair, key=lambda x: x[0], reverse=state[0])
+        self.order = self.sort_index.sort(self.order, sort_key, ascending)
 
-        # Hide all currently visible widgets
-        for widget in visible_widgets:
-            widget.grid_remove()
+        # Reset scroll position to top
+        self.page = 0
+        self.top = 0
+        self.render()
 
-        # Show widgets in sorted order, maintaining current filters
-        for row_position, (amount_value, original_index) in enumerate(sorted_pairs):
-            widget = visible_widgets[original_index]
-            widget.grid(row=row_position, column=0, padx=32, pady=4, sticky="ew")
+    # Function called when the button date is pressed, order the transactions by date
+    def order_by_date(self, ascending = None):
+        self.sort_rows(SORT_BY_DATE, ascending)
 
-        # Reset scroll position to top
-        self.scroll_frame._parent_canvas.yview_moveto(0)
-        # Update summary with current visible data
-        self._notify_summary_changed()
+    # Function called when the button amount is pressed, order the transactions by amount
+    def order_by_amount(self, ascending = None):
+        self.sort_rows(SORT_BY_AMOUNT, ascending)
 
     # =============================================================================
     # Date Filtering
@@ -625,74 +951,29 @@ class VirtualTable(BaseView):
     
     # Gets the year dates from the data, this is used for the optionmenu in the summary sidebar
     def get_dates(self):
-        # It create a set (so without duplicates) of the element in index 1 sliced. The element in index 1 of self.data is the date formatted in "2025-02-10", this is sliced to "2025" and than
-        # added to the set, giving something like this {'2025', '2024'}
-        dates ={sublist[1][0:4] for sublist in self.data}
+        # The sorted years of the rows alive. The local store keeps the dates as YYYYMMDD integers, so the year is date // 10000
+        # giving something like this [2024, 2025]
+        years = aggregate.distinct(self.data.dates, aggregate.YEAR, self.data.select([]))
 
-        # The sets is than sorted and converted in a list, because optionmenu accepts only list
-        sorted_dates = list(sorted(dates))
+        # The years are converted in a list of strings, because optionmenu accepts only list
+        # The rows without an ISO date are kept as 0 in the store, they have no year to choose
+        sorted_dates = [str(year) for year in years if year > 0]
 
         sorted_dates.insert(0, "All")
 
         return sorted_dates
     
     
-    def filter_dates(self, date_value, month_value):
-        months = {
-            "Jan": "01",
-            "Feb": "02",
-            "Mar": "03",
-            "Apr": "04",
-            "May": "05",
-            "Jun": "06",
-            "Jul": "07",
-            "Aug": "08",
-            "Sep": "09",
-            "Oct": "10",
-            "Nov": "11",
-            "Dec": "12"
-        }
+    # Select the year and month shown by the table, "All" doesn't filter
+    def _set_period(self, date_value, month_value):
+        year = None if date_value == "All" else int(date_value)
+        month = None if month_value == "All" else MONTH_NAMES.index(month_value) + 1
+        self.filters.set_period(year, month)
 
-        if date_value == "All" and month_value ==  "All":
-            self.show_all()
-            self.scroll_frame._parent_canvas.yview_moveto(0)
-            self._notify_summary_changed()   
-            return
-        
-        if date_value == "All" and month_value != "All":
-            for frame in self.widgets_list:
-                label_ref = frame.winfo_children()[0].cget("text")[5:7]
-                if label_ref == months[month_value]:
-                    frame.grid()
-                else: 
-                    frame.grid_remove()
-
-            self.scroll_frame._parent_canvas.yview_moveto(0)
-            self._notify_summary_changed()   
-            return
-        
-        if month_value == "All" and date_value != "All":
-            for frame in self.widgets_list:
-                year_label = frame.winfo_children()[0].cget("text")[0:4]
-                if date_value == year_label:
-                    frame.grid()
-                else: 
-                    frame.grid_remove()
-
-            self.scroll_frame._parent_canvas.yview_moveto(0)
-            self._notify_summary_changed()   
-            return
-
-        for frame in self.widgets_list:
-            year_label = frame.winfo_children()[0].cget("text")[0:4]
-            month_label = frame.winfo_children()[0].cget("text")[5:7]
-            if date_value == year_label and months[month_value] == month_label:
-                frame.grid()
-            else: 
-                frame.grid_remove()
-
-        self.scroll_frame._parent_canvas.yview_moveto(0)
-        self._notify_summary_changed()   
+    # Show the rows of the selected year and month, the sign, tags and search text selected are kept
+    def filter_dates(self, date_value, month_value):
+        self._set_period(date_value, month_value)
+        self.apply_filters()
   
     # =============================================================================
     # DATABASE OPERATIONS
@@ -702,6 +983,7 @@ class VirtualTable(BaseView):
         """
         Queue database operations for batch processing.
         Improves performance by deferring actual database writes.
+        The rows are already changed in the local store, every operation names its row by ID, the temporary ID for the rows not saved yet.
         """
         if action == DB_ACTION_DELETE:
             self.db_transactions.append({
@@ -718,27 +1000,58 @@ class VirtualTable(BaseView):
                 "desc" : desc,
             })
         elif action == DB_ACTION_ADD:
-            self.db_transactions.append({
+            operation = {
                 "action": action,
+                "db_idx": row_id,
                 "date": date,
                 "amount" : amount,
                 "tag" : tag,
                 "desc" : desc,
-            })
+            }
+            self.db_transactions.append(operation)
+            self._pending_adds[row_id] = operation
 
-    def update_db(self):
+    def update_db(self, on_done = None, on_error = None):
         """
-        Process all queued database operations and clear the queue.
-        Called when batch operations need to be committed.
+        Hand all queued database operations to the background writer and clear the queue.
+        The whole queue is committed in one transaction without blocking the GUI,
+        on_done receives the new database IDs of the added rows, on_error the exception if the commit failed.
+        If the commit fails the operations go back in the queue, in front of the ones queued since, so saving again retries them.
         """
-        for txn in self.db_transactions:
-            if txn["action"] == DB_ACTION_DELETE:
-                self.database.remove_transaction(txn["db_idx"])
-            elif txn["action"] == DB_ACTION_EDIT:
-                self.database.edit_transaction(txn["db_idx"], txn["date"], txn["amount"],txn["tag"],txn["desc"] )
-            elif txn["action"] == DB_ACTION_ADD:
-                self.database.add_transaction(txn["date"], txn["amount"],txn["tag"],txn["desc"])
-
-        self.database.conn.commit()
-        self.database.update_local()
-        self.db_transactions.clear()
+        operations = self.db_transactions
+        self.db_transactions = []
+        self._pending_adds = {}
+        self._requeued = 0
+
+        # The local store already has the changes, after the commit the added rows only need their database ID
+        # The rows are found by temporary ID, a row deleted or a store loaded again in the meantime is simply not there
+        def _saved(results):
+            for operation, row_id in zip(operations, results):
+                if operation["action"] == DB_ACTION_ADD:
+                    position = self.data.position_of(operation["db_idx"])
+                    if position is not None:
+                        self.data.set_id(position, row_id)
+            if on_done is not None:
+                on_done(results)
+
+        def _failed(error):
+            self._requeue(operations)
+            if on_error is not None:
+                on_error(error)
+
+        self.database.apply_batch_async(operations, _saved, _failed, sync_local = False)
+        return len(operations)
+
+    # Put back the operations of a failed commit, the failures arrive in the order the batches were saved so the order is kept
+    # An add is pending again (edits and deletes change it in place) only while no edit or delete in the queue names its row
+    def _requeue(self, operations):
+        self.db_transactions[self._requeued:self._requeued] = operations
+        self._requeued += len(operations)
+
+        named = {operation["db_idx"] for operation in self.db_transactions if operation["action"] != DB_ACTION_ADD}
+        for row_id in named:
+            self._pending_adds.pop(row_id, None)
+        for operation in operations:
+            row_id = operation["db_idx"]
+            if operation["action"] == DB_ACTION_ADD and row_id not in named and self.data.position_of(row_id) is not None:
+                self._pending_adds[row_id] = operation
@@ -3,6 +3,7 @@ from config.settings import (MAX_WINDOW_WIDTH, MAX_WINDOW_HEIGHT, BACKGROUND_PAT
 
 # Importing the necessary libraries and view used in the application
 from src.views.base_view import BaseView
+from src.views import row_styles
 import customtkinter as ctk
 from PIL import Image
 import os
@@ -69,4 +70,7 @@ class WelcomeView(BaseView):
             ctk.set_default_color_theme(os.path.join(THEMES_PATH, THEMES_TYPE[str(selected_theme)]))
             self.user.change_json_value(KEY_THEME, str(selected_theme))
 
+        # The table rows share fonts created with the old theme
+        row_styles.invalidate()
+
         self.controller.switch_frame(DASHBOARD_FRAME)
\ No newline at end of file